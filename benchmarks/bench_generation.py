@@ -0,0 +1,283 @@
+"""Deck generation benchmarks.
+
+Builds decks from synthetic images for each layout path and image count and
+records wall time, images/sec, peak RSS and output size. Each case runs in a
+fresh process so peak RSS belongs to that case alone.
+
+    python benchmarks/bench_generation.py --counts 10,1000 --output results.json
+    python benchmarks/bench_generation.py --compare results.json
+    python benchmarks/bench_generation.py --check-backends --counts 100
+
+--check-backends builds each deck with every shape backend and fails if
+their slides differ. With a max_memory setting, a case fails when the image
+data the generator held at its peak exceeded the budget:
+
+    python benchmarks/bench_generation.py --profiles large-jpg --counts 2000 \
+        --layouts add_images --setting 'max_memory="64M"'
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import queue
+import random
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from image_layout_manager import SHAPE_BACKENDS  # noqa: E402
+from pptx_generator import PPTXGenerator  # noqa: E402
+
+LAYOUTS = {"single": 1, "two": 2, "three": 3, "four": 4, "add_images": 4}
+PROFILES = {
+    "small-jpg": ((640, 480), "JPEG"),
+    "large-jpg": ((3000, 2000), "JPEG"),
+    "medium-png": ((1280, 960), "PNG"),
+}
+DEFAULT_COUNTS = (10, 1000, 10000)
+DEFAULT_TOLERANCE = 0.2
+CHILD_POLL_SECONDS = 1.0
+
+
+def synthetic_image(size, seed: int) -> Image.Image:
+    """A smooth, unique image: a random tile scaled up and tinted by seed."""
+    rng = random.Random(seed)
+    tile_size = (max(1, size[0] // 32), max(1, size[1] // 32))
+    tile = Image.frombytes(
+        "RGB", tile_size, rng.randbytes(tile_size[0] * tile_size[1] * 3)
+    )
+    image = tile.resize(size, Image.Resampling.BILINEAR)
+    tint = Image.new("RGB", size, (seed % 256, (seed // 256) % 256, rng.randrange(256)))
+    return Image.blend(image, tint, 0.3)
+
+
+def ensure_images(work_dir: Path, profile: str, count: int) -> List[Path]:
+    """Create (or reuse) count images for profile under work_dir."""
+    size, image_format = PROFILES[profile]
+    ext = "jpg" if image_format == "JPEG" else image_format.lower()
+    image_dir = work_dir / profile
+    image_dir.mkdir(parents=True, exist_ok=True)
+
+    images = []
+    for i in range(count):
+        path = image_dir / f"{i:05d}.{ext}"
+        if not path.exists():
+            synthetic_image(size, i).save(path, image_format)
+        images.append(path)
+    return images
+
+
+def run_case(layout: str, images: List[Path], output: Path, options: Dict) -> Dict:
+    generator = PPTXGenerator()
+    generator.settings.update(options)
+
+    start = time.perf_counter()
+    generator.create_presentation(output, override=True)
+    if layout == "add_images":
+        generator.add_images(images)
+    else:
+        per_slide = LAYOUTS[layout]
+        for i in range(0, len(images), per_slide):
+            slide = generator._create_empty_slide()
+            generator._arrange_images(slide, images[i : i + per_slide])
+    built = time.perf_counter()
+    generator.save_presentation(output)
+    saved = time.perf_counter()
+
+    wall = saved - start
+    result = {
+        "wall_seconds": round(wall, 4),
+        "build_seconds": round(built - start, 4),
+        "save_seconds": round(saved - built, 4),
+        "images_per_second": round(len(images) / wall, 2),
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "output_bytes": output.stat().st_size,
+    }
+    if generator.memory_budget is not None:
+        result["image_memory_peak_mb"] = round(generator.memory_budget.peak / 1e6, 1)
+        result["over_budget"] = (
+            generator.memory_budget.peak > generator.memory_budget.max_bytes
+        )
+    return result
+
+
+def _run_case_in_child(args, results) -> None:
+    results.put(run_case(*args))
+
+
+def run_isolated(layout: str, images: List[Path], output: Path, options: Dict) -> Dict:
+    """run_case in a fresh process, so its peak RSS is its own.
+
+    Raises RuntimeError if the child dies, e.g. killed for memory, or exits
+    with an error.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(
+        target=_run_case_in_child, args=((layout, images, output, options), results)
+    )
+    process.start()
+    while True:
+        # A result sent before the child exited is in the pipe by then.
+        exited = not process.is_alive()
+        try:
+            result = results.get(timeout=CHILD_POLL_SECONDS)
+            break
+        except queue.Empty:
+            if exited:
+                result = None
+                break
+    process.join()
+    if process.exitcode != 0 or result is None:
+        raise RuntimeError(
+            f"{layout} benchmark process exited with code {process.exitcode}"
+        )
+    return result
+
+
+def check_backends(images: List[Path], output_dir: Path, options: Dict) -> List[str]:
+    """Build a deck with every shape backend and list the parts that differ."""
+    decks = {}
+    for backend in SHAPE_BACKENDS:
+        output = output_dir / f"backend-{backend}.pptx"
+        run_case("add_images", images, output, {**options, "shape_backend": backend})
+        with zipfile.ZipFile(output) as package:
+            decks[backend] = {
+                name: package.read(name)
+                for name in package.namelist()
+                if name.startswith(("ppt/slides/", "ppt/media/"))
+            }
+        output.unlink()
+
+    reference, *others = SHAPE_BACKENDS
+    differences = []
+    for backend in others:
+        for name in sorted(set(decks[reference]) | set(decks[backend])):
+            if decks[reference].get(name) != decks[backend].get(name):
+                differences.append(f"{backend}: {name}")
+    return differences
+
+
+def case_key(result: Dict) -> str:
+    return f"{result['layout']}/{result['profile']}/{result['count']}"
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Describe every case whose time or peak RSS grew by more than tolerance."""
+    baseline_by_key = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = baseline_by_key.get(case_key(result))
+        if base is None:
+            continue
+        for metric in ("wall_seconds", "peak_rss_mb", "output_bytes"):
+            if result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{case_key(result)} {metric}: {base[metric]} -> {result[metric]}"
+                )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--counts", default=",".join(map(str, DEFAULT_COUNTS)), help="image counts"
+    )
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    parser.add_argument("--profiles", default="small-jpg")
+    parser.add_argument("--work-dir", type=Path, help="reuse synthetic images here")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline results to compare")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--check-backends",
+        action="store_true",
+        help="compare the slides written by each shape backend instead of timing",
+    )
+    parser.add_argument(
+        "--setting",
+        action="append",
+        default=[],
+        metavar="NAME=JSON",
+        help="PPTXSettings override, e.g. low_memory=true",
+    )
+    args = parser.parse_args(argv)
+
+    options = {}
+    for setting in args.setting:
+        name, value = setting.split("=", 1)
+        options[name] = json.loads(value)
+
+    work_dir = args.work_dir or Path(tempfile.gettempdir()) / "pptx-benchmark-images"
+    if args.check_backends:
+        failed = False
+        with tempfile.TemporaryDirectory() as output_dir:
+            for profile in args.profiles.split(","):
+                for count in map(int, args.counts.split(",")):
+                    images = ensure_images(work_dir, profile, count)
+                    differences = check_backends(images, Path(output_dir), options)
+                    print(f"{profile}/{count}: {len(differences)} differing parts")
+                    for difference in differences:
+                        print(f"  {difference}")
+                    failed = failed or bool(differences)
+        return 1 if failed else 0
+
+    results = []
+    over_budget = False
+    with tempfile.TemporaryDirectory() as output_dir:
+        for profile in args.profiles.split(","):
+            for count in map(int, args.counts.split(",")):
+                images = ensure_images(work_dir, profile, count)
+                for layout in args.layouts.split(","):
+                    output = Path(output_dir) / f"{layout}-{profile}-{count}.pptx"
+                    result = {"layout": layout, "profile": profile, "count": count}
+                    result.update(run_isolated(layout, images, output, options))
+                    output.unlink()
+                    results.append(result)
+                    print(
+                        f"{case_key(result):32} {result['wall_seconds']:9.3f}s "
+                        f"{result['images_per_second']:9.1f} img/s "
+                        f"{result['peak_rss_mb']:8.1f} MB "
+                        f"{result['output_bytes'] / 1e6:9.2f} MB out"
+                    )
+                    if "image_memory_peak_mb" in result:
+                        print(
+                            f"{'':32} image data peak "
+                            f"{result['image_memory_peak_mb']:.1f} MB"
+                            + (" OVER BUDGET" if result["over_budget"] else "")
+                        )
+                        over_budget = over_budget or result["over_budget"]
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": options,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions or over_budget else 0
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Import-time benchmark for the headless modules.
+
+Imports each module in a fresh interpreter, records the best of several
+wall-clock times and fails when a module exceeds the startup budget or loads a
+dependency it should only import lazily. No headless module may load the GUI
+toolkit, and the lightweight ones may not load python-pptx or Pillow either.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --budget 300 --repeat 10 --output imports.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+GUI_MODULES = ("tkinter", "customtkinter", "CTkToolTip")
+HEAVY_MODULES = ("pptx", "PIL")
+# Module -> dependencies it must not load at import time, besides the GUI.
+MODULES = {
+    "pptx_settings": HEAVY_MODULES,
+    "generation_stats": HEAVY_MODULES,
+    "memory_budget": HEAVY_MODULES,
+    "image_cache": HEAVY_MODULES,
+    "image_index": HEAVY_MODULES,
+    "image_list_model": HEAVY_MODULES,
+    "pptx_generator": (),
+    "cli": (),
+    "job_server": (),
+}
+DEFAULT_BUDGET_MS = 400.0
+DEFAULT_REPEAT = 5
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+loaded = sorted({{name.partition(".")[0] for name in sys.modules}})
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def time_import(module: str) -> Dict:
+    """Import module in a new interpreter; return its time and loaded packages."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=SRC_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def measure(module: str, repeat: int) -> Dict:
+    runs = [time_import(module) for _ in range(repeat)]
+    return {
+        "module": module,
+        "ms": min(run["seconds"] for run in runs) * 1000,
+        "loaded": runs[0]["loaded"],
+    }
+
+
+def check(result: Dict, budget_ms: float) -> List[str]:
+    failures = []
+    if result["ms"] > budget_ms:
+        failures.append(
+            f"{result['module']}: {result['ms']:.1f} ms over the {budget_ms:.0f} ms budget"
+        )
+    forbidden = GUI_MODULES + MODULES[result["module"]]
+    for name in forbidden:
+        if name in result["loaded"]:
+            failures.append(f"{result['module']}: imports {name} at startup")
+    return failures
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--modules", default=",".join(MODULES), help="comma-separated modules"
+    )
+    parser.add_argument(
+        "--budget", type=float, default=DEFAULT_BUDGET_MS, help="per-module ms"
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    modules = [name for name in args.modules.split(",") if name]
+    for name in modules:
+        if name not in MODULES:
+            parser.error(f"Unknown module '{name}', expected one of {list(MODULES)}")
+
+    results, failures = [], []
+    for name in modules:
+        result = measure(name, args.repeat)
+        results.append(result)
+        failures.extend(check(result, args.budget))
+        print(f"{name:<20} {result['ms']:8.1f} ms")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
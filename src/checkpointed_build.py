@@ -0,0 +1,251 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import zipfile
+import zlib
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from generation_stats import GenerationObserver, stage
+from image_cache import ImageCache
+from pptx_generator import GenerationCancelled, PPTXGenerator
+from pptx_settings import PPTXSettings, Pathlike
+
+DEFAULT_CHECKPOINT_SLIDES = 100
+JOURNAL_VERSION = 1
+JOURNAL_SUFFIX = ".journal"
+TAIL_SUFFIX = ".tail"
+
+
+def build_fingerprint(images: List[Path], settings: PPTXSettings) -> str:
+    """Identify a build by its image list and the settings that shape its slides."""
+    digest = hashlib.sha1()
+    for image in images:
+        digest.update(str(image).encode())
+        digest.update(b"\0")
+    digest.update(settings.output_key().encode())
+    return digest.hexdigest()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace path with data, flushed to disk first."""
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class BuildJournal:
+    """Progress of a checkpointed build, kept in a JSON file next to the deck.
+
+    A checkpoint records how many planned slides are in the deck, the deck's
+    size and, in a sidecar file, the bytes from its ZIP central directory to
+    the end. Appending only ever writes from the central directory on, so
+    writing those bytes back and truncating restores the checkpointed deck
+    whatever happened to it afterwards.
+    """
+
+    def __init__(self, path: Pathlike, fingerprint: str):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.slides_done = 0
+        self.deck_bytes = None
+        self.tail_sha1 = None
+        self.skipped: List[Tuple[str, str]] = []
+
+    @property
+    def tail_path(self) -> Path:
+        return self.path.with_name(self.path.name + TAIL_SUFFIX)
+
+    @classmethod
+    def load(cls, path: Pathlike) -> Optional["BuildJournal"]:
+        """The journal at path, or None if there is none or it is unreadable."""
+        try:
+            data = json.loads(Path(path).read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != JOURNAL_VERSION:
+            return None
+        journal = cls(path, data["fingerprint"])
+        journal.slides_done = data["slides_done"]
+        journal.deck_bytes = data["deck_bytes"]
+        journal.tail_sha1 = data["tail_sha1"]
+        journal.skipped = [tuple(entry) for entry in data["skipped"]]
+        return journal
+
+    def checkpoint(self, deck_path: Pathlike) -> None:
+        """Record deck_path, flushed to disk, as holding slides_done slides."""
+        with open(deck_path, "rb") as f:
+            os.fsync(f.fileno())
+        with zipfile.ZipFile(deck_path) as package:
+            tail_start = package.start_dir
+        with open(deck_path, "rb") as f:
+            f.seek(tail_start)
+            tail = f.read()
+
+        write_atomic(self.tail_path, zlib.compress(tail))
+        self.deck_bytes = tail_start + len(tail)
+        self.tail_sha1 = hashlib.sha1(tail).hexdigest()
+        data = {
+            "version": JOURNAL_VERSION,
+            "fingerprint": self.fingerprint,
+            "slides_done": self.slides_done,
+            "deck_bytes": self.deck_bytes,
+            "tail_sha1": self.tail_sha1,
+            "skipped": self.skipped,
+        }
+        write_atomic(self.path, json.dumps(data, indent=2).encode())
+
+    def restore(self, deck_path: Pathlike) -> bool:
+        """Cut deck_path back to the last checkpoint; False if that is impossible."""
+        deck_path = Path(deck_path)
+        if self.deck_bytes is None or not deck_path.exists():
+            return False
+        try:
+            tail = zlib.decompress(self.tail_path.read_bytes())
+        except (OSError, zlib.error):
+            return False
+        tail_start = self.deck_bytes - len(tail)
+        if (
+            hashlib.sha1(tail).hexdigest() != self.tail_sha1
+            or deck_path.stat().st_size < tail_start
+        ):
+            return False
+
+        with open(deck_path, "r+b") as f:
+            f.seek(tail_start)
+            if f.read() != tail:
+                f.seek(tail_start)
+                f.write(tail)
+                f.truncate()
+        return True
+
+    def remove(self) -> None:
+        for path in (self.path, self.tail_path):
+            path.unlink(missing_ok=True)
+
+
+class CheckpointedGenerator:
+    """Builds a deck in checkpoints so a failed run can be resumed.
+
+    Every settings.checkpoint_slides slides, the new slides are appended to
+    the deck on disk and a BuildJournal next to it (<deck>.journal) records
+    the progress. Running the same build again, with the same images and
+    settings, cuts the deck back to the last checkpoint and adds only the
+    remaining slides. The journal is removed once the build finishes.
+
+    Combine with settings.bad_images = "skip" to leave out unreadable images
+    instead of failing; skipped_images lists them, including those skipped
+    before a resume.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[PPTXSettings] = None,
+        image_cache: Optional[ImageCache] = None,
+        observer: Optional[GenerationObserver] = None,
+        journal_path: Optional[Pathlike] = None,
+    ):
+        self.settings = settings or PPTXSettings()
+        self.image_cache = image_cache
+        self.observer = observer
+        self.journal_path = journal_path
+        self.slide_count = 0
+        self.resumed_slides = 0
+        self.skipped_images: List[Tuple[str, str]] = []
+        self._generator = None
+        self._cancel_event = threading.Event()
+
+    def cancel(self) -> None:
+        """Stop before the next slide; build raises GenerationCancelled.
+
+        The deck and journal stay at the last checkpoint, ready to resume.
+        """
+        self._cancel_event.set()
+        if self._generator is not None:
+            self._generator.cancel()
+
+    def reset_cancel(self) -> None:
+        """Forget an earlier cancel(); call it before starting a new build."""
+        self._cancel_event.clear()
+
+    def build(
+        self,
+        images: Iterable[Pathlike],
+        output_path: Pathlike,
+        override: bool = True,
+    ) -> int:
+        """Build or resume a deck of images at output_path; returns its slide count.
+
+        The count includes slides added by earlier, interrupted runs. Without
+        override, slides are added to an existing deck; the deck as it was
+        is the first checkpoint.
+        """
+        if self.settings.skip_existing_images:
+            # What is already in the deck changes at every checkpoint, so a
+            # resumed run could not plan the same slides again.
+            raise ValueError("skip_existing_images cannot be combined with checkpoints")
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        images = [Path(image) for image in images]
+        journal = self._open_journal(images, output_path, override)
+        self.resumed_slides = journal.slides_done
+
+        settings = copy.copy(self.settings)
+        settings.append_in_place = True
+        generator = PPTXGenerator(settings, self.image_cache, self.observer)
+        generator.create_presentation(output_path, override=journal.deck_bytes is None)
+        self._generator = generator
+
+        planned = islice(generator.plan_slides(images), journal.slides_done, None)
+        interval = self.settings.checkpoint_slides or DEFAULT_CHECKPOINT_SLIDES
+        while batch := list(islice(planned, interval)):
+            if self._cancel_event.is_set():
+                raise GenerationCancelled()
+            generator.add_slides(batch)
+            generator.save_presentation(output_path)
+            if journal.deck_bytes is None:
+                # The first save wrote a whole deck; later ones append to it.
+                generator.create_presentation(output_path)
+            journal.slides_done += len(batch)
+            journal.skipped = list(generator.skipped_images)
+            with stage(self.observer, "checkpoint"):
+                journal.checkpoint(output_path)
+
+        if journal.deck_bytes is None:
+            generator.save_presentation(output_path)
+        self.slide_count = journal.slides_done
+        self.skipped_images = list(generator.skipped_images)
+        journal.remove()
+        return self.slide_count
+
+    def _open_journal(
+        self, images: List[Path], output_path: Path, override: bool
+    ) -> BuildJournal:
+        journal_path = Path(
+            self.journal_path
+            or output_path.with_name(output_path.name + JOURNAL_SUFFIX)
+        )
+        fingerprint = build_fingerprint(images, self.settings)
+        journal = BuildJournal.load(journal_path)
+        if journal is not None:
+            if journal.fingerprint == fingerprint and journal.restore(output_path):
+                return journal
+            if not override and output_path.exists():
+                # The deck may hold part of another build; adding to it
+                # would silently duplicate or mix slides.
+                raise ValueError(
+                    f"Cannot resume {output_path}: {journal_path} belongs to a "
+                    f"different build or its checkpoint does not match the deck"
+                )
+            journal.remove()
+
+        journal = BuildJournal(journal_path, fingerprint)
+        if not override and output_path.exists():
+            journal.checkpoint(output_path)
+        return journal
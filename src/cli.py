@@ -0,0 +1,335 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from checkpointed_build import CheckpointedGenerator
+from generation_stats import GenerationStats, profiled
+from image_cache import ImageCache
+from image_index import probe_image
+from incremental_build import IncrementalGenerator
+from memory_budget import parse_bytes
+from pptx_generator import PPTXGenerator
+from pptx_settings import PPTXSettings, Pathlike
+from sharded_build import ShardedGenerator
+
+ORDERINGS = ("glob", "name", "path", "mtime", "captured")
+CSV_LIST_SEPARATOR = ";"
+DeckSpec = Dict[str, Any]
+
+
+def _parse_csv_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def _read_csv_manifest(manifest_path: Path) -> List[DeckSpec]:
+    """Read one deck per row.
+
+    The output, images, order, override and incremental columns describe the
+    deck; images holds ';'-separated globs. Any other non-empty column is a
+    settings override.
+    """
+    import csv
+
+    decks = []
+    with open(manifest_path, newline="") as f:
+        for row in csv.DictReader(f):
+            deck = {"settings": {}}
+            for column, value in row.items():
+                if value is None or value == "":
+                    continue
+                if column == "images":
+                    deck["images"] = value.split(CSV_LIST_SEPARATOR)
+                elif column in ("output", "order"):
+                    deck[column] = value
+                elif column in ("override", "incremental"):
+                    deck[column] = _parse_csv_value(value.lower())
+                else:
+                    deck["settings"][column] = _parse_csv_value(value)
+            decks.append(deck)
+    return decks
+
+
+def read_manifest(manifest_path: Pathlike) -> List[DeckSpec]:
+    """Load deck specs from a JSON, TOML or CSV manifest.
+
+    JSON and TOML manifests hold a list of decks under "decks" (JSON may also be
+    a bare list). Relative output and image paths are resolved against the
+    manifest's directory.
+    """
+    manifest_path = Path(manifest_path)
+    suffix = manifest_path.suffix.lower()
+    if suffix == ".json":
+        data = json.loads(manifest_path.read_text())
+        decks = data if isinstance(data, list) else data["decks"]
+    elif suffix == ".toml":
+        import tomllib
+
+        decks = tomllib.loads(manifest_path.read_text())["decks"]
+    elif suffix == ".csv":
+        decks = _read_csv_manifest(manifest_path)
+    else:
+        raise ValueError(f"Unsupported manifest format: {manifest_path.suffix}")
+
+    base_dir = manifest_path.parent
+    for deck in decks:
+        if "output" not in deck or "images" not in deck:
+            raise ValueError(f"Deck entries need 'output' and 'images': {deck}")
+        if isinstance(deck["images"], str):
+            deck["images"] = [deck["images"]]
+        deck["output"] = str(base_dir / deck["output"])
+        deck["images"] = [str(base_dir / pattern) for pattern in deck["images"]]
+    return decks
+
+
+def collect_images(patterns: List[str], order: str = "glob") -> List[Path]:
+    """Expand globs in the given order, dropping files matched more than once."""
+    if order not in ORDERINGS:
+        raise ValueError(f"Unknown order '{order}', expected one of {ORDERINGS}")
+
+    images = []
+    for pattern in patterns:
+        images.extend(sorted(glob.glob(pattern, recursive=True)))
+    images = [Path(image) for image in dict.fromkeys(images) if os.path.isfile(image)]
+
+    if order == "name":
+        images.sort(key=lambda image: (image.name.lower(), str(image)))
+    elif order == "path":
+        images.sort()
+    elif order == "mtime":
+        images.sort(key=lambda image: image.stat().st_mtime_ns)
+    elif order == "captured":
+        infos = {image: probe_image(image) for image in images}
+        images.sort(
+            key=lambda image: infos[image].captured or infos[image].mtime_ns / 1e9
+        )
+    return images
+
+
+def build_deck(
+    deck: DeckSpec,
+    cache_dir: Pathlike = None,
+    collect_stats: bool = False,
+    profile_dir: Pathlike = None,
+    trace_memory: bool = False,
+) -> Dict[str, Any]:
+    """Build one deck and return its report entry; never raises."""
+    start = time.perf_counter()
+    report = {"output": deck["output"], "status": "ok", "images": 0, "slides": 0}
+    stats = GenerationStats() if collect_stats else None
+    try:
+        settings = PPTXSettings()
+        settings.update(deck.get("settings", {}))
+        images = collect_images(deck["images"], deck.get("order", "glob"))
+        if not images:
+            raise ValueError(f"No images matched {deck['images']}")
+        observer = stats
+        if observer is None and settings.max_memory:
+            # The memory peak is reported without --stats too.
+            observer = GenerationStats(record_images=False)
+
+        profile_path = None
+        if profile_dir:
+            profile_path = Path(profile_dir) / f"{Path(deck['output']).stem}.prof"
+        with profiled(observer or GenerationStats(), profile_path, trace_memory):
+            if deck.get("incremental"):
+                if settings.shard_slides or settings.checkpoint_slides:
+                    raise ValueError(
+                        "incremental decks cannot use shard_slides or checkpoint_slides"
+                    )
+                incremental = IncrementalGenerator(settings, cache_dir, observer)
+                slides = incremental.build(images, deck["output"])
+                skipped = incremental.skipped_images
+                report["rebuilt_slides"] = incremental.rebuilt_slides
+            elif settings.shard_slides or settings.max_deck_bytes:
+                if settings.checkpoint_slides:
+                    raise ValueError(
+                        "checkpoint_slides cannot be combined with "
+                        "shard_slides or max_deck_bytes"
+                    )
+                sharded = ShardedGenerator(settings, cache_dir, observer)
+                outputs = sharded.build(
+                    images, deck["output"], deck.get("override", True)
+                )
+                slides, skipped = sharded.slide_count, sharded.skipped_images
+                if outputs != [Path(deck["output"])]:
+                    report["outputs"] = [str(output) for output in outputs]
+            elif settings.checkpoint_slides:
+                slides, skipped = _build_checkpointed(
+                    deck, images, settings, cache_dir, observer
+                )
+            else:
+                slides, skipped = _build_serial(
+                    deck, images, settings, cache_dir, observer
+                )
+
+        report["images"] = len(images)
+        report["slides"] = slides
+        if observer is not None and observer.memory_peak_bytes:
+            report["memory_peak_bytes"] = observer.memory_peak_bytes
+        if skipped:
+            report["skipped"] = [
+                {"path": path, "error": error} for path, error in skipped
+            ]
+    except Exception as e:
+        report["status"] = "failed"
+        report["error"] = f"{type(e).__name__}: {e}"
+        report["traceback"] = traceback.format_exc()
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    if stats is not None:
+        report["stats"] = stats.to_dict()
+    return report
+
+
+def _build_serial(
+    deck: DeckSpec,
+    images: List[Path],
+    settings: PPTXSettings,
+    cache_dir: Pathlike,
+    stats: Optional[GenerationStats],
+) -> Tuple[int, List[Tuple[str, str]]]:
+    image_cache = ImageCache(cache_dir) if cache_dir else None
+    try:
+        generator = PPTXGenerator(settings, image_cache, stats)
+        generator.create_presentation(deck["output"], deck.get("override", True))
+        slides_before = len(generator.presentation.slides)
+        generator.add_images(images)
+        slides = len(generator.presentation.slides) - slides_before
+        Path(deck["output"]).parent.mkdir(parents=True, exist_ok=True)
+        generator.save_presentation(deck["output"])
+    finally:
+        if image_cache is not None:
+            image_cache.close()
+    return slides, generator.skipped_images
+
+
+def _build_checkpointed(
+    deck: DeckSpec,
+    images: List[Path],
+    settings: PPTXSettings,
+    cache_dir: Pathlike,
+    stats: Optional[GenerationStats],
+) -> Tuple[int, List[Tuple[str, str]]]:
+    image_cache = ImageCache(cache_dir) if cache_dir else None
+    try:
+        builder = CheckpointedGenerator(settings, image_cache, stats)
+        slides = builder.build(images, deck["output"], deck.get("override", True))
+    finally:
+        if image_cache is not None:
+            image_cache.close()
+    return slides, builder.skipped_images
+
+
+def build_decks(
+    decks: List[DeckSpec], jobs: int = 1, cache_dir: Pathlike = None, **options
+) -> List[Dict[str, Any]]:
+    """Build decks on up to jobs worker processes; reports follow manifest order.
+
+    Extra keyword options are passed on to build_deck.
+    """
+    if jobs == 1:
+        return [build_deck(deck, cache_dir, **options) for deck in decks]
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    for deck in decks:
+        deck.setdefault("settings", {}).setdefault("preprocess_workers", 1)
+
+    reports = [None] * len(decks)
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = {
+            executor.submit(build_deck, deck, cache_dir, **options): i
+            for i, deck in enumerate(decks)
+        }
+        for future in as_completed(futures):
+            reports[futures[future]] = future.result()
+    return reports
+
+
+def print_report(reports: List[Dict[str, Any]], verbose: bool = False) -> None:
+    for report in reports:
+        line = (
+            f"{report['status'].upper():6} {report['output']} "
+            f"({report['images']} images, {report['slides']} slides, "
+            f"{report['seconds']:.2f}s)"
+        )
+        if report["status"] != "ok":
+            line += f": {report['error']}"
+        elif "rebuilt_slides" in report:
+            line += f", {report['rebuilt_slides']} slides rebuilt"
+        if "memory_peak_bytes" in report:
+            line += f", image data peak {report['memory_peak_bytes'] / 1e6:.1f} MB"
+        print(line)
+        for output in report.get("outputs", []):
+            print(f"       {output}")
+        for skipped in report.get("skipped", []):
+            print(f"       skipped {skipped['path']}: {skipped['error']}")
+        if verbose and "traceback" in report:
+            print(report["traceback"], file=sys.stderr)
+        if "stats" in report and report["status"] == "ok":
+            print(GenerationStats.from_dict(report["stats"]).summary())
+
+    failed = sum(report["status"] != "ok" for report in reports)
+    print(f"{len(reports) - failed} succeeded, {failed} failed")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build PowerPoint decks of images from a JSON, TOML or CSV manifest"
+    )
+    parser.add_argument("manifest", type=Path)
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="decks to build in parallel"
+    )
+    parser.add_argument("--cache-dir", type=Path, help="persistent image cache")
+    parser.add_argument("--report", type=Path, help="write the report as JSON")
+    parser.add_argument(
+        "--stats", action="store_true", help="print per-stage timings for each deck"
+    )
+    parser.add_argument(
+        "--profile-dir", type=Path, help="write a cProfile dump per deck here"
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="record tracemalloc peaks"
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=parse_bytes,
+        metavar="SIZE",
+        help="image data to keep in memory at once, e.g. 512M, shared by the jobs",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    decks = read_manifest(args.manifest)
+    if args.max_memory:
+        budget = args.max_memory // max(1, min(args.jobs, len(decks)))
+        for deck in decks:
+            deck.setdefault("settings", {}).setdefault("max_memory", budget)
+    if args.profile_dir:
+        args.profile_dir.mkdir(parents=True, exist_ok=True)
+    reports = build_decks(
+        decks,
+        max(1, args.jobs),
+        args.cache_dir,
+        collect_stats=args.stats or args.trace_memory,
+        profile_dir=args.profile_dir,
+        trace_memory=args.trace_memory,
+    )
+    print_report(reports, args.verbose)
+    if args.report:
+        args.report.write_text(json.dumps(reports, indent=2))
+
+    return 0 if all(report["status"] == "ok" for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
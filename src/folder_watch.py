@@ -0,0 +1,261 @@
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from generation_stats import GenerationObserver
+from image_cache import ImageCache
+from image_index import IMAGE_EXTENSIONS
+from pptx_generator import PPTXGenerator
+from pptx_settings import PPTXSettings, Pathlike
+
+DEFAULT_INTERVAL = 60.0
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_PARTIAL_AFTER = 600.0
+DEFAULT_POLL_SECONDS = 1.0
+STATE_SUFFIX = ".watched"
+# A folder listed within this long of its mtime may change again without its
+# mtime changing, as filesystems keep timestamps at clock-tick resolution.
+MTIME_RESOLUTION_NS = 1_000_000_000
+
+
+class FolderWatcher:
+    """Appends images dropped into a folder to a deck as they arrive.
+
+    The folder is polled: it is only listed again when its mtime changes,
+    and only names not seen before are stat'ed. A file is taken once its
+    size and mtime have not changed for settle_seconds, so files still being
+    written are left alone. Every interval seconds the images taken so far
+    are planned onto slides and the full slides are appended to the deck in
+    place; an underfilled last slide waits for more images until its oldest
+    image has waited partial_after seconds.
+
+    Names added to the deck, or skipped as unreadable or, with
+    settings.skip_existing_images, as already in the deck, are appended to
+    <deck>.watched, so a restarted watcher carries on where it stopped.
+    """
+
+    def __init__(
+        self,
+        folder: Pathlike,
+        output_path: Pathlike,
+        settings: Optional[PPTXSettings] = None,
+        image_cache: Optional[ImageCache] = None,
+        observer: Optional[GenerationObserver] = None,
+        interval: float = DEFAULT_INTERVAL,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        partial_after: float = DEFAULT_PARTIAL_AFTER,
+    ):
+        self.folder = Path(folder)
+        self.output_path = Path(output_path)
+        self.state_path = self.output_path.with_name(
+            self.output_path.name + STATE_SUFFIX
+        )
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self.partial_after = partial_after
+        self.image_count = 0
+        self.slide_count = 0
+        self.skipped_images: List[Tuple[str, str]] = []
+
+        # A watcher must outlive bad files, and rewriting the deck on every
+        # update would make each one cost as much as the whole deck so far.
+        self.settings = copy.copy(settings or PPTXSettings())
+        self.settings.bad_images = "skip"
+        self.settings.append_in_place = True
+        self.generator = PPTXGenerator(self.settings, image_cache, observer)
+        self.generator.create_presentation(self.output_path)
+
+        self._seen: Set[str] = set()
+        if self.state_path.exists():
+            self._seen.update(self.state_path.read_text().splitlines())
+        self._candidates: Dict[str, Tuple[int, int, float]] = {}
+        self._ready: Dict[str, float] = {}
+        self._folder_mtime = None
+        self._last_flush = None
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        """Make run return after writing the images already taken."""
+        self._stop_event.set()
+
+    def run(self, poll_seconds: float = DEFAULT_POLL_SECONDS) -> None:
+        """Poll and update the deck until stop() is called."""
+        self._stop_event.clear()
+        while not self._stop_event.is_set():
+            self.poll()
+            self._stop_event.wait(poll_seconds)
+        self.flush(force=True)
+
+    def poll(self, now: Optional[float] = None) -> int:
+        """Scan the folder, and update the deck if interval has passed.
+
+        Returns the number of slides added.
+        """
+        now = time.monotonic() if now is None else now
+        self.scan(now)
+        if self._last_flush is None:
+            self._last_flush = now
+        if now - self._last_flush < self.interval:
+            return 0
+        return self.flush(now)
+
+    def scan(self, now: Optional[float] = None) -> None:
+        """Take files that have finished being written."""
+        now = time.monotonic() if now is None else now
+        folder_mtime = self.folder.stat().st_mtime_ns
+        if folder_mtime != self._folder_mtime:
+            listed_ns = time.time_ns()
+            with os.scandir(self.folder) as entries:
+                names = {
+                    entry.name
+                    for entry in entries
+                    if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+                }
+            for name in names - self._seen - self._ready.keys():
+                self._candidates.setdefault(name, (-1, -1, now))
+            for name in self._candidates.keys() - names:
+                del self._candidates[name]
+            if listed_ns - folder_mtime > MTIME_RESOLUTION_NS:
+                self._folder_mtime = folder_mtime
+
+        for name in sorted(self._candidates):
+            try:
+                stat = (self.folder / name).stat()
+            except OSError:
+                del self._candidates[name]
+                continue
+            size, mtime_ns, since = self._candidates[name]
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                self._candidates[name] = (stat.st_size, stat.st_mtime_ns, now)
+            elif stat.st_size and now - since >= self.settle_seconds:
+                del self._candidates[name]
+                self._ready[name] = now
+
+    def flush(self, now: Optional[float] = None, force: bool = False) -> int:
+        """Append the taken images' full slides to the deck; returns slides added.
+
+        With force, or once its oldest image has waited partial_after
+        seconds, an underfilled last slide is written too.
+        """
+        now = time.monotonic() if now is None else now
+        self._last_flush = now
+        if not self._ready:
+            return 0
+
+        slides = list(
+            self.generator.plan_slides(self.folder / name for name in self._ready)
+        )
+        if slides and not force:
+            last = [Path(image).name for image in slides[-1].images]
+            oldest = min(self._ready[name] for name in last)
+            if (
+                len(last) < self.settings.images_per_slide
+                and now - oldest < self.partial_after
+            ):
+                slides.pop()
+
+        skipped = [Path(path).name for path, _ in self.generator.skipped_images]
+        skipped += [Path(path).name for path in self.generator.existing_images]
+        added = [Path(image).name for slide in slides for image in slide.images]
+        if slides:
+            self.generator.add_slides(slides)
+            new_deck = not self.output_path.exists()
+            self.generator.save_presentation(self.output_path)
+            if new_deck:
+                # The first save wrote a whole deck; later ones append to it.
+                self.generator.create_presentation(self.output_path)
+        self._record(added + skipped)
+
+        self.image_count += len(added)
+        self.slide_count += len(slides)
+        self.skipped_images.extend(self.generator.skipped_images)
+        return len(slides)
+
+    def _record(self, names: List[str]) -> None:
+        if not names:
+            return
+        with open(self.state_path, "a") as f:
+            f.writelines(f"{name}\n" for name in names)
+            f.flush()
+            os.fsync(f.fileno())
+        self._seen.update(names)
+        for name in names:
+            del self._ready[name]
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Append images dropped into a folder to a deck as they arrive"
+    )
+    parser.add_argument("folder", type=Path)
+    parser.add_argument("output", type=Path)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help="seconds between deck updates",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE_SECONDS,
+        help="seconds a file must stay unchanged before it is added",
+    )
+    parser.add_argument(
+        "--partial-after",
+        type=float,
+        default=DEFAULT_PARTIAL_AFTER,
+        help="seconds before an underfilled slide is written anyway",
+    )
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS)
+    parser.add_argument("--cache-dir", type=Path, help="persistent image cache")
+    parser.add_argument(
+        "--setting",
+        action="append",
+        default=[],
+        metavar="NAME=JSON",
+        help="PPTXSettings override, e.g. rounded=true",
+    )
+    args = parser.parse_args(argv)
+
+    settings = PPTXSettings()
+    for setting in args.setting:
+        name, value = setting.split("=", 1)
+        settings.update({name: json.loads(value)})
+
+    image_cache = ImageCache(args.cache_dir) if args.cache_dir else None
+    watcher = FolderWatcher(
+        args.folder,
+        args.output,
+        settings,
+        image_cache,
+        interval=args.interval,
+        settle_seconds=args.settle,
+        partial_after=args.partial_after,
+    )
+    try:
+        while True:
+            slides = watcher.poll()
+            if slides:
+                print(
+                    f"{time.strftime('%H:%M:%S')} added {slides} slides, "
+                    f"{watcher.slide_count} so far"
+                )
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        watcher.flush(force=True)
+        print(f"stopped; added {watcher.slide_count} slides")
+    finally:
+        if image_cache is not None:
+            image_cache.close()
+    for path, error in watcher.skipped_images:
+        print(f"skipped {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+
+from pptx_settings import Pathlike
+
+NULL_STAGE = nullcontext()
+TRACEMALLOC_TOP_LINES = 10
+STATS_KEYS = (
+    "stages",
+    "images",
+    "image_bytes",
+    "slides",
+    "per_image",
+    "skipped",
+    "reused_images",
+    "existing_skipped",
+    "memory_peak_bytes",
+)
+
+
+class GenerationObserver:
+    """Receives events from PPTXGenerator; override the methods you need."""
+
+    def stage_finished(self, name: str, seconds: float) -> None:
+        pass
+
+    def image_added(self, name: str, nbytes: int) -> None:
+        pass
+
+    def slide_added(self, slides_done: int) -> None:
+        pass
+
+    def image_skipped(self, name: str, error: str) -> None:
+        pass
+
+    def image_reused(self, name: str) -> None:
+        pass
+
+    def existing_image_skipped(self, name: str) -> None:
+        pass
+
+    def memory_peak(self, nbytes: int) -> None:
+        pass
+
+
+class _StageTimer:
+    __slots__ = ("observer", "name", "start")
+
+    def __init__(self, observer: GenerationObserver, name: str):
+        self.observer = observer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.observer.stage_finished(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(observer: Optional[GenerationObserver], name: str):
+    """Time a block as stage name, or do nothing when there is no observer."""
+    if observer is None:
+        return NULL_STAGE
+    return _StageTimer(observer, name)
+
+
+class GenerationStats(GenerationObserver):
+    """Per-stage durations and image byte counts for one or more runs."""
+
+    def __init__(self, record_images: bool = True):
+        self.record_images = record_images
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.images = []
+        self.image_count = 0
+        self.image_bytes = 0
+        self.slides = 0
+        self.skipped = []
+        self.reused_images = 0
+        self.existing_skipped = 0
+        self.memory_peak_bytes = 0
+        self.extra: Dict[str, Any] = {}
+
+    def stage_finished(self, name: str, seconds: float) -> None:
+        totals = self.stages.setdefault(name, {"count": 0, "seconds": 0.0})
+        totals["count"] += 1
+        totals["seconds"] += seconds
+
+    def image_added(self, name: str, nbytes: int) -> None:
+        self.image_count += 1
+        self.image_bytes += nbytes
+        if self.record_images:
+            self.images.append({"name": name, "bytes": nbytes})
+
+    def slide_added(self, slides_done: int) -> None:
+        self.slides += 1
+
+    def image_skipped(self, name: str, error: str) -> None:
+        self.skipped.append({"name": name, "error": error})
+
+    def image_reused(self, name: str) -> None:
+        self.reused_images += 1
+
+    def existing_image_skipped(self, name: str) -> None:
+        self.existing_skipped += 1
+
+    def memory_peak(self, nbytes: int) -> None:
+        self.memory_peak_bytes = max(self.memory_peak_bytes, nbytes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": {
+                name: {"count": totals["count"], "seconds": round(totals["seconds"], 6)}
+                for name, totals in self.stages.items()
+            },
+            "images": self.image_count,
+            "image_bytes": self.image_bytes,
+            "slides": self.slides,
+            "per_image": self.images,
+            "skipped": self.skipped,
+            "reused_images": self.reused_images,
+            "existing_skipped": self.existing_skipped,
+            "memory_peak_bytes": self.memory_peak_bytes,
+            **self.extra,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GenerationStats":
+        stats = cls()
+        stats.stages = {name: dict(totals) for name, totals in data["stages"].items()}
+        stats.image_count = data["images"]
+        stats.image_bytes = data["image_bytes"]
+        stats.slides = data["slides"]
+        stats.images = list(data["per_image"])
+        stats.skipped = list(data.get("skipped", []))
+        stats.reused_images = data.get("reused_images", 0)
+        stats.existing_skipped = data.get("existing_skipped", 0)
+        stats.memory_peak_bytes = data.get("memory_peak_bytes", 0)
+        stats.extra = {
+            key: value for key, value in data.items() if key not in STATS_KEYS
+        }
+        return stats
+
+    def to_json(self, path: Optional[Pathlike] = None) -> str:
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<14}{'count':>8}{'seconds':>12}"]
+        for name, totals in self.stages.items():
+            lines.append(f"{name:<14}{totals['count']:>8}{totals['seconds']:>12.4f}")
+        lines.append(
+            f"{self.image_count} images, {self.image_bytes / 1e6:.2f} MB, "
+            f"{self.slides} slides"
+        )
+        if self.skipped:
+            lines.append(f"{len(self.skipped)} images skipped")
+        if self.reused_images or self.existing_skipped:
+            lines.append(
+                f"{self.reused_images} images reused from the deck, "
+                f"{self.existing_skipped} already in the deck skipped"
+            )
+        if self.memory_peak_bytes:
+            lines.append(f"image data peak {self.memory_peak_bytes / 1e6:.2f} MB")
+        if "tracemalloc_peak_bytes" in self.extra:
+            lines.append(
+                f"tracemalloc peak {self.extra['tracemalloc_peak_bytes'] / 1e6:.2f} MB"
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def profiled(
+    stats: GenerationStats,
+    profile_path: Optional[Pathlike] = None,
+    trace_memory: bool = False,
+):
+    """Capture a cProfile dump and/or tracemalloc peak for the enclosed run."""
+    import cProfile
+    import tracemalloc
+
+    profiler = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield stats
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(profile_path))
+            stats.extra["profile"] = str(profile_path)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            stats.extra["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            stats.extra["tracemalloc_top"] = [
+                str(statistic)
+                for statistic in snapshot.statistics("lineno")[:TRACEMALLOC_TOP_LINES]
+            ]
+            tracemalloc.stop()
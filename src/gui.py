@@ -1,28 +1,87 @@
+import queue
+import threading
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Collection, List, Optional
 
-from PIL import Image
 import customtkinter as ctk
 from CTkToolTip import CTkToolTip
 from tkinter import filedialog, messagebox, ttk
 
-from pptx_generator import PPTXGenerator
+from generation_stats import GenerationObserver
+from image_index import ImageInfo, info_problem, probe_image
+from image_list_model import SORT_KEYS, ImageListModel
+from image_packer import DEFAULT_ASPECT
+from pptx_generator import GenerationCancelled, PPTXGenerator
+from pptx_media import PIL_FORMAT_EXTS
 from pptx_settings import PPTXSettings
+from slide_preview import SlidePreview
+from thumbnail_cache import ThumbnailCache
+
+PROGRESS_POLL_MS = 50
+PREVIEW_SIZE = (200, 200)
+PREFETCH_NEIGHBORS = 3
+SLIDE_PREVIEW_WIDTH = 320
+SLIDE_PREVIEW_DEBOUNCE_MS = 150
+SORT_WORKERS = 8
+PROBE_WORKERS = 8
+PROBE_CHUNK_ROWS = 64
+# Probe results applied to the Treeview per poll, so big additions stay responsive.
+PROBE_ROWS_PER_TICK = 500
+# Rows inserted into the Treeview per tick when many images are selected at once.
+INSERT_ROWS_PER_TICK = 500
+MAX_LISTED_PROBLEMS = 10
+BAD_ROW_COLOR = "#c0392b"
+MODIFIER_MASK = 0x0001 | 0x0004  # Shift, Control
+THUMBNAIL_DIR = Path.home() / ".cache" / "powerpoint-image-organizer" / "thumbnails"
+
+
+class ProgressObserver(GenerationObserver):
+    """Forwards slide progress from the worker thread to the Tk thread."""
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+
+    def slide_added(self, slides_done: int) -> None:
+        self.events.put(("progress", slides_done))
 
 
 class PPTXGeneratorGUI:
     def __init__(self):
         self.root = ctk.CTk()
         self.root.title("PPTX Generator")
-        self.root.geometry("950x750")
+        self.root.geometry("950x900")
 
         self.pptx_generator = PPTXGenerator()
         self.settings = PPTXSettings()
-        self.selected_images: List[Path] = []
+        self.image_list = ImageListModel()
+        self.drag_active = False
+        self.drag_moved = False
+        self.sort_results = queue.Queue()
+        self.probe_executor = ThreadPoolExecutor(PROBE_WORKERS)
+        self.probe_results = queue.Queue()
+        self.probe_job = None
+        self.rows_to_insert = deque()
+        self.insert_job = None
         self.current_presentation_path = None
+        self.generation_events = queue.Queue()
+        self.generation_thread = None
+        self.total_slides = 0
+        self.thumbnails = ThumbnailCache(PREVIEW_SIZE, disk_dir=THUMBNAIL_DIR)
+        self.slide_preview = SlidePreview(self.thumbnails)
+        self.preview_slide = 0
+        self.preview_focus = None
+        self.preview_job = None
+        self.thumbnail_futures = []
 
         self.create_widgets()
 
+    @property
+    def selected_images(self) -> List[Path]:
+        return self.image_list.paths
+
     def create_widgets(self):
         # Main frame
         main_frame = ctk.CTkFrame(self.root)
@@ -64,22 +123,32 @@ class PPTXGeneratorGUI:
             "Enter the path to an existing presentation or a new file name",
         )
 
-        file_btn = ctk.CTkButton(
+        self.file_btn = ctk.CTkButton(
             file_frame, text="Browse", command=self.select_presentation_file
         )
-        file_btn.pack(side=ctk.LEFT)
+        self.file_btn.pack(side=ctk.LEFT)
 
         # Override/Append option
         self.override_var = ctk.BooleanVar(value=True)
-        override_checkbox = ctk.CTkCheckBox(
+        self.override_checkbox = ctk.CTkCheckBox(
             parent, text="Override existing presentation", variable=self.override_var
         )
-        override_checkbox.pack(pady=(0, 10))
+        self.override_checkbox.pack(pady=(0, 10))
         self.create_tooltip(
-            override_checkbox,
+            self.override_checkbox,
             "If checked, will override the existing presentation. If unchecked, will append to it.",
         )
 
+        self.skip_existing = ctk.BooleanVar(value=False)
+        self.skip_existing_checkbox = ctk.CTkCheckBox(
+            parent, text="Skip images already in the deck", variable=self.skip_existing
+        )
+        self.skip_existing_checkbox.pack(pady=(0, 10))
+        self.create_tooltip(
+            self.skip_existing_checkbox,
+            "When appending, leave out images whose files are already embedded in the presentation.",
+        )
+
         # Margins
         margins_frame = ctk.CTkFrame(parent)
         margins_frame.pack(fill=ctk.X, pady=(0, 10))
@@ -146,55 +215,175 @@ class PPTXGeneratorGUI:
         self.color.insert(0, "#{:02x}{:02x}{:02x}".format(*self.settings.color))
         self.create_tooltip(self.color, "Color in hex format (e.g., #FF0000 for red)")
 
+        # Images per slide
+        per_slide_frame = ctk.CTkFrame(parent)
+        per_slide_frame.pack(fill=ctk.X, pady=(0, 10))
+
+        ctk.CTkLabel(per_slide_frame, text="Images per slide:").pack(
+            side=ctk.LEFT, padx=5, pady=5
+        )
+        self.images_per_slide = ctk.CTkEntry(per_slide_frame, width=50)
+        self.images_per_slide.pack(side=ctk.LEFT, padx=5, pady=5)
+        self.images_per_slide.insert(0, str(self.settings.images_per_slide))
+        self.create_tooltip(
+            self.images_per_slide,
+            "Maximum images on each slide, laid out in a grid (e.g. 4, 6, 9, 12, 16)",
+        )
+
         # Rounded corners
         self.rounded = ctk.CTkCheckBox(parent, text="Rounded Corners")
         self.rounded.pack(pady=(0, 10))
         self.rounded.select() if self.settings.rounded else self.rounded.deselect()
         self.create_tooltip(self.rounded, "Enable rounded corners for images")
 
+        # Aspect-ratio packing
+        self.keep_aspect = ctk.CTkCheckBox(parent, text="Keep Aspect Ratio")
+        self.keep_aspect.pack(pady=(0, 10))
+        (
+            self.keep_aspect.select()
+            if self.settings.packing == "aspect"
+            else self.keep_aspect.deselect()
+        )
+        self.create_tooltip(
+            self.keep_aspect,
+            "Pack images into rows by their shape instead of stretching them to a grid",
+        )
+
+        # Downsampling
+        downsample_frame = ctk.CTkFrame(parent)
+        downsample_frame.pack(fill=ctk.X, pady=(0, 10))
+
+        self.downsample = ctk.CTkCheckBox(downsample_frame, text="Downsample to DPI:")
+        self.downsample.pack(side=ctk.LEFT, padx=5, pady=5)
+        (
+            self.downsample.deselect()
+            if self.settings.keep_originals
+            else self.downsample.select()
+        )
+        self.create_tooltip(
+            self.downsample,
+            "Resize and re-encode images to the given DPI at their placed size",
+        )
+        self.target_dpi = ctk.CTkEntry(downsample_frame, width=50)
+        self.target_dpi.pack(side=ctk.LEFT, padx=5, pady=5)
+        self.target_dpi.insert(0, str(self.settings.target_dpi))
+        self.create_tooltip(self.target_dpi, "Effective resolution of embedded images")
+
+        self.create_slide_preview(parent)
+
+    def create_slide_preview(self, parent):
+        ctk.CTkLabel(parent, text="Slide Preview", font=("Arial", 16, "bold")).pack(
+            pady=(0, 10)
+        )
+
+        nav_frame = ctk.CTkFrame(parent)
+        nav_frame.pack(fill=ctk.X, pady=(0, 10))
+        self.prev_slide_btn = ctk.CTkButton(
+            nav_frame,
+            text="<",
+            width=30,
+            command=lambda: self.show_slide(self.preview_slide - 1),
+        )
+        self.prev_slide_btn.pack(side=ctk.LEFT, padx=5, pady=5)
+        self.slide_label = ctk.CTkLabel(nav_frame, text="No images")
+        self.slide_label.pack(side=ctk.LEFT, expand=True)
+        self.next_slide_btn = ctk.CTkButton(
+            nav_frame,
+            text=">",
+            width=30,
+            command=lambda: self.show_slide(self.preview_slide + 1),
+        )
+        self.next_slide_btn.pack(side=ctk.RIGHT, padx=5, pady=5)
+
+        self.slide_preview_label = ctk.CTkLabel(parent, text="")
+        self.slide_preview_label.pack()
+
+        for entry in (
+            self.top_margin,
+            self.left_margin,
+            self.right_margin,
+            self.bottom_margin,
+            self.h_center_margin,
+            self.v_center_margin,
+            self.line_width,
+            self.color,
+            self.images_per_slide,
+        ):
+            entry.bind("<KeyRelease>", self.schedule_slide_preview, add="+")
+        for checkbox in (self.rounded, self.keep_aspect):
+            checkbox.configure(command=self.schedule_slide_preview)
+        # Re-encoded images may be in formats python-pptx cannot embed.
+        self.downsample.configure(command=self.refresh_statuses)
+
     def create_image_widgets(self, parent):
         ctk.CTkLabel(parent, text="Image Selection", font=("Arial", 16, "bold")).pack(
             pady=(0, 10)
         )
 
-        select_btn = ctk.CTkButton(
+        self.select_btn = ctk.CTkButton(
             parent, text="Add Images", command=self.select_images
         )
-        select_btn.pack(pady=(0, 10))
+        self.select_btn.pack(pady=(0, 10))
 
         self.image_listbox = ttk.Treeview(
-            parent, columns=("Order", "Filename"), show="headings", height=10
+            parent,
+            columns=("Order", "Filename", "Dimensions", "Size", "Status"),
+            show="headings",
+            height=10,
         )
-        self.image_listbox.heading("Order", text="Order")
-        self.image_listbox.heading("Filename", text="Filename")
-        self.image_listbox.column("Order", width=50)
-        self.image_listbox.column("Filename", width=200)
+        for column, width in (
+            ("Order", 50),
+            ("Filename", 200),
+            ("Dimensions", 90),
+            ("Size", 70),
+            ("Status", 160),
+        ):
+            self.image_listbox.heading(column, text=column)
+            self.image_listbox.column(column, width=width)
+        self.image_listbox.tag_configure("bad", foreground=BAD_ROW_COLOR)
         self.image_listbox.pack(fill=ctk.BOTH, expand=True, pady=(0, 10))
 
         self.image_listbox.bind("<<TreeviewSelect>>", self.on_image_select)
+        self.image_listbox.bind("<ButtonPress-1>", self.on_drag_start, add="+")
+        self.image_listbox.bind("<B1-Motion>", self.on_drag_motion)
+        self.image_listbox.bind("<ButtonRelease-1>", self.on_drag_release, add="+")
 
         button_frame = ctk.CTkFrame(parent)
         button_frame.pack(fill=ctk.X, pady=(0, 10))
 
-        move_up_btn = ctk.CTkButton(
+        self.move_up_btn = ctk.CTkButton(
             button_frame, text="Move Up", command=self.move_image_up
         )
-        move_up_btn.pack(side=ctk.LEFT, padx=(0, 5))
+        self.move_up_btn.pack(side=ctk.LEFT, padx=(0, 5))
 
-        move_down_btn = ctk.CTkButton(
+        self.move_down_btn = ctk.CTkButton(
             button_frame, text="Move Down", command=self.move_image_down
         )
-        move_down_btn.pack(side=ctk.LEFT, padx=(0, 5))
+        self.move_down_btn.pack(side=ctk.LEFT, padx=(0, 5))
 
-        delete_btn = ctk.CTkButton(
+        self.delete_btn = ctk.CTkButton(
             button_frame, text="Delete", command=self.delete_selected_image
         )
-        delete_btn.pack(side=ctk.LEFT, padx=(0, 5))
+        self.delete_btn.pack(side=ctk.LEFT, padx=(0, 5))
 
-        delete_all_btn = ctk.CTkButton(
+        self.delete_all_btn = ctk.CTkButton(
             button_frame, text="Delete All", command=self.delete_all_images
         )
-        delete_all_btn.pack(side=ctk.LEFT)
+        self.delete_all_btn.pack(side=ctk.LEFT)
+
+        sort_frame = ctk.CTkFrame(parent)
+        sort_frame.pack(fill=ctk.X, pady=(0, 10))
+
+        ctk.CTkLabel(sort_frame, text="Sort by:").pack(side=ctk.LEFT, padx=5)
+        self.sort_menu = ctk.CTkOptionMenu(
+            sort_frame, values=list(SORT_KEYS), command=self.sort_images
+        )
+        self.sort_menu.set("")
+        self.sort_menu.pack(side=ctk.LEFT)
+        self.create_tooltip(
+            self.sort_menu,
+            "Reorder all images by file name, modified time or EXIF date",
+        )
 
         preview_frame = ctk.CTkFrame(parent)
         preview_frame.pack(fill=ctk.BOTH, expand=True)
@@ -203,10 +392,30 @@ class PPTXGeneratorGUI:
         self.preview_label.pack()
 
     def create_action_buttons(self, parent):
-        generate_btn = ctk.CTkButton(
-            parent, text="Generate Presentation", command=self.generate_presentation
+        button_frame = ctk.CTkFrame(parent)
+        button_frame.pack(side=ctk.TOP, pady=10)
+
+        self.generate_btn = ctk.CTkButton(
+            button_frame,
+            text="Generate Presentation",
+            command=self.generate_presentation,
+        )
+        self.generate_btn.pack(side=ctk.LEFT, padx=(0, 5))
+
+        self.cancel_btn = ctk.CTkButton(
+            button_frame,
+            text="Cancel",
+            command=self.cancel_generation,
+            state="disabled",
         )
-        generate_btn.pack(side=ctk.TOP, pady=10)
+        self.cancel_btn.pack(side=ctk.LEFT)
+
+        self.progress_bar = ctk.CTkProgressBar(parent)
+        self.progress_bar.pack(side=ctk.TOP, fill=ctk.X, padx=20)
+        self.progress_bar.set(0)
+
+        self.status_label = ctk.CTkLabel(parent, text="")
+        self.status_label.pack(side=ctk.TOP)
 
     def select_presentation_file(self):
         file_path = filedialog.asksaveasfilename(
@@ -225,106 +434,512 @@ class PPTXGeneratorGUI:
             ("All files", "*.*"),
         )
         image_paths = filedialog.askopenfilenames(filetypes=filetypes)
-        new_images = [Path(path) for path in image_paths]
-        self.selected_images.extend(new_images)
-        self.update_image_listbox()
+        self.rows_to_insert.extend(Path(path) for path in image_paths)
+        if self.rows_to_insert and self.insert_job is None:
+            self.insert_rows()
+
+    def insert_rows(self):
+        """List the next INSERT_ROWS_PER_TICK selected images, then yield to Tk.
+
+        Rows join the image list as they are inserted, so the list and the
+        Treeview always hold the same rows.
+        """
+        self.insert_job = None
+        count = min(INSERT_ROWS_PER_TICK, len(self.rows_to_insert))
+        new_images = [self.rows_to_insert.popleft() for _ in range(count)]
+        first, last = self.image_list.extend(new_images)
+        rows = []
+        for index in range(first, last + 1):
+            row_id, path = self.image_list.ids[index], self.image_list.paths[index]
+            self.image_listbox.insert(
+                "",
+                "end",
+                iid=row_id,
+                values=(index + 1, path.name, "", "", "Checking"),
+            )
+            rows.append((row_id, path))
+        self.probe_images(rows)
+        if self.rows_to_insert:
+            self.insert_job = self.root.after(PROGRESS_POLL_MS, self.insert_rows)
+        else:
+            self.schedule_slide_preview()
+
+    def probe_images(self, rows):
+        """Read the headers of (row_id, path) rows on the probe threads."""
+        for start in range(0, len(rows), PROBE_CHUNK_ROWS):
+            self.probe_executor.submit(
+                self.probe_rows, rows[start : start + PROBE_CHUNK_ROWS]
+            )
+        if rows and self.probe_job is None:
+            self.probe_job = self.root.after(PROGRESS_POLL_MS, self.poll_probes)
+
+    def probe_rows(self, rows):
+        """Probe rows and queue the results; runs on a probe thread."""
+        for row_id, path in rows:
+            try:
+                info = probe_image(path)
+            except OSError as e:
+                info = ImageInfo(str(path), 0, 0, error=f"{type(e).__name__}: {e}")
+            self.probe_results.put((row_id, info))
+
+    def poll_probes(self):
+        self.probe_job = None
+        formats = self.embeddable_formats()
+        for _ in range(PROBE_ROWS_PER_TICK):
+            try:
+                row_id, info = self.probe_results.get_nowait()
+            except queue.Empty:
+                break
+            if row_id in self.image_list:
+                self.image_list.infos[row_id] = info
+                self.show_status(row_id, info, formats)
+
+        pending = self.image_list.pending()
+        if pending:
+            self.probe_job = self.root.after(PROGRESS_POLL_MS, self.poll_probes)
+        else:
+            self.schedule_slide_preview()
+        if self.generation_thread is None:
+            self.status_label.configure(
+                text=f"Checking {pending} images" if pending else ""
+            )
 
-    def update_image_listbox(self):
-        self.image_listbox.delete(*self.image_listbox.get_children())
-        for index, image in enumerate(self.selected_images, start=1):
-            self.image_listbox.insert("", "end", values=(index, image.name))
+    def show_status(
+        self, row_id: str, info: ImageInfo, formats: Optional[Collection[str]]
+    ):
+        problem = info_problem(info, formats)
+        self.image_listbox.set(
+            row_id, "Dimensions", f"{info.width} x {info.height}" if info.ok else ""
+        )
+        self.image_listbox.set(
+            row_id, "Size", format_bytes(info.size) if info.size else ""
+        )
+        self.image_listbox.set(row_id, "Status", problem or "OK")
+        self.image_listbox.item(row_id, tags=("bad",) if problem else ())
+
+    def refresh_statuses(self):
+        formats = self.embeddable_formats()
+        for row_id, info in self.image_list.infos.items():
+            self.show_status(row_id, info, formats)
+        self.schedule_slide_preview()
+
+    def embeddable_formats(self) -> Optional[Collection[str]]:
+        """Formats images can be in, or None when any readable image is re-encoded."""
+        return None if self.downsample.get() else PIL_FORMAT_EXTS
+
+    def usable_indices(self) -> List[int]:
+        formats = self.embeddable_formats()
+        return [
+            i
+            for i in range(len(self.image_list))
+            if self.image_list.problem(i, formats) is None
+        ]
+
+    def refresh_rows(self, first: int, last: int):
+        """Bring Treeview rows first..last in line with the image list."""
+        for index in range(first, last + 1):
+            row_id = self.image_list.ids[index]
+            self.image_listbox.move(row_id, "", index)
+            self.image_listbox.set(row_id, "Order", index + 1)
+        self.schedule_slide_preview()
+
+    def selected_indices(self) -> List[int]:
+        return sorted(
+            self.image_list.index(row_id) for row_id in self.image_listbox.selection()
+        )
 
     def on_image_select(self, event):
-        selected_item = self.image_listbox.selection()
-        if selected_item:
-            index = int(self.image_listbox.item(selected_item)["values"][0]) - 1
-            self.show_image_preview(self.selected_images[index])
+        selected_items = self.image_listbox.selection()
+        if selected_items:
+            index = self.image_list.index(
+                self.image_listbox.focus() or selected_items[0]
+            )
+            if self.image_list.problem(index, self.embeddable_formats()):
+                self.reset_image_preview()
+            else:
+                self.show_image_preview(self.selected_images[index])
+            neighbors = [
+                self.selected_images[i]
+                for offset in range(1, PREFETCH_NEIGHBORS + 1)
+                for i in (index + offset, index - offset)
+                if 0 <= i < len(self.selected_images)
+            ]
+            self.thumbnails.prefetch(neighbors)
+            self.preview_focus = index
+            self.schedule_slide_preview()
 
     def show_image_preview(self, image_path):
-        image = Image.open(image_path)
-        photo = ctk.CTkImage(image, size=(200, 200))
+        image = self.thumbnails.get(image_path)
+        photo = ctk.CTkImage(image, size=PREVIEW_SIZE)
         self.preview_label.configure(image=photo)
         self.preview_label.image = photo
 
     def move_image_up(self):
-        selected_item = self.image_listbox.selection()
-        if selected_item:
-            index = self.image_listbox.index(selected_item)
-            if index > 0:
-                self.selected_images[index], self.selected_images[index - 1] = (
-                    self.selected_images[index - 1],
-                    self.selected_images[index],
-                )
-                self.update_image_listbox()
-                self.image_listbox.selection_set(
-                    self.image_listbox.get_children()[index - 1]
-                )
+        self.move_selected_images(-1)
 
     def move_image_down(self):
-        selected_item = self.image_listbox.selection()
-        if selected_item:
-            index = self.image_listbox.index(selected_item)
-            if index < len(self.selected_images) - 1:
-                self.selected_images[index], self.selected_images[index + 1] = (
-                    self.selected_images[index + 1],
-                    self.selected_images[index],
-                )
-                self.update_image_listbox()
-                self.image_listbox.selection_set(
-                    self.image_listbox.get_children()[index + 1]
-                )
+        self.move_selected_images(1)
+
+    def move_selected_images(self, delta: int):
+        first, last = self.image_list.move_block(self.selected_indices(), delta)
+        self.refresh_rows(first, last)
+        selection = self.image_listbox.selection()
+        if selection:
+            self.image_listbox.see(selection[0] if delta < 0 else selection[-1])
+
+    def on_drag_start(self, event):
+        row_id = self.image_listbox.identify_row(event.y)
+        selection = self.image_listbox.selection()
+        self.drag_active = bool(row_id) and row_id in selection
+        self.drag_moved = False
+        if self.drag_active and len(selection) > 1 and not event.state & MODIFIER_MASK:
+            # Keep the multi-row selection so the whole block can be dragged.
+            return "break"
+
+    def on_drag_motion(self, event):
+        if self.drag_active and self.generation_thread is None:
+            self.drag_moved = True
+            self.image_listbox.configure(cursor="sb_v_double_arrow")
+            return "break"
+
+    def on_drag_release(self, event):
+        if not self.drag_active:
+            return
+        self.drag_active = False
+        self.image_listbox.configure(cursor="")
+        row_id = self.image_listbox.identify_row(event.y)
+        if not self.drag_moved:
+            if row_id:
+                self.image_listbox.selection_set(row_id)
+                self.image_listbox.focus(row_id)
+            return
+        if self.generation_thread is not None:
+            return
+
+        if row_id:
+            target = self.image_list.index(row_id)
+            if target > self.selected_indices()[-1]:
+                target += 1
+        else:
+            target = len(self.image_list)
+        first, last = self.image_list.move_to(self.selected_indices(), target)
+        self.refresh_rows(first, last)
+
+    def sort_images(self, sort_by: str):
+        if self.generation_thread is not None or not self.image_list.paths:
+            return
+        paths = list(self.image_list.paths)
+        self.status_label.configure(text=f"Sorting by {sort_by.lower()}")
+        self.sort_menu.configure(state="disabled")
+
+        def compute_keys():
+            try:
+                with ThreadPoolExecutor(SORT_WORKERS) as executor:
+                    keys = list(executor.map(SORT_KEYS[sort_by], paths))
+                self.sort_results.put((paths, keys))
+            except Exception as e:
+                self.sort_results.put((paths, e))
+
+        threading.Thread(target=compute_keys, daemon=True).start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_sort)
+
+    def poll_sort(self):
+        try:
+            paths, keys = self.sort_results.get_nowait()
+        except queue.Empty:
+            self.root.after(PROGRESS_POLL_MS, self.poll_sort)
+            return
+
+        if self.generation_thread is None:
+            # A generation started meanwhile keeps the menu locked and owns
+            # the status line until it finishes.
+            self.sort_menu.configure(state="normal")
+            self.status_label.configure(text="")
+        if isinstance(keys, Exception):
+            messagebox.showerror("Error", f"Failed to sort images: {keys}")
+            return
+        if paths != self.image_list.paths:
+            # The list changed while keys were computed; drop the stale result.
+            return
+        order = sorted(range(len(paths)), key=lambda i: keys[i])
+        first, last = self.image_list.reorder(order)
+        self.refresh_rows(first, last)
 
     def delete_selected_image(self):
-        selected_items = self.image_listbox.selection()
-        if selected_items:
-            for item in reversed(selected_items):
-                index = self.image_listbox.index(item)
-                del self.selected_images[index]
-            self.update_image_listbox()
+        indices = self.selected_indices()
+        if indices:
+            self.image_listbox.delete(*self.image_listbox.selection())
+            first, last = self.image_list.delete(indices)
+            for index in range(first, last + 1):
+                self.image_listbox.set(self.image_list.ids[index], "Order", index + 1)
             self.reset_image_preview()
+            self.schedule_slide_preview()
 
     def delete_all_images(self):
-        self.selected_images.clear()
-        self.update_image_listbox()
+        self.rows_to_insert.clear()
+        self.image_listbox.delete(*self.image_list.ids)
+        self.image_list.clear()
         self.reset_image_preview()
+        self.schedule_slide_preview()
 
     def reset_image_preview(self):
         self.preview_label.configure(image=None)
         self.preview_label.image = None
 
+    def schedule_slide_preview(self, event=None):
+        """Re-render the slide preview once edits pause."""
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(
+            SLIDE_PREVIEW_DEBOUNCE_MS, self.render_slide_preview
+        )
+
+    def show_slide(self, slide_index: int):
+        self.preview_slide = max(0, slide_index)
+        self.render_slide_preview()
+
+    def render_slide_preview(self, wait: bool = False):
+        """Draw the current slide, decoding missing thumbnails on the probe threads."""
+        self.preview_job = None
+        settings = PPTXSettings()
+        usable = self.usable_indices()
+        images = [self.selected_images[i] for i in usable]
+        # From the probes already made, so no header is read on this thread;
+        # the preview is planned again once the pending probes are in.
+        aspects = [self.image_list.aspect(i) or DEFAULT_ASPECT for i in usable]
+        try:
+            self.apply_settings(settings)
+            if self.preview_focus is not None:
+                focus = bisect_left(usable, self.preview_focus)
+                if focus < len(images):
+                    self.preview_slide = self.slide_preview.slide_of(
+                        images, settings, focus, aspects
+                    )
+            slides = len(self.slide_preview.plan(images, settings, aspects))
+            self.preview_slide = min(self.preview_slide, max(0, slides - 1))
+            image = self.slide_preview.render(
+                images,
+                settings,
+                self.preview_slide,
+                SLIDE_PREVIEW_WIDTH,
+                wait,
+                aspects,
+            )
+        except (OSError, ValueError):
+            # Keep the last preview while an entry holds a partial value.
+            return
+        finally:
+            self.preview_focus = None
+
+        self.thumbnail_futures = [
+            self.probe_executor.submit(self.thumbnails.get, path)
+            for path in self.slide_preview.missing
+        ]
+        if self.thumbnail_futures:
+            self.root.after(
+                PROGRESS_POLL_MS, self.poll_thumbnails, self.thumbnail_futures
+            )
+
+        if image is None:
+            self.slide_preview_label.configure(image=None)
+            self.slide_preview_label.image = None
+            self.slide_label.configure(text="No images")
+            return
+        photo = ctk.CTkImage(image, size=image.size)
+        self.slide_preview_label.configure(image=photo)
+        self.slide_preview_label.image = photo
+        self.slide_label.configure(text=f"Slide {self.preview_slide + 1} of {slides}")
+
+    def poll_thumbnails(self, futures):
+        if futures is not self.thumbnail_futures:
+            # A newer render asked for its own thumbnails.
+            return
+        if not all(future.done() for future in futures):
+            self.root.after(PROGRESS_POLL_MS, self.poll_thumbnails, futures)
+            return
+        # Thumbnails that failed to decode raise here, keeping the last preview.
+        self.render_slide_preview(wait=True)
+
     def generate_presentation(self):
+        if self.generation_thread is not None:
+            return
+        if self.rows_to_insert:
+            messagebox.showinfo(
+                "Adding images", "Wait until every selected image is listed."
+            )
+            return
         try:
             self.update_settings()
-            presentation_path = self.file_entry.get() or "new_presentation.pptx"
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to generate presentation: {str(e)}")
+            return
+
+        formats = self.embeddable_formats()
+        problems = []
+        for index, path in enumerate(self.selected_images):
+            problem = self.image_list.problem(index, formats)
+            if problem:
+                problems.append(f"{path.name}: {problem}")
+        if problems:
+            listed = "\n".join(problems[:MAX_LISTED_PROBLEMS])
+            if len(problems) > MAX_LISTED_PROBLEMS:
+                listed += f"\n... and {len(problems) - MAX_LISTED_PROBLEMS} more"
+            if not messagebox.askyesno(
+                "Unusable images",
+                f"{len(problems)} images cannot be added:\n\n{listed}\n\n"
+                "Generate the presentation without them?",
+            ):
+                return
+        # Images still being checked are checked again by the generator.
+        self.settings.bad_images = "skip" if self.image_list.pending() else "fail"
+
+        presentation_path = self.file_entry.get() or "new_presentation.pptx"
+        images = [self.selected_images[i] for i in self.usable_indices()]
+        self.total_slides = -(-len(images) // self.settings.images_per_slide)
+        self.pptx_generator.observer = ProgressObserver(self.generation_events)
+        # Cleared here rather than on the worker thread, so a Cancel clicked
+        # before the thread starts building is not lost.
+        self.pptx_generator.reset_cancel()
+
+        self.set_controls_locked(True)
+        self.progress_bar.set(0)
+        self.status_label.configure(text=f"Building 0 of {self.total_slides} slides")
+        self.generation_thread = threading.Thread(
+            target=self.run_generation,
+            args=(presentation_path, self.override_var.get(), images),
+            daemon=True,
+        )
+        self.generation_thread.start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_generation)
+
+    def run_generation(self, presentation_path, override, images):
+        """Build and save the presentation; runs on the worker thread."""
+        try:
             self.pptx_generator.create_presentation(
-                presentation_path, override=self.override_var.get()
+                presentation_path, override=override
             )
-            self.pptx_generator.add_images(self.selected_images)
+            self.pptx_generator.add_images(images)
+            self.generation_events.put(("saving", None))
             self.pptx_generator.save_presentation(presentation_path)
-            messagebox.showinfo(
-                "Success", f"Presentation generated and saved to {presentation_path}"
-            )
+            self.generation_events.put(("done", presentation_path))
+        except GenerationCancelled:
+            self.generation_events.put(("cancelled", None))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate presentation: {str(e)}")
+            self.generation_events.put(("error", str(e)))
+
+    def poll_generation(self):
+        while True:
+            try:
+                event, value = self.generation_events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event == "progress":
+                self.progress_bar.set(value / max(1, self.total_slides))
+                self.status_label.configure(
+                    text=f"Building {value} of {self.total_slides} slides"
+                )
+            elif event == "saving":
+                self.cancel_btn.configure(state="disabled")
+                self.status_label.configure(text="Saving presentation")
+            else:
+                self.finish_generation(event, value)
+                return
+
+        self.root.after(PROGRESS_POLL_MS, self.poll_generation)
+
+    def finish_generation(self, event, value):
+        self.generation_thread = None
+        self.pptx_generator.observer = None
+        self.set_controls_locked(False)
+        self.status_label.configure(text="")
+
+        if event == "done":
+            self.progress_bar.set(1)
+            message = f"Presentation generated and saved to {value}"
+            existing = len(self.pptx_generator.existing_images)
+            if existing:
+                message += f"\n\n{existing} images already in the deck were skipped"
+            messagebox.showinfo("Success", message)
+        elif event == "cancelled":
+            self.progress_bar.set(0)
+            messagebox.showinfo("Cancelled", "Presentation generation was cancelled")
+        else:
+            self.progress_bar.set(0)
+            messagebox.showerror("Error", f"Failed to generate presentation: {value}")
+
+    def cancel_generation(self):
+        if self.generation_thread is not None:
+            self.cancel_btn.configure(state="disabled")
+            self.status_label.configure(text="Cancelling")
+            self.pptx_generator.cancel()
+
+    def set_controls_locked(self, locked: bool):
+        state = "disabled" if locked else "normal"
+        for widget in (
+            self.file_entry,
+            self.file_btn,
+            self.override_checkbox,
+            self.skip_existing_checkbox,
+            self.top_margin,
+            self.left_margin,
+            self.right_margin,
+            self.bottom_margin,
+            self.h_center_margin,
+            self.v_center_margin,
+            self.line_width,
+            self.color,
+            self.images_per_slide,
+            self.rounded,
+            self.keep_aspect,
+            self.downsample,
+            self.target_dpi,
+            self.select_btn,
+            self.move_up_btn,
+            self.move_down_btn,
+            self.delete_btn,
+            self.delete_all_btn,
+            self.sort_menu,
+            self.generate_btn,
+        ):
+            widget.configure(state=state)
+        self.cancel_btn.configure(state="normal" if locked else "disabled")
 
     def update_settings(self):
-        self.settings.top_margin = float(self.top_margin.get())
-        self.settings.left_margin = float(self.left_margin.get())
-        self.settings.right_margin = float(self.right_margin.get())
-        self.settings.bottom_margin = float(self.bottom_margin.get())
-        self.settings.h_center_margin = float(self.h_center_margin.get())
-        self.settings.v_center_margin = float(self.v_center_margin.get())
-        self.settings.line_width = float(self.line_width.get())
-        self.settings.color = self.color.get()
-        self.settings.rounded = self.rounded.get()
-
+        self.apply_settings(self.settings)
         self.pptx_generator.settings = self.settings
 
+    def apply_settings(self, settings: PPTXSettings):
+        """Copy the values of the settings widgets to settings."""
+        settings.top_margin = float(self.top_margin.get())
+        settings.left_margin = float(self.left_margin.get())
+        settings.right_margin = float(self.right_margin.get())
+        settings.bottom_margin = float(self.bottom_margin.get())
+        settings.h_center_margin = float(self.h_center_margin.get())
+        settings.v_center_margin = float(self.v_center_margin.get())
+        settings.line_width = float(self.line_width.get())
+        settings.color = self.color.get()
+        settings.rounded = self.rounded.get()
+        settings.images_per_slide = int(self.images_per_slide.get())
+        settings.packing = "aspect" if self.keep_aspect.get() else "grid"
+        settings.keep_originals = not self.downsample.get()
+        settings.target_dpi = int(self.target_dpi.get())
+        settings.skip_existing_images = self.skip_existing.get()
+
     def create_tooltip(self, widget, text):
         CTkToolTip(widget, message=text)
 
     def run(self):
         self.root.mainloop()
+        self.probe_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_bytes(size: int) -> str:
+    if size >= 1_000_000:
+        return f"{size / 1e6:.1f} MB"
+    if size >= 1_000:
+        return f"{size / 1e3:.0f} KB"
+    return f"{size} B"
 
 
 if __name__ == "__main__":
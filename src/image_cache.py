@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pptx_settings import PPTXSettings, Pathlike
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+
+class CacheEntry(NamedTuple):
+    key: str
+    ext: str
+    width: int
+    height: int
+    sha1: str
+    nbytes: int
+    has_data: bool
+
+
+PutItem = Tuple[str, str, Tuple[int, int], str, Optional[bytes]]
+
+
+class ImageCache:
+    """Processed and probed images, stored under a directory and evicted LRU.
+
+    Entries are keyed by the source file's path, size and mtime plus the settings
+    and target dimensions used to process it. An entry without data describes an
+    original file that is embedded unchanged; only its probe results are stored.
+
+    put_many() stores a batch of images in one transaction, opened only once
+    their data files are written, so other processes sharing the directory
+    are locked out of the index for as short a time as possible. get() only
+    stages use times, written by commit() or close(). The total size is kept
+    as a running count between commits and summed from the index at each
+    commit, as other processes may add entries too.
+    """
+
+    INDEX_NAME = "index.sqlite3"
+
+    def __init__(self, directory: Pathlike, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.directory / self.INDEX_NAME, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, ext TEXT, width INTEGER, height INTEGER, "
+            "sha1 TEXT, nbytes INTEGER, has_data INTEGER, last_used INTEGER)"
+        )
+        self._db.commit()
+        self._total_bytes = self._stored_bytes()
+        self._touched: Dict[str, int] = {}
+
+    @staticmethod
+    def make_key(
+        image_path: Pathlike,
+        settings: PPTXSettings,
+        target_size: Optional[Tuple[int, int]] = None,
+    ) -> str:
+        path = Path(image_path).resolve()
+        stat = path.stat()
+        if settings.keep_originals:
+            processing = None
+        else:
+            processing = (settings.target_dpi, settings.jpeg_quality, target_size)
+        identity = (str(path), stat.st_size, stat.st_mtime_ns, processing)
+        return hashlib.sha1(repr(identity).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = self._db.execute(
+            "SELECT key, ext, width, height, sha1, nbytes, has_data "
+            "FROM entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        entry = CacheEntry(*row[:6], bool(row[6]))
+        if entry.has_data and not self.data_path(entry).exists():
+            with self._db:
+                self._delete(entry)
+            return None
+
+        self._touched[key] = time.time_ns()
+        return entry
+
+    def read(self, entry: CacheEntry) -> bytes:
+        return self.data_path(entry).read_bytes()
+
+    def put(
+        self,
+        key: str,
+        ext: str,
+        size: Tuple[int, int],
+        sha1: str,
+        data: Optional[bytes] = None,
+    ) -> CacheEntry:
+        """Store one entry, committed at once; see put_many."""
+        return self.put_many([(key, ext, size, sha1, data)])[0]
+
+    def put_many(self, items: Iterable[PutItem]) -> List[CacheEntry]:
+        """Store (key, ext, size, sha1, data) entries in one transaction.
+
+        data is None for an original embedded unchanged.
+        """
+        entries = []
+        for key, ext, size, sha1, data in items:
+            entry = CacheEntry(
+                key, ext, size[0], size[1], sha1, len(data or b""), data is not None
+            )
+            if data is not None:
+                data_path = self.data_path(entry)
+                temp_path = data_path.with_name(f"{data_path.name}.{os.getpid()}.tmp")
+                temp_path.write_bytes(data)
+                os.replace(temp_path, data_path)
+            entries.append(entry)
+
+        with self._db:
+            for entry in entries:
+                replaced = self._db.execute(
+                    "SELECT nbytes FROM entries WHERE key = ?", (entry.key,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*entry[:6], int(entry.has_data), time.time_ns()),
+                )
+                self._touched.pop(entry.key, None)
+                self._total_bytes += entry.nbytes - (replaced[0] if replaced else 0)
+            self._evict()
+        return entries
+
+    def commit(self) -> None:
+        """Write the use times of entries read since the last commit."""
+        self._write_use_times()
+        self._total_bytes = self._stored_bytes()
+        self._evict()
+        self._db.commit()
+
+    def info(self) -> dict:
+        self.commit()
+        entries, total_bytes = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM entries"
+        ).fetchone()
+        return {
+            "directory": str(self.directory),
+            "entries": entries,
+            "total_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> None:
+        for row in self._db.execute("SELECT key, ext FROM entries WHERE has_data"):
+            self._data_path_for(*row).unlink(missing_ok=True)
+        self._db.execute("DELETE FROM entries")
+        self._touched.clear()
+        self._total_bytes = 0
+        self._db.commit()
+
+    def close(self) -> None:
+        self.commit()
+        self._db.close()
+
+    def _write_use_times(self) -> None:
+        self._db.executemany(
+            "UPDATE entries SET last_used = ? WHERE key = ?",
+            [(used, key) for key, used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _stored_bytes(self) -> int:
+        (total_bytes,) = self._db.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM entries"
+        ).fetchone()
+        return total_bytes
+
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        self._write_use_times()
+        rows = self._db.execute(
+            "SELECT key, ext, width, height, sha1, nbytes, has_data "
+            "FROM entries WHERE has_data ORDER BY last_used"
+        ).fetchall()
+        for row in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._delete(CacheEntry(*row[:6], bool(row[6])))
+
+    def _delete(self, entry: CacheEntry) -> None:
+        if entry.has_data:
+            self.data_path(entry).unlink(missing_ok=True)
+        self._db.execute("DELETE FROM entries WHERE key = ?", (entry.key,))
+        self._touched.pop(entry.key, None)
+        self._total_bytes -= entry.nbytes
+
+    def data_path(self, entry: CacheEntry) -> Path:
+        return self._data_path_for(entry.key, entry.ext)
+
+    def _data_path_for(self, key: str, ext: str) -> Path:
+        return self.directory / f"{key}.{ext}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear an image cache")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--clear", action="store_true", help="remove every entry")
+    args = parser.parse_args()
+
+    cache = ImageCache(args.directory)
+    if args.clear:
+        cache.clear()
+    for name, value in cache.info().items():
+        print(f"{name}: {value}")
+    cache.close()
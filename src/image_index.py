@@ -0,0 +1,309 @@
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Collection,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+from pptx_settings import Pathlike
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff"}
+DEFAULT_SCAN_WORKERS = 16
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+EXIF_ORIENTATION = 274
+EXIF_DATETIME_FORMAT = "%Y:%m:%d %H:%M:%S"
+ORDER_COLUMNS = {
+    "path": "path",
+    "name": "name COLLATE NOCASE, path",
+    "mtime": "mtime_ns, path",
+    "captured": "COALESCE(captured, mtime_ns / 1e9), path",
+    "size": "size, path",
+}
+
+
+class ImageInfo(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    format: Optional[str] = None
+    captured: Optional[float] = None
+    orientation: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def aspect(self) -> Optional[float]:
+        """Width / height, None if the size is unknown."""
+        if not self.width or not self.height:
+            return None
+        return self.width / self.height
+
+
+class ScanResult(NamedTuple):
+    files: int
+    probed: int
+    removed: int
+    invalid: int
+    seconds: float
+
+
+def capture_time(exif: "Image.Exif") -> Optional[float]:
+    """Capture time as a POSIX timestamp from EXIF, or None if absent."""
+    value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(
+        EXIF_DATETIME
+    )
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value.strip("\x00 "), EXIF_DATETIME_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+
+def probe_image(image_path: Pathlike) -> ImageInfo:
+    """Read dimensions, format and EXIF fields from the image header only.
+
+    A file that cannot be read, or no longer exists, gets an ImageInfo with
+    error set rather than raising.
+    """
+    from PIL import Image
+
+    path = Path(image_path)
+    try:
+        stat = path.stat()
+    except OSError as e:
+        return ImageInfo(str(path), 0, 0, error=f"{type(e).__name__}: {e}")
+    try:
+        with Image.open(path) as image:
+            exif = image.getexif()
+            return ImageInfo(
+                str(path),
+                stat.st_size,
+                stat.st_mtime_ns,
+                image.width,
+                image.height,
+                image.format,
+                capture_time(exif),
+                exif.get(EXIF_ORIENTATION),
+            )
+    except Exception as e:
+        return ImageInfo(
+            str(path), stat.st_size, stat.st_mtime_ns, error=f"{type(e).__name__}: {e}"
+        )
+
+
+def info_problem(
+    info: ImageInfo, formats: Optional[Collection[str]] = None
+) -> Optional[str]:
+    """Why a probed image cannot be used, or None; formats limits accepted formats."""
+    if not info.ok:
+        return info.error
+    if formats is not None and info.format not in formats:
+        return f"unsupported image format '{info.format}'"
+    return None
+
+
+def walk_images(
+    roots: Iterable[Pathlike], executor: ThreadPoolExecutor
+) -> List[Tuple[str, int, int]]:
+    """List (path, size, mtime_ns) of image files under roots, one directory per task.
+
+    Files and folders that vanish or cannot be read during the walk are left out.
+    """
+
+    def scan_directory(directory: str):
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            pass
+        return files, subdirs
+
+    files = []
+    pending = {executor.submit(scan_directory, str(root)) for root in roots}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            found, subdirs = future.result()
+            files.extend(found)
+            pending.update(executor.submit(scan_directory, d) for d in subdirs)
+    return files
+
+
+class ImageIndex:
+    """SQLite index of image headers, updated incrementally by mtime and size.
+
+    Only files that are new or changed since the last scan are probed, so
+    re-scanning a large, mostly unchanged tree costs a directory walk. Ordering,
+    filtering and validation are then queries against the index.
+    """
+
+    def __init__(self, db_path: Pathlike):
+        self.db_path = Path(db_path)
+        self._db = sqlite3.connect(self.db_path, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "path TEXT PRIMARY KEY, name TEXT, size INTEGER, mtime_ns INTEGER, "
+            "width INTEGER, height INTEGER, format TEXT, captured REAL, "
+            "orientation INTEGER, error TEXT)"
+        )
+        self._db.commit()
+
+    def scan(
+        self, roots: Iterable[Pathlike], workers: int = DEFAULT_SCAN_WORKERS
+    ) -> ScanResult:
+        start = time.perf_counter()
+        roots = [Path(root).resolve() for root in roots]
+        with ThreadPoolExecutor(workers) as executor:
+            files = walk_images(roots, executor)
+            known = {}
+            for root in roots:
+                known.update(self._known_files(root))
+            indexed = set(known)
+
+            changed = [
+                path
+                for path, size, mtime_ns in files
+                if known.pop(path, None) != (size, mtime_ns)
+            ]
+            infos = list(executor.map(probe_image, changed))
+
+        # Files deleted between the walk and their probe are dropped.
+        vanished = {
+            info.path for info in infos if not info.ok and not os.path.exists(info.path)
+        }
+        infos = [info for info in infos if info.path not in vanished]
+        removed = list(known) + [path for path in vanished if path in indexed]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(info.path, Path(info.path).name, *info[1:]) for info in infos],
+        )
+        self._db.executemany(
+            "DELETE FROM images WHERE path = ?", [(p,) for p in removed]
+        )
+        self._db.commit()
+        return ScanResult(
+            len(files) - len(vanished),
+            len(infos),
+            len(removed),
+            sum(not info.ok for info in infos),
+            round(time.perf_counter() - start, 3),
+        )
+
+    def get(self, image_path: Pathlike) -> Optional[ImageInfo]:
+        row = self._db.execute(
+            "SELECT path, size, mtime_ns, width, height, format, captured, "
+            "orientation, error FROM images WHERE path = ?",
+            (str(Path(image_path).resolve()),),
+        ).fetchone()
+        return ImageInfo(*row) if row else None
+
+    def query(
+        self,
+        root: Optional[Pathlike] = None,
+        order: str = "path",
+        formats: Optional[Iterable[str]] = None,
+        min_width: int = 0,
+        min_height: int = 0,
+        valid: Optional[bool] = True,
+    ) -> List[ImageInfo]:
+        """Return indexed images matching the filters, sorted by order.
+
+        valid=True keeps readable images, False keeps only broken ones and
+        None keeps both.
+        """
+        if order not in ORDER_COLUMNS:
+            raise ValueError(
+                f"Unknown order '{order}', expected one of {list(ORDER_COLUMNS)}"
+            )
+
+        clauses, params = [], []
+        if root is not None:
+            clauses.append("path >= ? AND path < ?")
+            prefix = str(Path(root).resolve()) + os.sep
+            params += [prefix, prefix[:-1] + chr(ord(os.sep) + 1)]
+        if formats:
+            formats = [f.upper() for f in formats]
+            clauses.append(f"format IN ({', '.join('?' * len(formats))})")
+            params += formats
+        if min_width:
+            clauses.append("width >= ?")
+            params.append(min_width)
+        if min_height:
+            clauses.append("height >= ?")
+            params.append(min_height)
+        if valid is not None:
+            clauses.append("error IS NULL" if valid else "error IS NOT NULL")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._db.execute(
+            "SELECT path, size, mtime_ns, width, height, format, captured, "
+            f"orientation, error FROM images {where} ORDER BY {ORDER_COLUMNS[order]}",
+            params,
+        )
+        return [ImageInfo(*row) for row in rows]
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _known_files(self, root: Path):
+        prefix = str(root) + os.sep
+        rows = self._db.execute(
+            "SELECT path, size, mtime_ns FROM images WHERE path >= ? AND path < ?",
+            (prefix, prefix[:-1] + chr(ord(os.sep) + 1)),
+        )
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scan image folders into an index and list them"
+    )
+    parser.add_argument("index", type=Path, help="SQLite index file")
+    parser.add_argument("roots", type=Path, nargs="+")
+    parser.add_argument("--workers", type=int, default=DEFAULT_SCAN_WORKERS)
+    parser.add_argument("--order", choices=list(ORDER_COLUMNS), default="path")
+    parser.add_argument("--invalid", action="store_true", help="list unreadable files")
+    parser.add_argument("--list", action="store_true", help="print matching paths")
+    args = parser.parse_args()
+
+    index = ImageIndex(args.index)
+    result = index.scan(args.roots, args.workers)
+    print(
+        f"{result.files} files, {result.probed} probed, {result.removed} removed, "
+        f"{result.invalid} invalid in {result.seconds:.2f}s"
+    )
+    if args.list or args.invalid:
+        for root in args.roots:
+            for info in index.query(root, args.order, valid=not args.invalid):
+                print(info.path if info.ok else f"{info.path}: {info.error}")
+    index.close()
@@ -1,91 +1,259 @@
+import copy
+import math
+from functools import lru_cache
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml.shapes.picture import CT_Picture
+from pptx.shapes.picture import Picture
 from pptx.slide import Slide
 from pptx.util import Inches
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 from typing import List, Tuple, Optional
-from pptx_settings import PPTXSettings, Pathlike
+from generation_stats import GenerationObserver, stage
+from pptx_media import FileImage, MediaIndex, add_picture, load_image
+from pptx_settings import PPTXSettings, ImageSource
+
+GRID_SHAPES = {
+    1: (1, 1),
+    2: (2, 1),
+    3: (2, 2),
+    4: (2, 2),
+    6: (3, 2),
+    8: (4, 2),
+    9: (3, 3),
+    12: (4, 3),
+    16: (4, 4),
+}
+LAYOUT_CACHE_SIZE = 256
+SHAPE_BACKENDS = ("pptx", "template")
+
+Box = Tuple[int, int, int, int]
+SlideSize = Tuple[int, int]
+LayoutKey = Tuple[int, ...]
+
+
+def grid_shape(num_images: int) -> Tuple[int, int]:
+    """Return the (columns, rows) used for a slide holding num_images."""
+    if num_images < 1:
+        raise ValueError("A slide needs at least one image")
+    if num_images in GRID_SHAPES:
+        return GRID_SHAPES[num_images]
+    columns = math.ceil(math.sqrt(num_images))
+    return columns, math.ceil(num_images / columns)
+
+
+def fit_box(box: Box, size: Tuple[int, int]) -> Box:
+    """The largest box of size's aspect ratio centred in box."""
+    left, top, width, height = box
+    scale = min(width / size[0], height / size[1])
+    fitted_width, fitted_height = int(size[0] * scale), int(size[1] * scale)
+    return (
+        left + (width - fitted_width) // 2,
+        top + (height - fitted_height) // 2,
+        fitted_width,
+        fitted_height,
+    )
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def grid_layout(
+    slide_size: SlideSize, num_images: int, layout_key: LayoutKey
+) -> Tuple[Box, ...]:
+    """Return the (left, top, width, height) of each image on a slide.
+
+    Images fill rows left to right; a partial last row is centred. layout_key
+    is PPTXSettings.layout_key(), so results are shared by every slide (and
+    generator) with the same slide size, image count and margins.
+    """
+    slide_width, slide_height = slide_size
+    top, left, right, bottom, h_center, v_center = layout_key
+    columns, rows = grid_shape(num_images)
+
+    width = (slide_width - left - right - (columns - 1) * h_center) / columns
+    height = (slide_height - top - bottom - (rows - 1) * v_center) / rows
+
+    boxes = []
+    for i in range(num_images):
+        row, col = divmod(i, columns)
+        row_shift = columns - min(columns, num_images - row * columns)
+        x = left + row_shift * (width + h_center) / 2 + col * (width + h_center)
+        y = top + row * (height + v_center)
+        boxes.append((int(x), int(y), int(width), int(height)))
+    return tuple(boxes)
+
+
+def style_picture(pic: Picture, settings: PPTXSettings) -> None:
+    if settings.rounded:
+        pic.auto_shape_type = MSO_SHAPE.ROUNDED_RECTANGLE
+    if settings.line_width > 0:
+        pic.line.color.rgb = RGBColor(*settings.color)
+        pic.line.width = settings.line_width
+
+
+class PictureTemplate:
+    """A styled <p:pic> built once and cloned for every picture.
+
+    Only the shape id and name, description, relationship id and geometry
+    differ between pictures, so cloning the element and setting those gives
+    the same XML as add_picture followed by style_picture, without going
+    through the python-pptx shape proxies for each picture.
+    """
+
+    def __init__(self, settings: PPTXSettings):
+        self._pic = CT_Picture.new_pic(0, "", "", "", 0, 0, 0, 0)
+        style_picture(Picture(self._pic, None), settings)
+
+    def add_to(
+        self,
+        slide: Slide,
+        shape_id: int,
+        desc: str,
+        rId: str,
+        left: int,
+        top: int,
+        width: int,
+        height: int,
+    ) -> CT_Picture:
+        pic = copy.deepcopy(self._pic)
+        c_nv_pr = pic.nvPicPr.cNvPr
+        c_nv_pr.id = shape_id
+        c_nv_pr.name = f"Picture {shape_id - 1}"
+        c_nv_pr.set("descr", desc)
+        pic.blipFill.blip.rEmbed = rId
+        xfrm = pic.spPr.xfrm
+        xfrm.x, xfrm.y, xfrm.cx, xfrm.cy = left, top, width, height
+        slide.shapes._spTree.insert_element_before(pic, "p:extLst")
+        return pic
 
 
 class ImageLayoutManager:
-    def __init__(self, slide_size, settings: Optional[PPTXSettings] = None):
+    def __init__(
+        self,
+        slide_size,
+        settings: Optional[PPTXSettings] = None,
+        media_index: Optional[MediaIndex] = None,
+        observer: Optional[GenerationObserver] = None,
+    ):
         self.slide_width, self.slide_height = slide_size
         self.settings = settings or PPTXSettings()
+        self.media_index = media_index
+        self.observer = observer
+        self._picture_template = None
+
+    def layout_boxes(self, num_images: int) -> Tuple[Box, ...]:
+        return grid_layout(
+            (self.slide_width, self.slide_height),
+            num_images,
+            self.settings.layout_key(),
+        )
 
-    def _calculate_dimensions(
-        self, num_columns: int, num_rows: int
-    ) -> Tuple[float, float]:
-        width = (
-            self.slide_width
-            - self.settings.left_margin
-            - self.settings.right_margin
-            - (num_columns - 1) * self.settings.h_center_margin
-        ) / num_columns
-
-        height = (
-            self.slide_height
-            - self.settings.top_margin
-            - self.settings.bottom_margin
-            - (num_rows - 1) * self.settings.v_center_margin
-        ) / num_rows
-        return width, height
-
-    def _get_position(
-        self, row: int, col: int, width: float, height: float
-    ) -> Tuple[float, float]:
-        x = self.settings.left_margin + col * (width + self.settings.h_center_margin)
-        y = self.settings.top_margin + row * (height + self.settings.v_center_margin)
-        return x, y
+    def cell_size(self, num_images: int) -> Tuple[int, int]:
+        """Return the (width, height) each image gets on a slide holding num_images."""
+        return self.layout_boxes(num_images)[0][2:]
+
+    def add_images(self, slide: Slide, image_paths: List[ImageSource]) -> None:
+        """Lay out image_paths on slide using the grid for their count."""
+        if len(image_paths) > self.settings.images_per_slide:
+            raise ValueError(
+                f"Only up to {self.settings.images_per_slide} images can be added "
+                f"to a slide"
+            )
+        self._place_images(slide, image_paths, len(image_paths))
+
+    def place_images(
+        self, slide: Slide, image_paths: List[ImageSource], boxes: Tuple[Box, ...]
+    ) -> None:
+        """Add each image in its own box, e.g. boxes from an ImagePacker."""
+        if self.settings.shape_backend not in SHAPE_BACKENDS:
+            raise ValueError(
+                f"Unknown shape backend '{self.settings.shape_backend}', "
+                f"expected one of {list(SHAPE_BACKENDS)}"
+            )
+        if self.settings.shape_backend == "template" and self.media_index is not None:
+            self._clone_images(slide, image_paths, boxes)
+            return
+
+        for image_path, box in zip(image_paths, boxes):
+            self._add_image(slide, image_path, *box)
+
+    def _clone_images(
+        self, slide: Slide, image_paths: List[ImageSource], boxes: Tuple[Box, ...]
+    ) -> None:
+        if self._picture_template is None:
+            self._picture_template = PictureTemplate(self.settings)
+        shape_id = slide.shapes._next_shape_id
+        for image_path, box in zip(image_paths, boxes):
+            image, box = self._read_image(image_path, box)
+            with stage(self.observer, "embed"):
+                image_part = self.media_index.get_or_add_image_part(image)
+                rId = slide.part.relate_to(image_part, RT.IMAGE)
+                self._picture_template.add_to(
+                    slide, shape_id, image_part.desc, rId, *box
+                )
+            if self.observer is not None:
+                self._report_image(image, image_part)
+            shape_id += 1
+
+    def _place_images(
+        self, slide: Slide, image_paths: List[ImageSource], num_cells: int
+    ) -> None:
+        self.place_images(slide, image_paths, self.layout_boxes(num_cells))
 
     def _add_image(
         self,
         slide: Slide,
-        image_path: Pathlike,
+        image_path: ImageSource,
         left: Inches,
         top: Inches,
         width: Inches,
         height: Inches,
     ) -> None:
-        pic = slide.shapes.add_picture(str(image_path), left, top, width, height)
-        if self.settings.rounded:
-            pic.auto_shape_type = MSO_SHAPE.ROUNDED_RECTANGLE
-        if self.settings.line_width > 0:
-            pic.line.color.rgb = RGBColor(*self.settings.color)
-            pic.line.width = self.settings.line_width
-
-    def add_single_image(self, slide: Slide, image_path: Pathlike) -> None:
-        width, height = self._calculate_dimensions(1, 1)
-        self._add_image(
-            slide,
-            image_path,
-            self.settings.left_margin,
-            self.settings.top_margin,
-            width,
-            height,
-        )
-
-    def add_two_images(self, slide: Slide, image_paths: List[Pathlike]) -> None:
-        width, height = self._calculate_dimensions(2, 1)
-        for i, image_path in enumerate(image_paths):
-            x, y = self._get_position(0, i, width, height)
-            self._add_image(slide, image_path, x, y, width, height)
-
-    def add_three_images(self, slide: Slide, image_paths: List[Pathlike]) -> None:
-        width, height = self._calculate_dimensions(2, 2)
-        for i, image_path in enumerate(image_paths):
-            if i < 2:
-                x, y = self._get_position(0, i, width, height)
-            else:
-                x = (
-                    self.settings.left_margin
-                    + width / 2
-                    + self.settings.h_center_margin / 2
+        if self.media_index is not None:
+            image, box = self._read_image(image_path, (left, top, width, height))
+            with stage(self.observer, "embed"):
+                image_part = self.media_index.get_or_add_image_part(image)
+                pic = add_picture(slide, image_part, *box)
+            if self.observer is not None:
+                self._report_image(image, image_part)
+        else:
+            if not hasattr(image_path, "read"):
+                image_path = str(image_path)
+            pic = slide.shapes.add_picture(image_path, left, top, width, height)
+            if self.settings.packing == "aspect":
+                pic.left, pic.top, pic.width, pic.height = fit_box(
+                    (left, top, width, height), pic.image.size
                 )
-                y = self.settings.top_margin + height + self.settings.v_center_margin
-            self._add_image(slide, image_path, x, y, width, height)
-
-    def add_four_images(self, slide: Slide, image_paths: List[Pathlike]) -> None:
-        width, height = self._calculate_dimensions(2, 2)
-        for i, image_path in enumerate(image_paths):
-            row, col = divmod(i, 2)
-            x, y = self._get_position(row, col, width, height)
-            self._add_image(slide, image_path, x, y, width, height)
+
+        with stage(self.observer, "style"):
+            style_picture(pic, self.settings)
+
+    def _read_image(self, image_path: ImageSource, box: Box):
+        """Return image_path as an image, and the box to show it in."""
+        with stage(self.observer, "read"):
+            image = load_image(image_path)
+        if self.settings.packing == "aspect":
+            box = fit_box(box, image.size)
+        return image, box
+
+    def _report_image(self, image, image_part) -> None:
+        if self.media_index.is_existing(image_part):
+            self.observer.image_reused(image.filename or "")
+            return
+        if isinstance(image, FileImage):
+            nbytes = image.path.stat().st_size
+        else:
+            nbytes = len(image.blob)
+        self.observer.image_added(image.filename or "", nbytes)
+
+    def add_single_image(self, slide: Slide, image_path: ImageSource) -> None:
+        self._place_images(slide, [image_path], 1)
+
+    def add_two_images(self, slide: Slide, image_paths: List[ImageSource]) -> None:
+        self._place_images(slide, image_paths, 2)
+
+    def add_three_images(self, slide: Slide, image_paths: List[ImageSource]) -> None:
+        self._place_images(slide, image_paths, 3)
+
+    def add_four_images(self, slide: Slide, image_paths: List[ImageSource]) -> None:
+        self._place_images(slide, image_paths, 4)
@@ -0,0 +1,150 @@
+from pathlib import Path
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+from image_index import ImageInfo, info_problem, probe_image
+
+RowRange = Tuple[int, int]
+
+
+def exif_timestamp(image_path: Path) -> float:
+    """Capture time from EXIF headers, falling back to the file's mtime."""
+    info = probe_image(image_path)
+    return info.captured if info.captured is not None else info.mtime_ns / 1e9
+
+
+SORT_KEYS: Dict[str, Callable[[Path], object]] = {
+    "Name": lambda path: (path.name.lower(), str(path)),
+    "Modified": lambda path: path.stat().st_mtime_ns,
+    "EXIF date": exif_timestamp,
+}
+
+
+class ImageListModel:
+    """Ordered image paths with stable row ids for a Treeview.
+
+    Every mutation returns the inclusive (first, last) range of positions whose
+    row or order number changed, so views only touch those rows. Header
+    probes are kept per row id in infos, so they follow rows as they move.
+    """
+
+    def __init__(self):
+        self.paths: List[Path] = []
+        self.ids: List[str] = []
+        self.infos: Dict[str, ImageInfo] = {}
+        self._positions: Dict[str, int] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, row_id: str) -> bool:
+        return row_id in self._positions
+
+    def index(self, row_id: str) -> int:
+        return self._positions[row_id]
+
+    def problem(
+        self, index: int, formats: Optional[Collection[str]] = None
+    ) -> Optional[str]:
+        """Why the image at index cannot be used; None if it can or is unprobed."""
+        info = self.infos.get(self.ids[index])
+        return None if info is None else info_problem(info, formats)
+
+    def aspect(self, index: int) -> Optional[float]:
+        """Width / height of the image at index; None if unprobed or unknown."""
+        info = self.infos.get(self.ids[index])
+        return None if info is None else info.aspect
+
+    def pending(self) -> int:
+        """Number of images not probed yet."""
+        return len(self.paths) - len(self.infos)
+
+    def extend(self, paths: Iterable[Path]) -> RowRange:
+        first = len(self.paths)
+        for path in paths:
+            row_id = f"img{self._next_id}"
+            self._next_id += 1
+            self._positions[row_id] = len(self.paths)
+            self.paths.append(path)
+            self.ids.append(row_id)
+        return first, len(self.paths) - 1
+
+    def move_block(self, indices: Iterable[int], delta: int) -> RowRange:
+        """Move the rows at indices one step up (delta=-1) or down (delta=1).
+
+        Rows already at the edge stay put, and so do selected rows stacked
+        against them.
+        """
+        selected = set(indices)
+        if not selected:
+            return 0, -1
+
+        moved = []
+        for i in sorted(selected, reverse=delta > 0):
+            j = i + delta
+            if 0 <= j < len(self.paths) and j not in selected:
+                self._swap(i, j)
+                selected.discard(i)
+                selected.add(j)
+                moved.extend((i, j))
+        if not moved:
+            return 0, -1
+        return min(moved), max(moved)
+
+    def move_to(self, indices: Iterable[int], target: int) -> RowRange:
+        """Move the rows at indices, keeping their order, to start at target.
+
+        target is a position in the list before the move.
+        """
+        indices = sorted(set(indices))
+        if not indices:
+            return 0, -1
+
+        target = max(0, min(target, len(self.paths)))
+        moving = [(self.paths[i], self.ids[i]) for i in indices]
+        for i in reversed(indices):
+            del self.paths[i]
+            del self.ids[i]
+        insert_at = target - sum(1 for i in indices if i < target)
+        self.paths[insert_at:insert_at] = [path for path, _ in moving]
+        self.ids[insert_at:insert_at] = [row_id for _, row_id in moving]
+
+        first = min(indices[0], insert_at)
+        last = max(indices[-1], insert_at + len(indices) - 1)
+        self._reindex(first, last)
+        return first, last
+
+    def delete(self, indices: Iterable[int]) -> RowRange:
+        indices = sorted(set(indices))
+        if not indices:
+            return 0, -1
+        for i in reversed(indices):
+            del self._positions[self.ids[i]]
+            self.infos.pop(self.ids[i], None)
+            del self.paths[i]
+            del self.ids[i]
+        self._reindex(indices[0], len(self.paths) - 1)
+        return indices[0], len(self.paths) - 1
+
+    def clear(self) -> None:
+        self.paths.clear()
+        self.ids.clear()
+        self.infos.clear()
+        self._positions.clear()
+
+    def reorder(self, order: List[int]) -> RowRange:
+        """Rearrange rows so that new position k holds old row order[k]."""
+        self.paths[:] = [self.paths[i] for i in order]
+        self.ids[:] = [self.ids[i] for i in order]
+        self._reindex(0, len(self.paths) - 1)
+        return 0, len(self.paths) - 1
+
+    def _swap(self, i: int, j: int) -> None:
+        self.paths[i], self.paths[j] = self.paths[j], self.paths[i]
+        self.ids[i], self.ids[j] = self.ids[j], self.ids[i]
+        self._positions[self.ids[i]] = i
+        self._positions[self.ids[j]] = j
+
+    def _reindex(self, first: int, last: int) -> None:
+        for i in range(first, last + 1):
+            self._positions[self.ids[i]] = i
@@ -0,0 +1,215 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from image_index import DEFAULT_SCAN_WORKERS, probe_image
+from image_layout_manager import Box, SlideSize, grid_shape
+from pptx_settings import ImageSource, PPTXSettings
+
+PACKING_MODES = ("grid", "aspect")
+ROW_LENGTH_SLACK = 1
+DEFAULT_ASPECT = 4 / 3
+
+
+class PackedSlide(NamedTuple):
+    images: List[ImageSource]
+    boxes: Tuple[Box, ...]
+
+
+def image_aspect(image: ImageSource) -> float:
+    """Width / height of image, from its header for paths."""
+    if isinstance(image, (str, Path)):
+        info = probe_image(image)
+        width, height = info.width, info.height
+    elif hasattr(image, "size"):
+        width, height = image.size
+    else:
+        return DEFAULT_ASPECT
+    if not width or not height:
+        return DEFAULT_ASPECT
+    return width / height
+
+
+@lru_cache(maxsize=None)
+def row_partitions(num_images: int, max_rows: int) -> Tuple[Tuple[int, ...], ...]:
+    """Candidate row lengths for a slide of num_images.
+
+    For each row count up to max_rows, every split whose rows are within
+    ROW_LENGTH_SLACK of an even split. Uneven rows let a row of portraits sit
+    next to a shorter row of landscapes without trying every composition.
+    """
+    partitions = []
+    for rows in range(1, min(num_images, max_rows) + 1):
+        shortest = max(1, num_images // rows - ROW_LENGTH_SLACK)
+        longest = -(-num_images // rows) + ROW_LENGTH_SLACK
+
+        def split(remaining: int, rows_left: int, prefix: Tuple[int, ...]):
+            if rows_left == 1:
+                if shortest <= remaining <= longest:
+                    partitions.append(prefix + (remaining,))
+                return
+            for length in range(shortest, min(longest, remaining) + 1):
+                split(remaining - length, rows_left - 1, prefix + (length,))
+
+        split(num_images, rows, ())
+    return tuple(partitions)
+
+
+class ImagePacker:
+    """Packs images onto slides in justified rows that keep their aspect ratio.
+
+    A dynamic program over the image sequence picks how many images go on each
+    slide and how they split into rows, using the fewest slides and, among
+    those, leaving the least content area empty. Candidate slides are scored
+    from precomputed tables of row partitions and justified row sizes, so
+    10,000 images pack in seconds once probed.
+
+    With settings.packing_window > 1, images may move within consecutive
+    blocks of that many images (they are grouped by shape); otherwise the
+    input order is kept exactly.
+    """
+
+    def __init__(self, slide_size: SlideSize, settings: Optional[PPTXSettings] = None):
+        self.slide_width, self.slide_height = slide_size
+        self.settings = settings or PPTXSettings()
+
+    def pack(
+        self, images: Sequence[ImageSource], aspects: Optional[Sequence[float]] = None
+    ) -> List[PackedSlide]:
+        """Split images into slides, each with a box per image."""
+        images = list(images)
+        if aspects is None:
+            aspects = self.probe(images)
+        order = self._window_order(aspects)
+        images = [images[i] for i in order]
+        aspects = [aspects[i] for i in order]
+
+        slides = []
+        for start, end, rows in self._solve(aspects):
+            slides.append(
+                PackedSlide(images[start:end], self._layout(aspects[start:end], rows))
+            )
+        return slides
+
+    @staticmethod
+    def probe(images: Sequence[ImageSource]) -> List[float]:
+        with ThreadPoolExecutor(DEFAULT_SCAN_WORKERS) as executor:
+            return list(executor.map(image_aspect, images))
+
+    def _content_area(self) -> Tuple[int, int, int, int, int, int]:
+        top, left, right, bottom, h_gap, v_gap = self.settings.layout_key()
+        width = self.slide_width - left - right
+        height = self.slide_height - top - bottom
+        return left, top, width, height, h_gap, v_gap
+
+    def _window_order(self, aspects: Sequence[float]) -> List[int]:
+        window = self.settings.packing_window
+        order = list(range(len(aspects)))
+        if window <= 1:
+            return order
+        for start in range(0, len(order), window):
+            order[start : start + window] = sorted(
+                order[start : start + window], key=lambda i: -aspects[i]
+            )
+        return order
+
+    def _solve(self, aspects: Sequence[float]) -> Iterator[Tuple[int, int, tuple]]:
+        """Yield (start, end, row lengths) for each slide of the optimal packing."""
+        _, _, width, height, h_gap, v_gap = self._content_area()
+        per_slide = self.settings.images_per_slide
+        max_rows = grid_shape(per_slide)[1] + 1
+        count = len(aspects)
+
+        # Each partition becomes (row length, offset from the slide's first
+        # image) pairs, and every possible row's justified height and image
+        # area is computed once, so scoring a candidate slide is a few lookups.
+        tables = [
+            [
+                (rows, tuple(zip(rows, accumulate((0, *rows[:-1])))))
+                for rows in row_partitions(k, max_rows)
+            ]
+            for k in range(per_slide + 1)
+        ]
+        available = [height - (rows - 1) * v_gap for rows in range(max_rows + 1)]
+        longest_row = max(max(rows) for k in tables[1:] for rows, _ in k)
+        prefix = [0.0, *accumulate(aspects)]
+        row_heights, row_areas = [None], [None]
+        for length in range(1, longest_row + 1):
+            row_width = width - (length - 1) * h_gap
+            sums = [prefix[i + length] - prefix[i] for i in range(count - length + 1)]
+            row_heights.append([row_width / s for s in sums])
+            row_areas.append([row_width * row_width / s for s in sums])
+
+        # Using the fewest slides leaves room for `spare` empty cells in total,
+        # so the n-th slide must end within `spare` images before n full
+        # slides would. best[i] is the least empty area packing aspects[i:]
+        # into the remaining slides and choice[i] the (end, rows) of its first
+        # slide; positions no such packing passes through are skipped.
+        spare = -(-count // per_slide) * per_slide - count
+        best = [0.0] * (count + 1)
+        choice = [None] * count
+        for start in range(count - 1, -1, -1):
+            if -start % per_slide > spare:
+                continue
+            slide = -(-start // per_slide)
+            best_cost = None
+            for end in range(start + 1, min(start + per_slide, count) + 1):
+                if end < count and (
+                    -end % per_slide > spare or -(-end // per_slide) != slide + 1
+                ):
+                    continue
+                area, rows = -1.0, None
+                for candidate, offsets in tables[end - start]:
+                    total_height = candidate_area = 0.0
+                    for length, offset in offsets:
+                        total_height += row_heights[length][start + offset]
+                        candidate_area += row_areas[length][start + offset]
+                    room = available[len(candidate)]
+                    if total_height > room:
+                        candidate_area *= (room / total_height) ** 2
+                    if candidate_area > area:
+                        area, rows = candidate_area, candidate
+                cost = best[end] - area
+                if best_cost is None or cost < best_cost:
+                    best_cost = cost
+                    choice[start] = (end, rows)
+            best[start] = best_cost
+
+        start = 0
+        while start < count:
+            end, rows = choice[start]
+            yield start, end, rows
+            start = end
+
+    def _layout(
+        self, aspects: Sequence[float], rows: Tuple[int, ...]
+    ) -> Tuple[Box, ...]:
+        left, top, width, height, h_gap, v_gap = self._content_area()
+        row_aspects, position = [], 0
+        for length in rows:
+            row_aspects.append(sum(aspects[position : position + length]))
+            position += length
+        heights = [
+            (width - (length - 1) * h_gap) / row_aspect
+            for length, row_aspect in zip(rows, row_aspects)
+        ]
+        available = height - (len(rows) - 1) * v_gap
+        scale = min(1.0, available / sum(heights))
+
+        boxes = []
+        y = top + (available - sum(heights) * scale) / 2
+        position = 0
+        for length, row_aspect, row_height in zip(rows, row_aspects, heights):
+            row_height *= scale
+            row_width = row_aspect * row_height + (length - 1) * h_gap
+            x = left + (width - row_width) / 2
+            for aspect in aspects[position : position + length]:
+                boxes.append(
+                    (int(x), int(y), int(aspect * row_height), int(row_height))
+                )
+                x += aspect * row_height + h_gap
+            y += row_height + v_gap
+            position += length
+        return tuple(boxes)
@@ -0,0 +1,131 @@
+import io
+import threading
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+from pptx.util import Length
+
+from image_index import EXIF_ORIENTATION
+from pptx_settings import PPTXSettings, Pathlike
+
+PixelSize = Tuple[int, int]
+ProcessedImage = Optional[Tuple[bytes, str]]
+
+NATIVE_FORMATS = {"JPEG", "PNG"}
+ALPHA_MODES = {"RGBA", "LA", "PA", "RGBa", "La"}
+CANCEL_POLL_SECONDS = 0.1
+# EXIF orientations shown rotated by a quarter turn, with width and height swapped.
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ALPHA_MODES or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def process_image(
+    image_path: Pathlike, target_size: PixelSize, dpi: int, jpeg_quality: int
+) -> ProcessedImage:
+    """Downsample and re-encode one image so it covers target_size pixels.
+
+    Returns (data, extension), or None when the original file can be embedded as is.
+    Encoder settings are fixed and no metadata is copied, so the output only depends
+    on the input pixels and the arguments.
+    """
+    with Image.open(image_path) as image:
+        source_format = image.format
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        scale = max(target_size[0] / width, target_size[1] / height)
+        if scale >= 1 and source_format in NATIVE_FORMATS:
+            return None
+
+        image = ImageOps.exif_transpose(image)
+        if scale < 1:
+            new_size = (
+                max(1, round(image.width * scale)),
+                max(1, round(image.height * scale)),
+            )
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        if source_format in ("PNG", "GIF") or _has_alpha(image):
+            if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+            image.save(output, "PNG", dpi=(dpi, dpi), compress_level=6)
+            return output.getvalue(), "png"
+
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(
+            output,
+            "JPEG",
+            dpi=(dpi, dpi),
+            quality=jpeg_quality,
+            subsampling=2,
+            optimize=False,
+        )
+        return output.getvalue(), "jpg"
+
+
+def _process_job(job: Tuple[Pathlike, PixelSize, int, int]) -> ProcessedImage:
+    return process_image(*job)
+
+
+class ImagePreprocessor:
+    def __init__(self, settings: Optional[PPTXSettings] = None):
+        self.settings = settings or PPTXSettings()
+
+    def target_size(self, width: Length, height: Length) -> PixelSize:
+        """Pixel size needed to show an image at target_dpi in a width x height box."""
+        dpi = self.settings.target_dpi
+        return (
+            max(1, round(Length(width).inches * dpi)),
+            max(1, round(Length(height).inches * dpi)),
+        )
+
+    def process(
+        self,
+        images: List[Pathlike],
+        target_sizes: List[PixelSize],
+        workers: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> List[ProcessedImage]:
+        """Return the processed (data, extension) of each image, in input order.
+
+        workers overrides settings.preprocess_workers. Once cancel_event is
+        set, images not started are dropped and only the results of the
+        images before them are returned.
+        """
+        jobs = [
+            (image, size, self.settings.target_dpi, self.settings.jpeg_quality)
+            for image, size in zip(images, target_sizes)
+        ]
+        workers = workers or self.settings.preprocess_workers
+        if workers == 1 or len(jobs) <= 1:
+            results = []
+            for job in jobs:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                results.append(_process_job(job))
+            return results
+
+        from concurrent.futures import ProcessPoolExecutor, wait
+
+        results = []
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_process_job, job) for job in jobs]
+            for future in futures:
+                if cancel_event is not None:
+                    while not (
+                        cancel_event.is_set()
+                        or wait([future], CANCEL_POLL_SECONDS).done
+                    ):
+                        pass
+                    if cancel_event.is_set():
+                        executor.shutdown(cancel_futures=True)
+                        break
+                results.append(future.result())
+        return results
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from checkpointed_build import write_atomic
+from generation_stats import GenerationObserver, stage
+from image_packer import PackedSlide
+from package_writer import CompressionPolicy
+from pptx_append import AppendablePackage, slide_partnames
+from pptx_generator import PPTXGenerator
+from pptx_media import FileHashes
+from pptx_settings import PPTXSettings, Pathlike
+from sharded_build import build_shard
+
+BUILD_DIR_SUFFIX = ".build"
+MANIFEST_NAME = "manifest.json"
+DECK_NAME = "deck.pptx"
+MANIFEST_VERSION = 1
+
+
+def slide_fingerprint(slide: PackedSlide, hashes: FileHashes, context: str) -> str:
+    """Identify a slide by its images' contents and boxes, in order, and context."""
+    digest = hashlib.sha1(context.encode())
+    for image, box in zip(*slide):
+        digest.update(f"\n{hashes.sha1(image)} {tuple(box)}".encode())
+    return digest.hexdigest()
+
+
+def _file_identity(path: Path) -> Optional[List[int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class IncrementalGenerator:
+    """Rebuilds a deck, regenerating only the slides whose inputs changed.
+
+    Each planned slide is fingerprinted from its images' contents, their
+    boxes on the slide, the slide size and settings.output_key(). A build
+    directory (<deck>.build by default) keeps the last deck built, the
+    fingerprint of each of its slides and the images' hashes by size and
+    mtime. A rebuild only builds slides with new fingerprints and assembles
+    the deck from them and the previous deck's slide parts and media, which
+    are copied as is. When every fingerprint matches and the output is the
+    file the last build wrote, nothing is written at all.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[PPTXSettings] = None,
+        cache_dir: Optional[Pathlike] = None,
+        observer: Optional[GenerationObserver] = None,
+        build_dir: Optional[Pathlike] = None,
+    ):
+        self.settings = settings or PPTXSettings()
+        self.cache_dir = cache_dir
+        self.observer = observer
+        self.build_dir = build_dir
+        self.slide_count = 0
+        self.rebuilt_slides = 0
+        self.up_to_date = False
+        self.skipped_images = []
+
+    def build(self, images: Iterable[Pathlike], output_path: Pathlike) -> int:
+        """Bring the deck at output_path up to date with images; returns its slide count."""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        build_dir = Path(
+            self.build_dir or output_path.with_name(output_path.name + BUILD_DIR_SUFFIX)
+        )
+        build_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._load_manifest(build_dir)
+        hashes = FileHashes(manifest.get("hashes"))
+
+        planner = PPTXGenerator(self.settings, observer=self.observer)
+        planner.create_presentation(output_path, override=True)
+        slides = list(planner.plan_slides(images))
+        self.skipped_images = planner.skipped_images
+        with stage(self.observer, "fingerprint"):
+            context = repr((self.settings.output_key(), planner.slide_size))
+            fingerprints = [slide_fingerprint(s, hashes, context) for s in slides]
+            digest = hashlib.sha1(context.encode())
+            digest.update("\n".join(fingerprints).encode())
+            input_fingerprint = digest.hexdigest()
+
+        self.slide_count = len(slides)
+        deck_path = build_dir / DECK_NAME
+        # A deck the manifest does not describe, e.g. after a crash between
+        # writing the two, is not reused.
+        deck_identity = _file_identity(deck_path)
+        deck_valid = deck_identity is not None and manifest.get("deck") == deck_identity
+        self.up_to_date = (
+            deck_valid
+            and manifest.get("input") == input_fingerprint
+            and manifest.get("output") == _file_identity(output_path)
+        )
+        if self.up_to_date:
+            self.rebuilt_slides = 0
+            return self.slide_count
+
+        cached = {}
+        if deck_valid:
+            cached = dict(zip(manifest.get("slides", []), slide_partnames(deck_path)))
+        changed = {}
+        for slide, fingerprint in zip(slides, fingerprints):
+            if fingerprint not in cached:
+                changed.setdefault(fingerprint, slide)
+        self.rebuilt_slides = len(changed)
+
+        with tempfile.TemporaryDirectory(prefix=".rebuild-", dir=build_dir) as work:
+            delta_path = Path(work) / "changed.pptx"
+            if changed:
+                with stage(self.observer, "slides"):
+                    build_shard(
+                        self.settings,
+                        list(changed.values()),
+                        delta_path,
+                        planner.slide_size,
+                        self.cache_dir,
+                    )
+                cached.update(
+                    {
+                        fingerprint: partname
+                        for fingerprint, partname in zip(
+                            changed, slide_partnames(delta_path)
+                        )
+                    }
+                )
+
+            new_deck_path = Path(work) / DECK_NAME
+            with stage(self.observer, "assemble"):
+                planner.save_presentation(new_deck_path)
+                sources = [
+                    (delta_path if fingerprint in changed else deck_path)
+                    for fingerprint in fingerprints
+                ]
+                AppendablePackage(new_deck_path).append_slides(
+                    list(zip(sources, map(cached.get, fingerprints))),
+                    policy=CompressionPolicy.from_settings(self.settings),
+                )
+            os.replace(new_deck_path, deck_path)
+
+        temp_output = output_path.with_name(output_path.name + ".tmp")
+        shutil.copyfile(deck_path, temp_output)
+        os.replace(temp_output, output_path)
+        if self.observer is not None:
+            for slides_done in range(1, self.slide_count + 1):
+                self.observer.slide_added(slides_done)
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "input": input_fingerprint,
+            "slides": fingerprints,
+            "deck": _file_identity(deck_path),
+            "output": _file_identity(output_path),
+            "hashes": {
+                str(image): hashes.entries[str(image)]
+                for slide in slides
+                for image in slide.images
+            },
+        }
+        write_atomic(build_dir / MANIFEST_NAME, json.dumps(manifest).encode())
+        return self.slide_count
+
+    @staticmethod
+    def _load_manifest(build_dir: Path) -> Dict[str, Any]:
+        try:
+            manifest = json.loads((build_dir / MANIFEST_NAME).read_text())
+        except (OSError, ValueError):
+            return {}
+        return manifest if manifest.get("version") == MANIFEST_VERSION else {}
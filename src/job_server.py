@@ -0,0 +1,421 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from cli import collect_images
+from generation_stats import GenerationObserver
+from image_cache import ImageCache
+from pptx_generator import GenerationCancelled, PPTXGenerator
+from pptx_settings import PPTXSettings, Pathlike
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 16
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+RETRY_AFTER_SECONDS = 5
+DEFAULT_KEEP_JOBS = 100
+DEFAULT_JOB_TTL = 24 * 60 * 60
+PPTX_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+)
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+Response = Tuple[HTTPStatus, Dict[str, str], Any]
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Job:
+    """One queued deck build and its progress."""
+
+    def __init__(self, job_id: str, spec: Dict[str, Any], output: Path):
+        self.id = job_id
+        self.spec = spec
+        self.output = output
+        self.status = "queued"
+        self.images = 0
+        self.slides_done = 0
+        self.total_slides = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.generator = None
+        self.cancel_requested = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "images": self.images,
+            "slides_done": self.slides_done,
+            "total_slides": self.total_slides,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobObserver(GenerationObserver):
+    def __init__(self, job: Job):
+        self.job = job
+
+    def slide_added(self, slides_done: int) -> None:
+        self.job.slides_done = slides_done
+
+
+class JobServer:
+    """Queues deck builds received over HTTP and runs them on a fixed pool.
+
+    Jobs are JSON deck specs like the CLI's manifest entries: "images" (globs),
+    optional "order" and "settings". The accept loop only parses requests and
+    touches the queue; builds run on worker threads. When queue_size jobs are
+    waiting, new submissions get 503 with a Retry-After header; cancelled jobs
+    stop counting as waiting at once.
+
+    Finished jobs are forgotten, and their decks deleted, job_ttl seconds
+    after they finish (never with None) or once more than keep_jobs have
+    finished, oldest first. Both are checked on each request.
+
+        POST   /jobs              submit, returns the job
+        GET    /jobs              list jobs
+        GET    /jobs/<id>         status and progress
+        GET    /jobs/<id>/result  download the finished .pptx
+        DELETE /jobs/<id>         cancel, or forget a finished job
+    """
+
+    def __init__(
+        self,
+        work_dir: Pathlike,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        cache_dir: Optional[Pathlike] = None,
+        keep_jobs: int = DEFAULT_KEEP_JOBS,
+        job_ttl: Optional[float] = DEFAULT_JOB_TTL,
+    ):
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.cache_dir = cache_dir
+        self.keep_jobs = keep_jobs
+        self.job_ttl = job_ttl
+        self.jobs: Dict[str, Job] = {}
+        # Cancelled jobs stay in the queue until a worker skips them, so the
+        # jobs still waiting are counted separately.
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._waiting = 0
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="deck")
+        self._ids = itertools.count(1)
+
+    async def serve(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        socket_path: Optional[Pathlike] = None,
+    ) -> None:
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self._handle, str(socket_path))
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, spec: Dict[str, Any]) -> Job:
+        if not isinstance(spec, dict) or not spec.get("images"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "A job needs an 'images' list")
+        if isinstance(spec["images"], str):
+            spec["images"] = [spec["images"]]
+        try:
+            PPTXSettings().update(spec.get("settings", {}))
+        except (TypeError, ValueError) as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+        if self._waiting >= self.queue_size:
+            raise HTTPError(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                "Job queue is full",
+                {"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        job_id = f"{next(self._ids):06d}"
+        job = Job(job_id, spec, self.work_dir / f"{job_id}.pptx")
+        self._queue.put_nowait(job)
+        self._waiting += 1
+        self.jobs[job_id] = job
+        return job
+
+    def cancel(self, job: Job) -> None:
+        if job.status in FINISHED_STATES:
+            self._forget(job)
+        elif job.status == "queued":
+            job.status = "cancelled"
+            job.finished = time.time()
+            self._waiting -= 1
+        else:
+            job.cancel_requested = True
+            generator = job.generator
+            if generator is not None:
+                generator.cancel()
+
+    def prune(self) -> None:
+        """Forget finished jobs past job_ttl or beyond keep_jobs."""
+        # A worker sets finished last, so a job without it may still be saving.
+        finished = sorted(
+            (
+                job
+                for job in self.jobs.values()
+                if job.status in FINISHED_STATES and job.finished is not None
+            ),
+            key=lambda job: job.finished,
+        )
+        expired = max(0, len(finished) - self.keep_jobs)
+        if self.job_ttl is not None:
+            cutoff = time.time() - self.job_ttl
+            while expired < len(finished) and finished[expired].finished < cutoff:
+                expired += 1
+        for job in finished[:expired]:
+            self._forget(job)
+
+    def _forget(self, job: Job) -> None:
+        del self.jobs[job.id]
+        job.output.unlink(missing_ok=True)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == "queued":
+                    job.status = "running"
+                    self._waiting -= 1
+                    await loop.run_in_executor(self._executor, self._run_job, job)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job: Job) -> None:
+        """Build job's deck; runs on a worker thread."""
+        job.started = time.time()
+        image_cache = None
+        try:
+            settings = PPTXSettings()
+            settings.update(job.spec.get("settings", {}))
+            images = collect_images(job.spec["images"], job.spec.get("order", "glob"))
+            if not images:
+                raise ValueError(f"No images matched {job.spec['images']}")
+            job.images = len(images)
+            job.total_slides = -(-len(images) // settings.images_per_slide)
+
+            if self.cache_dir:
+                image_cache = ImageCache(self.cache_dir)
+            job.generator = PPTXGenerator(settings, image_cache, JobObserver(job))
+            job.generator.create_presentation(job.output, override=True)
+            if job.cancel_requested:
+                raise GenerationCancelled()
+            job.generator.add_images(images)
+            job.generator.save_presentation(job.output)
+            job.status = "done"
+        except GenerationCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        finally:
+            if image_cache is not None:
+                image_cache.close()
+            job.generator = None
+            job.finished = time.time()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            method, path, body = await self._read_request(reader)
+            status, headers, content = self._route(method, path, body)
+        except HTTPError as e:
+            status, headers, content = e.status, e.headers, {"error": str(e)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            traceback.print_exc()
+            status, headers, content = (
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {},
+                {"error": f"{type(e).__name__}: {e}"},
+            )
+
+        try:
+            await self._write_response(writer, status, headers, content)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @classmethod
+    async def _read_request(
+        cls, reader: asyncio.StreamReader
+    ) -> Tuple[str, str, bytes]:
+        request_line = (await cls._read_line(reader)).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        method, path, _ = request_line
+
+        length = 0
+        while (line := await cls._read_line(reader)) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                value = value.strip()
+                if not (value.isascii() and value.isdigit()):
+                    raise HTTPError(
+                        HTTPStatus.BAD_REQUEST, f"Invalid Content-Length: {value!r}"
+                    )
+                length = int(value)
+        if length > MAX_REQUEST_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0].rstrip("/"), body
+
+    @staticmethod
+    async def _read_line(reader: asyncio.StreamReader) -> bytes:
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            # readline raises these for a line longer than the reader's limit.
+            raise HTTPError(
+                HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                "Request line or header too long",
+            )
+
+    def _route(self, method: str, path: str, body: bytes) -> Response:
+        self.prune()
+        parts = path.strip("/").split("/")
+        if parts[0] != "jobs" or len(parts) > 3:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such resource: {path}")
+
+        if len(parts) == 1:
+            if method == "GET":
+                return HTTPStatus.OK, {}, [job.to_dict() for job in self.jobs.values()]
+            if method == "POST":
+                try:
+                    spec = json.loads(body or b"null")
+                except json.JSONDecodeError as e:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+                job = self.submit(spec)
+                return (
+                    HTTPStatus.ACCEPTED,
+                    {"Location": f"/jobs/{job.id}"},
+                    job.to_dict(),
+                )
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed")
+
+        job = self.jobs.get(parts[1])
+        if job is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such job: {parts[1]}")
+
+        if len(parts) == 3:
+            if parts[2] != "result" or method != "GET":
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No such resource: {path}")
+            if job.status != "done":
+                raise HTTPError(HTTPStatus.CONFLICT, f"Job is {job.status}")
+            return HTTPStatus.OK, {"Content-Type": PPTX_CONTENT_TYPE}, job.output
+
+        if method == "GET":
+            return HTTPStatus.OK, {}, job.to_dict()
+        if method == "DELETE":
+            self.cancel(job)
+            return HTTPStatus.OK, {}, job.to_dict()
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed")
+
+    @staticmethod
+    async def _write_response(
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        headers: Dict[str, str],
+        content: Any,
+    ) -> None:
+        if isinstance(content, Path):
+            length = content.stat().st_size
+        else:
+            content = json.dumps(content).encode()
+            headers = {"Content-Type": "application/json", **headers}
+            length = len(content)
+
+        head = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        head += [f"Content-Length: {length}", "Connection: close", "", ""]
+        writer.write("\r\n".join(head).encode("latin-1"))
+
+        if isinstance(content, Path):
+            with open(content, "rb") as f:
+                while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+                    writer.write(chunk)
+                    await writer.drain()
+        else:
+            writer.write(content)
+        await writer.drain()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve deck generation jobs locally")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", type=Path, help="listen on a Unix socket instead")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--work-dir", type=Path, default=Path("deck-jobs"))
+    parser.add_argument("--cache-dir", type=Path, help="persistent image cache")
+    parser.add_argument(
+        "--keep-jobs",
+        type=int,
+        default=DEFAULT_KEEP_JOBS,
+        help="finished jobs to keep, with their decks",
+    )
+    parser.add_argument(
+        "--job-ttl",
+        type=float,
+        default=DEFAULT_JOB_TTL,
+        help="seconds to keep a finished job, 0 to keep them until --keep-jobs",
+    )
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = JobServer(
+            args.work_dir,
+            args.workers,
+            args.queue_size,
+            args.cache_dir,
+            args.keep_jobs,
+            args.job_ttl or None,
+        )
+        await server.serve(args.host, args.port, args.socket)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
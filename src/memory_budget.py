@@ -0,0 +1,58 @@
+import re
+from typing import Union
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+BYTE_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*$", re.IGNORECASE)
+# Share of the budget that may be held until the deck is saved; the rest is
+# left for the batch being prepared.
+HOLD_FRACTION = 0.5
+# Pillow keeps RGB and most other modes at four bytes a pixel once decoded.
+DECODED_BYTES_PER_PIXEL = 4
+
+
+def parse_bytes(value: Union[int, str]) -> int:
+    """A byte count given as a number or a string such as "512M" or "2GB"."""
+    if isinstance(value, int):
+        return value
+    match = BYTE_SIZE.match(value)
+    if match is None:
+        raise ValueError(f"Invalid byte size '{value}', expected e.g. 512M or 2G")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+class MemoryBudget:
+    """Bytes of image data a generator keeps in memory, against a limit.
+
+    held counts image data kept until the presentation is saved; pending
+    work, such as the batch being prepared and the images decoded by the
+    workers, is reported with use(). peak is the most held and pending
+    together. The counts are estimates from file sizes and image headers,
+    and do not include the interpreter or python-pptx's own objects.
+    """
+
+    def __init__(self, max_bytes: int):
+        if max_bytes <= 0:
+            raise ValueError(f"max_memory must be positive, got {max_bytes}")
+        self.max_bytes = max_bytes
+        self.held = 0
+        self.peak = 0
+
+    @property
+    def available(self) -> int:
+        """Bytes left for pending work."""
+        return max(0, self.max_bytes - self.held)
+
+    def can_hold(self, nbytes: int) -> bool:
+        """Whether nbytes more can be kept until the save."""
+        return self.held + nbytes <= self.max_bytes * HOLD_FRACTION
+
+    def use(self, pending: int) -> None:
+        self.peak = max(self.peak, self.held + pending)
+
+    def hold(self, nbytes: int) -> None:
+        self.held += nbytes
+        self.use(0)
+
+    def release(self) -> None:
+        """Forget held data, e.g. once it has been written to the deck."""
+        self.held = 0
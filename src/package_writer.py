@@ -0,0 +1,98 @@
+import zipfile
+from typing import IO, NamedTuple, Optional, Union
+
+from pptx.opc.packuri import PackURI
+from pptx.opc.serialized import PackageWriter, _ZipPkgWriter
+from pptx.util import lazyproperty
+
+from pptx_media import FileImagePart
+from pptx_settings import Pathlike, PPTXSettings
+
+# Formats whose payload is already compressed; deflating them again costs CPU
+# for a size change of a fraction of a percent.
+COMPRESSED_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "mp3", "mp4", "m4a", "m4v"}
+
+
+class CompressionPolicy(NamedTuple):
+    """How each ZIP member of a saved deck is compressed.
+
+    XML and other uncompressed parts are always deflated, at level (None for
+    zlib's default). With store_media, already-compressed media are stored.
+    """
+
+    store_media: bool = False
+    level: Optional[int] = None
+
+    @classmethod
+    def from_settings(cls, settings: PPTXSettings) -> "CompressionPolicy":
+        return cls(settings.store_media, settings.compress_level)
+
+    def compress_type(self, membername: str) -> int:
+        ext = membername.rpartition(".")[2].lower()
+        if self.store_media and ext in COMPRESSED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+
+class _PolicyZipWriter(_ZipPkgWriter):
+    def __init__(self, pkg_file: Union[str, IO[bytes]], policy: CompressionPolicy):
+        super().__init__(pkg_file)
+        self._policy = policy
+
+    def write(self, pack_uri: PackURI, blob: bytes) -> None:
+        self._zipf.writestr(
+            pack_uri.membername,
+            blob,
+            compress_type=self._policy.compress_type(pack_uri.membername),
+        )
+
+    def write_file(self, pack_uri: PackURI, path: Pathlike) -> None:
+        """Copy a file into the package without reading it into memory."""
+        self._zipf.write(
+            path,
+            pack_uri.membername,
+            compress_type=self._policy.compress_type(pack_uri.membername),
+        )
+
+    @lazyproperty
+    def _zipf(self) -> zipfile.ZipFile:
+        return zipfile.ZipFile(
+            self._pkg_file,
+            "w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=self._policy.level,
+            strict_timestamps=False,
+        )
+
+
+class _PolicyPackageWriter(PackageWriter):
+    def __init__(self, pkg_file, pkg_rels, parts, policy: CompressionPolicy):
+        super().__init__(pkg_file, pkg_rels, parts)
+        self._policy = policy
+
+    def _write(self) -> None:
+        with _PolicyZipWriter(self._pkg_file, self._policy) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+    def _write_parts(self, phys_writer: _PolicyZipWriter) -> None:
+        for part in self._parts:
+            if isinstance(part, FileImagePart):
+                phys_writer.write_file(part.partname, part.path)
+            else:
+                phys_writer.write(part.partname, part.blob)
+            if part._rels:
+                phys_writer.write(part.partname.rels_uri, part.rels.xml)
+
+
+def save_presentation(
+    presentation, pkg_file: Union[Pathlike, IO[bytes]], policy: CompressionPolicy
+) -> None:
+    """Save presentation like Presentation.save, compressing parts by policy."""
+    if not hasattr(pkg_file, "write"):
+        pkg_file = str(pkg_file)
+    package = presentation.part.package
+    _PolicyPackageWriter(
+        pkg_file, package._rels, tuple(package.iter_parts()), policy
+    )._write()
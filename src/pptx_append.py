@@ -0,0 +1,582 @@
+import copy
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import struct
+import zipfile
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.constants import RELATIONSHIP_TARGET_MODE as RTM
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import CT_Relationships, serialize_part_xml
+from pptx.opc.packuri import PackURI
+from pptx.opc.spec import image_content_types
+from pptx.oxml import parse_xml
+from pptx.parts.image import ImagePart
+from pptx.parts.slide import SlideLayoutPart
+
+from package_writer import CompressionPolicy
+from pptx_media import (
+    MEDIA_PARTNAME_PREFIX,
+    DeckImagePart,
+    FileImagePart,
+    PackageMedia,
+)
+from pptx_settings import BLANK_SLIDE_LAYOUT, Pathlike
+
+CONTENT_TYPES_NAME = "[Content_Types].xml"
+PACKAGE_RELS_NAME = "_rels/.rels"
+SLIDE_PARTNAME_PREFIX = "/ppt/slides/slide"
+PARTNAME_INDEX = re.compile(r"(\d+)\.\w+$")
+COPY_CHUNK_SIZE = 1024 * 1024
+# Local file header fields holding the file name and extra field lengths.
+FILE_HEADER_NAME_LENGTH = 10
+FILE_HEADER_EXTRA_LENGTH = 11
+# Largest data descriptor zipfile writes after a member, with a signature.
+DATA_DESCRIPTOR_SIZE = 24
+# Replaced index parts stay in the file; once they take this share of it, and
+# at least COMPACT_MIN_BYTES, the package is rewritten without them.
+COMPACT_SHARE = 0.25
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+def rels_name(partname: str) -> str:
+    """ZIP member name of the .rels part for partname."""
+    directory, filename = posixpath.split(partname)
+    return posixpath.join(directory, "_rels", f"{filename}.rels").lstrip("/")
+
+
+def _resolve(source_partname: str, target_ref: str) -> str:
+    return posixpath.normpath(
+        posixpath.join(posixpath.dirname(source_partname), target_ref)
+    )
+
+
+def _read_rels(package: zipfile.ZipFile, partname: str) -> CT_Relationships:
+    name = rels_name(partname)
+    if name not in package.NameToInfo:
+        return CT_Relationships.new()
+    return parse_xml(package.read(name))
+
+
+def copy_member(
+    package: zipfile.ZipFile,
+    source: zipfile.ZipFile,
+    name: str,
+    new_name: str,
+    compress_type: int = zipfile.ZIP_DEFLATED,
+) -> None:
+    """Copy member name of source into package as new_name.
+
+    When the member is already stored with compress_type its compressed
+    bytes are copied as they are, which zipfile has no public API for;
+    otherwise it is recompressed.
+    """
+    info = source.getinfo(name)
+    if info.compress_type != compress_type:
+        package.writestr(new_name, source.read(name), compress_type)
+        return
+
+    source.fp.seek(info.header_offset)
+    header = struct.unpack(
+        zipfile.structFileHeader, source.fp.read(zipfile.sizeFileHeader)
+    )
+    source.fp.seek(
+        header[FILE_HEADER_NAME_LENGTH] + header[FILE_HEADER_EXTRA_LENGTH], os.SEEK_CUR
+    )
+    new_info = zipfile.ZipInfo(new_name, info.date_time)
+    new_info.compress_type = compress_type
+    new_info.CRC = info.CRC
+    new_info.compress_size = info.compress_size
+    new_info.file_size = info.file_size
+    new_info.external_attr = info.external_attr
+    # Sizes and CRC are known up front, so no data descriptor follows.
+    new_info.flag_bits = info.flag_bits & ~0x08
+
+    package.fp.seek(package.start_dir)
+    new_info.header_offset = package.fp.tell()
+    package._didModify = True
+    package.fp.write(new_info.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.fp.read(min(remaining, COPY_CHUNK_SIZE))
+        package.fp.write(chunk)
+        remaining -= len(chunk)
+    package.filelist.append(new_info)
+    package.NameToInfo[new_name] = new_info
+    package.start_dir = package.fp.tell()
+
+
+def member_bytes(info: zipfile.ZipInfo) -> int:
+    """Approximate bytes member info takes in the file, header included."""
+    nbytes = zipfile.sizeFileHeader + len(info.filename.encode()) + len(info.extra)
+    if info.flag_bits & 0x08:
+        nbytes += DATA_DESCRIPTOR_SIZE
+    return nbytes + info.compress_size
+
+
+def _presentation_partname(package: zipfile.ZipFile) -> str:
+    for rel in parse_xml(package.read(PACKAGE_RELS_NAME)).relationship_lst:
+        if rel.reltype == RT.OFFICE_DOCUMENT:
+            return "/" + rel.target_ref.lstrip("/")
+    raise ValueError(f"Package has no {RT.OFFICE_DOCUMENT} relationship")
+
+
+def _slide_partnames(package: zipfile.ZipFile) -> List[str]:
+    """Partnames of the package's slides, in presentation order."""
+    presentation_partname = _presentation_partname(package)
+    presentation = parse_xml(package.read(presentation_partname.lstrip("/")))
+    rels = {
+        rel.rId: rel.target_ref
+        for rel in _read_rels(package, presentation_partname).relationship_lst
+    }
+    slide_ids = presentation.sldIdLst
+    if slide_ids is None:
+        return []
+    return [
+        _resolve(presentation_partname, rels[slide_id.rId])
+        for slide_id in slide_ids.sldId_lst
+    ]
+
+
+def slide_partnames(path: Pathlike) -> List[str]:
+    """Partnames of the slides of the .pptx at path, in presentation order."""
+    with zipfile.ZipFile(path) as package:
+        return _slide_partnames(package)
+
+
+class AppendablePackage:
+    """An existing .pptx that slides can be appended to without rewriting it.
+
+    Only the package's index parts are read: presentation.xml, the content
+    types and the relationships needed to find the blank layout. append()
+    adds the slides of a separately built presentation as new ZIP members and
+    rewrites just those index parts, so its cost depends on the new slides
+    and media and not on the size of the deck.
+
+    media indexes the deck's images by content, and keeps track of those
+    appended since; appended media already stored in the deck is not stored
+    again.
+
+    Each append leaves the previous copies of the index parts in the file,
+    unlisted; orphan_bytes estimates their size. Once they pass COMPACT_SHARE
+    of the file, and COMPACT_MIN_BYTES, append compacts the package, so a deck
+    appended to many times stays within a constant factor of its contents.
+    """
+
+    def __init__(self, path: Pathlike):
+        self.path = Path(path)
+        with zipfile.ZipFile(self.path) as package:
+            self._names = set(package.namelist())
+            self._content_types = parse_xml(package.read(CONTENT_TYPES_NAME))
+            self.presentation_partname = _presentation_partname(package)
+            self._presentation = parse_xml(
+                package.read(self.presentation_partname.lstrip("/"))
+            )
+            self._presentation_rels = parse_xml(
+                package.read(rels_name(self.presentation_partname))
+            )
+            self.blank_layout_partname = self._find_layout(package, BLANK_SLIDE_LAYOUT)
+            self.orphan_bytes = max(
+                0, package.start_dir - sum(map(member_bytes, package.infolist()))
+            )
+
+        slide_size = self._presentation.sldSz
+        self.slide_size = None if slide_size is None else (slide_size.cx, slide_size.cy)
+        self._media = None
+
+    @property
+    def media(self) -> PackageMedia:
+        if self._media is None:
+            self._media = PackageMedia(self.path)
+        return self._media
+
+    @property
+    def slide_count(self) -> int:
+        slide_ids = self._presentation.sldIdLst
+        return 0 if slide_ids is None else len(slide_ids.sldId_lst)
+
+    def append(
+        self,
+        presentation,
+        output_path: Optional[Pathlike] = None,
+        policy: CompressionPolicy = CompressionPolicy(),
+    ) -> None:
+        """Add the slides of presentation to the end of the deck.
+
+        presentation is a python-pptx Presentation holding only the new
+        slides, built from any template; each slide is attached to this
+        deck's blank layout. When output_path differs from the deck, the
+        deck is copied there first and the copy is appended to. Pictures of
+        DeckImageParts refer to the deck's own media.
+
+        New members are compressed according to policy. If writing fails the
+        file is restored to its previous contents.
+        """
+        self._use_output(output_path)
+        slide_parts = [slide.part for slide in presentation.slides]
+        slide_names = self._new_partnames(
+            SLIDE_PARTNAME_PREFIX, "xml", len(slide_parts)
+        )
+        media_names = self._name_media(slide_parts)
+
+        def write_members(package: zipfile.ZipFile) -> None:
+            for part, partname in media_names.items():
+                membername = partname.lstrip("/")
+                compress_type = policy.compress_type(membername)
+                if isinstance(part, FileImagePart):
+                    package.write(part.path, membername, compress_type)
+                else:
+                    package.writestr(membername, part.blob, compress_type)
+            for part, partname in zip(slide_parts, slide_names):
+                package.writestr(partname.lstrip("/"), part.blob)
+                package.writestr(
+                    rels_name(partname),
+                    self._slide_rels(part, partname, media_names).xml_file_bytes,
+                )
+
+        self._commit(write_members, slide_names, list(media_names.values()), policy)
+        if self._media is not None:
+            for part, partname in media_names.items():
+                if isinstance(part, FileImagePart):
+                    nbytes = part.path.stat().st_size
+                else:
+                    nbytes = len(part.blob)
+                self._media.add(partname, nbytes, part.sha1)
+
+    def append_packages(
+        self,
+        sources: Sequence[Pathlike],
+        output_path: Optional[Pathlike] = None,
+        policy: CompressionPolicy = CompressionPolicy(),
+    ) -> None:
+        """Add the slides of other .pptx files, in order, to the end of the deck.
+
+        The sources' slide and media members are copied without loading them
+        into python-pptx; slides are renumbered after this deck's, get new
+        slide ids and are attached to its blank layout. Media with the same
+        content in several sources, or already in the deck, are stored once.
+        Like append, the index parts are rewritten once and a failed write is
+        rolled back.
+        """
+        slides = [
+            (source, partname)
+            for source in sources
+            for partname in slide_partnames(source)
+        ]
+        self.append_slides(slides, output_path, policy)
+
+    def append_slides(
+        self,
+        slides: Sequence[Tuple[Pathlike, str]],
+        output_path: Optional[Pathlike] = None,
+        policy: CompressionPolicy = CompressionPolicy(),
+    ) -> None:
+        """Add slides of other .pptx files, given as (source, partname), in order.
+
+        Slides are copied as append_packages copies them; they can come from
+        any mix of sources and the same slide may be listed more than once.
+        """
+        self._use_output(output_path)
+        slides = [(Path(source), partname) for source, partname in slides]
+        sources = [source for source, _ in slides]
+        slide_names = self._new_partnames(SLIDE_PARTNAME_PREFIX, "xml", len(slides))
+        first_media = self._next_index(MEDIA_PARTNAME_PREFIX)
+        # Index the deck before writing to it moves its ZIP directory.
+        deck_media = self.media
+        media_names: Dict[Tuple[str, str], str] = {}
+        new_media: List[Tuple[str, int, str]] = []
+        source_media: Dict[Tuple[Path, str], str] = {}
+
+        def copy_media(package, source_package, source, partname) -> str:
+            """New partname of a source media part; identical media are stored once."""
+            if (source, partname) not in source_media:
+                digest = hashlib.sha1()
+                with source_package.open(partname.lstrip("/")) as f:
+                    while chunk := f.read(COPY_CHUNK_SIZE):
+                        digest.update(chunk)
+                ext = PackURI(partname).ext
+                key = (digest.hexdigest(), ext)
+                nbytes = source_package.getinfo(partname.lstrip("/")).file_size
+                if key not in media_names and nbytes in deck_media.sizes:
+                    existing = deck_media.find(nbytes, key[0], package)
+                    if existing is not None:
+                        media_names[key] = existing
+                if key not in media_names:
+                    name = (
+                        f"{MEDIA_PARTNAME_PREFIX}{first_media + len(new_media)}.{ext}"
+                    )
+                    membername = name.lstrip("/")
+                    copy_member(
+                        package,
+                        source_package,
+                        partname.lstrip("/"),
+                        membername,
+                        policy.compress_type(membername),
+                    )
+                    media_names[key] = name
+                    new_media.append((name, nbytes, key[0]))
+                source_media[source, partname] = media_names[key]
+            return source_media[source, partname]
+
+        def write_members(package: zipfile.ZipFile) -> None:
+            with ExitStack() as stack:
+                opened = {
+                    source: stack.enter_context(zipfile.ZipFile(source))
+                    for source in dict.fromkeys(sources)
+                }
+                for (source, partname), new_name in zip(slides, slide_names):
+                    source_package = opened[source]
+                    base_uri = PackURI(new_name).baseURI
+                    rels = CT_Relationships.new()
+                    for rel in _read_rels(source_package, partname).relationship_lst:
+                        if rel.targetMode == RTM.EXTERNAL:
+                            rels.add_rel(rel.rId, rel.reltype, rel.target_ref, True)
+                            continue
+                        if rel.reltype == RT.SLIDE_LAYOUT:
+                            target = self.blank_layout_partname
+                        elif rel.reltype == RT.IMAGE:
+                            target = copy_media(
+                                package,
+                                source_package,
+                                source,
+                                _resolve(partname, rel.target_ref),
+                            )
+                        else:
+                            raise ValueError(
+                                f"Cannot append a slide related to {rel.target_ref}"
+                            )
+                        rels.add_rel(
+                            rel.rId, rel.reltype, PackURI(target).relative_ref(base_uri)
+                        )
+                    copy_member(
+                        package,
+                        source_package,
+                        partname.lstrip("/"),
+                        new_name.lstrip("/"),
+                    )
+                    package.writestr(rels_name(new_name), rels.xml_file_bytes)
+
+        self._commit(
+            write_members,
+            slide_names,
+            (name for name, _, _ in new_media),
+            policy,
+        )
+        for name, nbytes, sha1 in new_media:
+            deck_media.add(name, nbytes, sha1)
+
+    def _use_output(self, output_path: Optional[Pathlike]) -> None:
+        output_path = Path(output_path or self.path)
+        if output_path.resolve() != self.path.resolve():
+            shutil.copyfile(self.path, output_path)
+            self.path = output_path
+            if self._media is not None:
+                self._media.path = output_path
+
+    def _commit(
+        self,
+        write_members: Callable[[zipfile.ZipFile], None],
+        slide_names: List[str],
+        media_names: Iterable[str],
+        policy: CompressionPolicy,
+    ) -> None:
+        """Run write_members on the open package, then rewrite the index parts.
+
+        If anything fails the file is truncated back to its previous contents.
+        media_names is read after write_members, so it may be filled in there.
+        """
+        package = zipfile.ZipFile(
+            self.path, "a", zipfile.ZIP_DEFLATED, compresslevel=policy.level
+        )
+        original_end = package.start_dir
+        with open(self.path, "rb") as f:
+            f.seek(original_end)
+            original_tail = f.read()
+
+        try:
+            write_members(package)
+            media_names = list(media_names)
+            index = self._write_index(package, slide_names, media_names)
+        except BaseException:
+            package.close()
+            with open(self.path, "r+b") as f:
+                f.seek(original_end)
+                f.write(original_tail)
+                f.truncate()
+            raise
+        package.close()
+        *index, replaced_bytes = index
+        self._content_types, self._presentation, self._presentation_rels = index
+        self._names.update(name.lstrip("/") for name in slide_names)
+        self._names.update(name.lstrip("/") for name in media_names)
+        self.orphan_bytes += replaced_bytes
+        if self.orphan_bytes > max(
+            COMPACT_MIN_BYTES, COMPACT_SHARE * self.path.stat().st_size
+        ):
+            try:
+                self.compact()
+            except OSError:
+                # The slides are appended; a later append compacts again.
+                pass
+
+    def compact(self) -> None:
+        """Rewrite the package without the members earlier appends replaced.
+
+        Listed members are copied as they are stored, without recompressing.
+        The new file replaces the deck only once it is complete.
+        """
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with zipfile.ZipFile(self.path) as source, zipfile.ZipFile(
+                temp_path, "w"
+            ) as package:
+                for info in source.infolist():
+                    copy_member(
+                        package,
+                        source,
+                        info.filename,
+                        info.filename,
+                        info.compress_type,
+                    )
+            shutil.copymode(self.path, temp_path)
+            os.replace(temp_path, self.path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        self.orphan_bytes = 0
+
+    def _name_media(self, slide_parts) -> Dict[ImagePart, str]:
+        image_parts = []
+        for slide_part in slide_parts:
+            for rel in slide_part.rels.values():
+                if (
+                    not rel.is_external
+                    and isinstance(rel.target_part, ImagePart)
+                    and not isinstance(rel.target_part, DeckImagePart)
+                    and rel.target_part not in image_parts
+                ):
+                    image_parts.append(rel.target_part)
+
+        next_idx = self._next_index(MEDIA_PARTNAME_PREFIX)
+        return {
+            part: f"{MEDIA_PARTNAME_PREFIX}{next_idx + i}.{part.partname.ext}"
+            for i, part in enumerate(image_parts)
+        }
+
+    def _new_partnames(self, prefix: str, ext: str, count: int) -> List[str]:
+        next_idx = self._next_index(prefix)
+        return [f"{prefix}{next_idx + i}.{ext}" for i in range(count)]
+
+    def _next_index(self, prefix: str) -> int:
+        prefix = prefix.lstrip("/")
+        indices = [
+            int(match.group(1))
+            for name in self._names
+            if name.startswith(prefix)
+            and (match := PARTNAME_INDEX.match(name[len(prefix) :]))
+        ]
+        return max(indices, default=0) + 1
+
+    def _slide_rels(
+        self, slide_part, partname: str, media_names: Dict[ImagePart, str]
+    ) -> CT_Relationships:
+        base_uri = PackURI(partname).baseURI
+        rels = CT_Relationships.new()
+        for rId, rel in sorted(slide_part.rels.items()):
+            if rel.is_external:
+                rels.add_rel(rId, rel.reltype, rel.target_ref, True)
+                continue
+            if isinstance(rel.target_part, SlideLayoutPart):
+                target = self.blank_layout_partname
+            elif rel.target_part in media_names:
+                target = media_names[rel.target_part]
+            elif isinstance(rel.target_part, DeckImagePart):
+                target = rel.target_part.partname
+            else:
+                raise ValueError(
+                    f"Cannot append a slide related to {rel.target_part.partname}"
+                )
+            rels.add_rel(rId, rel.reltype, PackURI(target).relative_ref(base_uri))
+        return rels
+
+    def _write_index(self, package: zipfile.ZipFile, slide_names, media_names):
+        """Write updated copies of the index parts.
+
+        Returns them, and the bytes of the copies they replace.
+        """
+        content_types = copy.deepcopy(self._content_types)
+        presentation = copy.deepcopy(self._presentation)
+        presentation_rels = copy.deepcopy(self._presentation_rels)
+
+        base_uri = PackURI(self.presentation_partname).baseURI
+        slide_ids = presentation.get_or_add_sldIdLst()
+        next_rId = 1 + max(
+            (
+                int(rel.rId[3:])
+                for rel in presentation_rels.relationship_lst
+                if rel.rId[3:].isdigit()
+            ),
+            default=0,
+        )
+        for partname in slide_names:
+            rId = f"rId{next_rId}"
+            next_rId += 1
+            presentation_rels.add_rel(
+                rId, RT.SLIDE, PackURI(partname).relative_ref(base_uri)
+            )
+            slide_ids.add_sldId(rId)
+            content_types.add_override(PackURI(partname), CT.PML_SLIDE)
+
+        defaults = {default.extension.lower() for default in content_types.default_lst}
+        for partname in media_names:
+            ext = PackURI(partname).ext
+            if ext.lower() not in defaults:
+                content_types.add_default(ext, image_content_types[ext.lower()])
+                defaults.add(ext.lower())
+
+        replaced_bytes = (
+            self._replace(package, CONTENT_TYPES_NAME, content_types)
+            + self._replace(
+                package, self.presentation_partname.lstrip("/"), presentation
+            )
+            + self._replace(
+                package, rels_name(self.presentation_partname), presentation_rels
+            )
+        )
+        return content_types, presentation, presentation_rels, replaced_bytes
+
+    @staticmethod
+    def _replace(package: zipfile.ZipFile, name: str, element) -> int:
+        """Point the ZIP directory at a new copy of member name.
+
+        The old member's bytes stay in the file but are no longer listed, until
+        compact() or a full save without appending; returns their size.
+        """
+        info = package.NameToInfo.pop(name)
+        package.filelist.remove(info)
+        package.writestr(
+            name, serialize_part_xml(element), compress_type=info.compress_type
+        )
+        return member_bytes(info)
+
+    def _find_layout(self, package: zipfile.ZipFile, index: int) -> str:
+        """Partname of the index-th layout of the first slide master."""
+        rels = {
+            rel.rId: rel.target_ref for rel in self._presentation_rels.relationship_lst
+        }
+        master_id = self._presentation.sldMasterIdLst.sldMasterId_lst[0]
+        master_partname = _resolve(self.presentation_partname, rels[master_id.rId])
+        master = parse_xml(package.read(master_partname.lstrip("/")))
+        master_rels = {
+            rel.rId: rel.target_ref
+            for rel in parse_xml(
+                package.read(rels_name(master_partname))
+            ).relationship_lst
+        }
+        layout_id = master.get_or_add_sldLayoutIdLst().sldLayoutId_lst[index]
+        return _resolve(master_partname, master_rels[layout_id.rId])
@@ -1,64 +1,524 @@
+import os
+import shutil
+import tempfile
+import threading
+from itertools import islice
 from pathlib import Path
-from typing import Optional, List
+from typing import Iterable, Iterator, Optional, List, Tuple
 
 from pptx.slide import Slide
 from pptx import Presentation
 
+from generation_stats import GenerationObserver, stage
+from image_cache import ImageCache
+from image_index import info_problem, probe_image
 from image_layout_manager import ImageLayoutManager
-from pptx_settings import PPTXSettings, Pathlike, BLANK_SLIDE_LAYOUT
+from image_packer import PACKING_MODES, ImagePacker, PackedSlide
+from image_preprocessor import ImagePreprocessor
+from memory_budget import DECODED_BYTES_PER_PIXEL, MemoryBudget, parse_bytes
+from package_writer import CompressionPolicy, save_presentation
+from pptx_append import AppendablePackage
+from pptx_media import (
+    PIL_FORMAT_EXTS,
+    FileHashes,
+    FileImage,
+    MediaIndex,
+    image_filename,
+    load_image,
+    prepared_image,
+)
+from pptx_settings import PPTXSettings, Pathlike, ImageSource, BLANK_SLIDE_LAYOUT
+
+PREPARE_BATCH_SLIDES = 64
+PACK_CHUNK_SLIDES = 2500
+BAD_IMAGE_POLICIES = ("fail", "skip")
+
+
+class GenerationCancelled(Exception):
+    """Raised by add_images when cancel() was called during the run."""
+
+
+def decoded_bytes(image_path: Pathlike) -> int:
+    """Bytes image_path takes once decoded, from its header; 0 if unreadable."""
+    try:
+        info = probe_image(image_path)
+    except OSError:
+        return 0
+    return (info.width or 0) * (info.height or 0) * DECODED_BYTES_PER_PIXEL
+
+
+def image_problem(image_path: Pathlike, keep_originals: bool = True) -> Optional[str]:
+    """Why image_path cannot be placed on a slide, from its header; None if it can.
+
+    Formats python-pptx cannot embed are fine when images are re-encoded.
+    """
+    try:
+        info = probe_image(image_path)
+    except OSError as e:
+        return f"{type(e).__name__}: {e}"
+    return info_problem(info, PIL_FORMAT_EXTS if keep_originals else None)
 
 
 class PPTXGenerator:
-    def __init__(self, settings: Optional[PPTXSettings] = None):
+    def __init__(
+        self,
+        settings: Optional[PPTXSettings] = None,
+        image_cache: Optional[ImageCache] = None,
+        observer: Optional[GenerationObserver] = None,
+    ):
         self.presentation = None
         self.settings = settings or PPTXSettings()
+        self.image_cache = image_cache
+        self.observer = observer
         self.slide_size = None
+        self._media_index = None
+        self._spill_dir = None
+        self._appendable = None
+        self._appending = False
+        self._spilling = False
+        self._batch_bytes = 0
+        self._batch_decoded = 0
+        self.memory_budget: Optional[MemoryBudget] = None
+        self._cancel_event = threading.Event()
+        self.skipped_images: List[Tuple[str, str]] = []
+        self.existing_images: List[str] = []
+        self.file_hashes = FileHashes()
+
+    def cancel(self) -> None:
+        """Ask add_images, possibly running on another thread, to stop.
+
+        The request holds until reset_cancel, so a cancel made before the
+        build thread gets going still stops it.
+        """
+        self._cancel_event.set()
+
+    def reset_cancel(self) -> None:
+        """Forget an earlier cancel(); call it before starting a new build."""
+        self._cancel_event.clear()
 
     def create_presentation(
         self, presentation_path: Pathlike, override: bool = False
     ) -> None:
-        if Path(presentation_path).exists() and not override:
-            self.presentation = Presentation(str(presentation_path))
-        else:
-            self.presentation = Presentation()
+        """Start a new presentation, or open presentation_path to add to it.
 
+        With settings.append_in_place, an existing deck is not loaded: new
+        slides are built in a blank presentation and save_presentation
+        appends them to the deck's ZIP package, leaving existing slides and
+        media untouched.
+
+        Images whose contents the deck already holds are not stored again:
+        their pictures refer to the existing media. Files are matched by size
+        first and only hashed when the deck has media of the same size; their
+        hashes are kept in file_hashes while the files are unchanged.
+        """
+        self._appendable = None
+        self._appending = Path(presentation_path).exists() and not override
+        with stage(self.observer, "open"):
+            if not self._appending:
+                self.presentation = Presentation()
+            elif self.settings.append_in_place:
+                self._open_appendable(presentation_path)
+            else:
+                self.presentation = Presentation(str(presentation_path))
+
+        self._media_index = None
+        self._spill_dir = None
+        self._spilling = self.settings.low_memory
+        self.memory_budget = None
+        if self.settings.max_memory:
+            self.memory_budget = MemoryBudget(parse_bytes(self.settings.max_memory))
         self.slide_size = (
             self.presentation.slide_width,
             self.presentation.slide_height,
         )
 
-    def add_images(self, images: List[Pathlike]) -> None:
-        images_grouped_by_four = [images[i : i + 4] for i in range(0, len(images), 4)]
+    def add_images(self, images: Iterable[Pathlike]) -> None:
+        """Add images settings.images_per_slide to a slide, consuming images lazily.
+
+        Any iterable works, so paths can come from a generator. Images are
+        prepared a batch of slides at a time; with settings.low_memory the
+        image bytes stay on disk until save_presentation. With
+        settings.packing == "aspect", images are packed onto slides by their
+        aspect ratio, PACK_CHUNK_SLIDES slides' worth at a time.
+
+        With settings.max_memory, memory_budget tracks the image data held
+        and in flight: batches are cut to the room left, fewer workers
+        process images when their decoded size calls for it, and once half
+        the budget is held the remaining images are spilled to disk as with
+        low_memory. The peak is passed to the observer's memory_peak.
+
+        The observer's slide_added is called with the number of slides added
+        so far by this call. If cancel() is called, GenerationCancelled is
+        raised before the next slide, or once the images being prepared are
+        done; slides already added are kept.
+        """
+        self.add_slides(self.plan_slides(images))
+
+    def plan_slides(self, images: Iterable[Pathlike]) -> Iterator[PackedSlide]:
+        """Yield the images and boxes of each slide add_images would add.
+
+        Plans only hold paths and boxes, so another generator with the same
+        settings and slide size can build them, e.g. in another process.
+
+        With settings.bad_images == "skip", each image's header is read first
+        and unreadable or unsupported images are left out; they are listed in
+        skipped_images as (path, error) and passed to the observer. With
+        settings.skip_existing_images, files whose contents are already
+        embedded in the deck opened by create_presentation are left out and
+        listed in existing_images.
+        """
+        per_slide = self.settings.images_per_slide
+        if self.settings.packing not in PACKING_MODES:
+            raise ValueError(
+                f"Unknown packing '{self.settings.packing}', "
+                f"expected one of {list(PACKING_MODES)}"
+            )
+        if self.settings.bad_images not in BAD_IMAGE_POLICIES:
+            raise ValueError(
+                f"Unknown bad_images '{self.settings.bad_images}', "
+                f"expected one of {list(BAD_IMAGE_POLICIES)}"
+            )
+        self.skipped_images = []
+        self.existing_images = []
+        if self.settings.bad_images == "skip":
+            images = self._usable_images(images)
+        if self.settings.skip_existing_images and self._appending:
+            images = self._new_images(images)
+
+        if self.settings.packing == "aspect":
+            packer = ImagePacker(self.slide_size, self.settings)
+            for chunk in self._group_images(images, PACK_CHUNK_SLIDES * per_slide):
+                with stage(self.observer, "pack"):
+                    slides = packer.pack(chunk)
+                yield from slides
+        else:
+            layout_manager = ImageLayoutManager(self.slide_size, self.settings)
+            for group in self._group_images(images, per_slide):
+                yield PackedSlide(group, layout_manager.layout_boxes(len(group)))
+
+    def _usable_images(self, images: Iterable[Pathlike]) -> Iterator[Pathlike]:
+        for image in images:
+            problem = image_problem(image, self.settings.keep_originals)
+            if problem is None:
+                yield image
+                continue
+            self.skipped_images.append((str(image), problem))
+            if self.observer is not None:
+                self.observer.image_skipped(str(image), problem)
+
+    def _new_images(self, images: Iterable[Pathlike]) -> Iterator[Pathlike]:
+        for image in images:
+            path = Path(image)
+            nbytes = path.stat().st_size
+            # Images repeated in this run are only stored once anyway.
+            part = self.media_index.find(nbytes, lambda: self.file_hashes.sha1(path))
+            if part is not None and self.media_index.is_existing(part):
+                self.existing_images.append(str(image))
+                if self.observer is not None:
+                    self.observer.existing_image_skipped(str(image))
+            else:
+                yield image
+
+    def add_slides(self, slides: Iterable[PackedSlide]) -> None:
+        """Add a slide for each planned slide, as add_images does."""
+        slides_done = 0
+        layout_manager = self._layout_manager()
+        for batch in self._batches(slides):
+            if self._cancel_event.is_set():
+                raise GenerationCancelled()
+            if self._needs_preparation():
+                with stage(self.observer, "prepare"):
+                    batch = self._prepare_images(batch)
+
+            for group, boxes in batch:
+                if self._cancel_event.is_set():
+                    raise GenerationCancelled()
+                with stage(self.observer, "slide"):
+                    slide = self._create_empty_slide()
+                layout_manager.place_images(slide, group, boxes)
+                slides_done += 1
+                if self.observer is not None:
+                    self.observer.slide_added(slides_done)
+        if self.memory_budget is not None and self.observer is not None:
+            self.observer.memory_peak(self.memory_budget.peak)
+
+    def _batches(self, slides: Iterable[PackedSlide]) -> Iterator[List[PackedSlide]]:
+        """Group slides to prepare together, at most PREPARE_BATCH_SLIDES.
+
+        With a memory budget a batch also ends before the slide whose files
+        would not fit in what the budget has left next to one decoded image,
+        or before spilling starts, in what may still be held.
+        """
+        slides = iter(slides)
+        if self.memory_budget is None:
+            while batch := list(islice(slides, PREPARE_BATCH_SLIDES)):
+                yield batch
+            return
+
+        batch, nbytes, decoded = [], 0, 0
+        for slide in slides:
+            slide_bytes = sum(os.path.getsize(image) for image in slide.images)
+            slide_decoded = 0
+            if not self.settings.keep_originals:
+                slide_decoded = max(map(decoded_bytes, slide.images))
+            if batch and (
+                len(batch) == PREPARE_BATCH_SLIDES
+                or not self._fits(nbytes + slide_bytes, max(decoded, slide_decoded))
+            ):
+                yield self._start_batch(batch, nbytes, decoded)
+                batch, nbytes, decoded = [], 0, 0
+            batch.append(slide)
+            nbytes += slide_bytes
+            decoded = max(decoded, slide_decoded)
+        if batch:
+            yield self._start_batch(batch, nbytes, decoded)
+
+    def _fits(self, nbytes: int, decoded: int) -> bool:
+        """Whether nbytes of files and one decoded image fit in the budget."""
+        if nbytes + decoded > self.memory_budget.available:
+            return False
+        return self._spilling or self.memory_budget.can_hold(nbytes)
 
-        for group in images_grouped_by_four:
-            slide = self._create_empty_slide()
-            self._arrange_images(slide, group)
+    def _start_batch(
+        self, batch: List[PackedSlide], nbytes: int, decoded: int
+    ) -> List[PackedSlide]:
+        if not self.memory_budget.can_hold(nbytes):
+            self._spilling = True
+        self._batch_bytes = nbytes
+        self._batch_decoded = decoded
+        self.memory_budget.use(nbytes + decoded)
+        return batch
 
     def save_presentation(self, presentation_path: Pathlike) -> None:
-        self.presentation.save(str(presentation_path))
+        with stage(self.observer, "save"):
+            policy = CompressionPolicy.from_settings(self.settings)
+            if self._appendable is None:
+                save_presentation(self.presentation, presentation_path, policy)
+                return
+            self._appendable.append(self.presentation, presentation_path, policy)
+
+        # Slides now in the file must not be appended again by a later save;
+        # the package keeps its media index up to date.
+        self._new_appended_presentation()
+        self._media_index = None
+        self._spilling = self.settings.low_memory
+        if self.memory_budget is not None:
+            self.memory_budget.release()
+
+    def _open_appendable(self, presentation_path: Pathlike) -> None:
+        self._appendable = AppendablePackage(presentation_path)
+        self._new_appended_presentation()
+
+    def _new_appended_presentation(self) -> None:
+        self.presentation = Presentation()
+        if self._appendable.slide_size is not None:
+            (
+                self.presentation.slide_width,
+                self.presentation.slide_height,
+            ) = self._appendable.slide_size
 
     def _create_empty_slide(self) -> Slide:
         return self.presentation.slides.add_slide(
             self.presentation.slide_layouts[BLANK_SLIDE_LAYOUT]
         )
 
-    def _arrange_images(self, slide: Slide, images: List[Pathlike]) -> None:
+    @staticmethod
+    def _group_images(
+        images: Iterable[Pathlike], images_per_slide: int
+    ) -> Iterator[List[Pathlike]]:
+        iterator = iter(images)
+        while group := list(islice(iterator, images_per_slide)):
+            yield group
+
+    def _needs_preparation(self) -> bool:
+        return (
+            self.image_cache is not None
+            or not self.settings.keep_originals
+            or self.settings.low_memory
+            or self._appending
+            or self.memory_budget is not None
+        )
+
+    @property
+    def media_index(self) -> MediaIndex:
+        if self._media_index is None:
+            self._media_index = MediaIndex(
+                self.presentation,
+                None if self._appendable is None else self._appendable.media,
+            )
+        return self._media_index
+
+    def _prepare_images(self, slides: List[PackedSlide]) -> List[PackedSlide]:
+        preprocessor = ImagePreprocessor(self.settings)
+
+        images, target_sizes = [], []
+        for group, boxes in slides:
+            images.extend(group)
+            target_sizes.extend(preprocessor.target_size(*box[2:]) for box in boxes)
+
+        prepared = [None] * len(images)
+        keys = [None] * len(images)
+        entries = [None] * len(images)
+        if self.image_cache is not None:
+            for i, (image, target_size) in enumerate(zip(images, target_sizes)):
+                keys[i] = self.image_cache.make_key(image, self.settings, target_size)
+                entries[i] = self.image_cache.get(keys[i])
+        for i, (image, entry) in enumerate(zip(images, entries)):
+            if self._appending:
+                prepared[i] = self._image_in_deck(image, entry)
+            if prepared[i] is None and entry is not None:
+                prepared[i] = self._cached_image(image, entry)
+
+        misses = [i for i, image in enumerate(prepared) if image is None]
+        if self.settings.keep_originals:
+            results = [None] * len(misses)
+        else:
+            results = preprocessor.process(
+                [images[i] for i in misses],
+                [target_sizes[i] for i in misses],
+                self._preprocess_workers([images[i] for i in misses]),
+                self._cancel_event,
+            )
+            if self._cancel_event.is_set():
+                raise GenerationCancelled()
+
+        for i, result in zip(misses, results):
+            if result is None and self._spilling:
+                prepared[i] = FileImage(images[i])
+            elif result is None:
+                prepared[i] = load_image(images[i])
+            else:
+                data, ext = result
+                prepared[i] = self._processed_image(
+                    data, image_filename(images[i], ext)
+                )
+        if self.image_cache is not None:
+            self.image_cache.put_many(
+                (
+                    keys[i],
+                    prepared[i].ext,
+                    prepared[i].size,
+                    prepared[i].sha1,
+                    None if result is None else result[0],
+                )
+                for i, result in zip(misses, results)
+            )
+            self.image_cache.commit()
+
+        if self.memory_budget is not None:
+            self.memory_budget.hold(
+                sum(
+                    len(image.blob)
+                    for image in prepared
+                    if not isinstance(image, FileImage)
+                )
+            )
+        prepared = iter(prepared)
+        return [
+            PackedSlide([next(prepared) for _ in group], boxes)
+            for group, boxes in slides
+        ]
+
+    def _preprocess_workers(self, images: List[Pathlike]) -> Optional[int]:
+        """Workers that fit in the budget next to the batch, None without one.
+
+        Each worker holds one decoded image at a time; at least one worker
+        is used even if it does not fit.
+        """
+        if self.memory_budget is None or not images:
+            return None
+        workers = self.settings.preprocess_workers or os.cpu_count() or 1
+        room = self.memory_budget.available - self._batch_bytes
+        decoded = max(1, self._batch_decoded)
+        workers = max(1, min(workers, len(images), room // decoded))
+        self.memory_budget.use(self._batch_bytes + workers * self._batch_decoded)
+        return workers
+
+    def _image_in_deck(self, image_path: Pathlike, entry) -> Optional[FileImage]:
+        """image_path as a FileImage that is never read, if the deck holds it.
+
+        Without a cache entry, only images embedded unchanged can be matched
+        before they are processed.
+        """
+        if entry is not None and entry.has_data:
+            path = self.image_cache.data_path(entry)
+            filename = image_filename(image_path, entry.ext)
+            nbytes = entry.nbytes
+        elif entry is not None or self.settings.keep_originals:
+            path = Path(image_path)
+            filename = image_filename(image_path)
+            nbytes = path.stat().st_size
+        else:
+            return None
+
+        if entry is None:
+            part = self.media_index.find(
+                nbytes, lambda: self.file_hashes.sha1(path), filename
+            )
+            ext = size = None
+        else:
+            part = self.media_index.find(nbytes, lambda: entry.sha1, filename)
+            ext, size = entry.ext, (entry.width, entry.height)
+        if part is None:
+            return None
+        return FileImage(path, filename, part.sha1, ext, size)
+
+    def _cached_image(self, image_path: Pathlike, entry) -> ImageSource:
+        size = (entry.width, entry.height)
+        if not self._spilling:
+            if entry.has_data:
+                blob = self.image_cache.read(entry)
+                filename = image_filename(image_path, entry.ext)
+            else:
+                blob = Path(image_path).read_bytes()
+                filename = image_filename(image_path)
+            return prepared_image(blob, filename, entry.sha1, entry.ext, size)
+
+        if not entry.has_data:
+            return FileImage(image_path, None, entry.sha1, entry.ext, size)
+
+        # Link rather than reference the cache file, so eviction before the
+        # presentation is saved cannot remove it.
+        spill_path = self._spill_path(entry.sha1, entry.ext)
+        if not spill_path.exists():
+            try:
+                os.link(self.image_cache.data_path(entry), spill_path)
+            except OSError:
+                shutil.copyfile(self.image_cache.data_path(entry), spill_path)
+        filename = image_filename(image_path, entry.ext)
+        return FileImage(spill_path, filename, entry.sha1, entry.ext, size)
+
+    def _processed_image(self, data: bytes, filename: str) -> ImageSource:
+        image = prepared_image(data, filename)
+        if not self._spilling:
+            return image
+
+        spill_path = self._spill_path(image.sha1, image.ext)
+        if not spill_path.exists():
+            spill_path.write_bytes(data)
+        return FileImage(spill_path, filename, image.sha1, image.ext, image.size)
+
+    def _spill_path(self, sha1: str, ext: str) -> Path:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix="pptx-images-")
+        return Path(self._spill_dir.name) / f"{sha1}.{ext}"
+
+    def _layout_manager(self) -> ImageLayoutManager:
+        return ImageLayoutManager(
+            self.slide_size, self.settings, self.media_index, self.observer
+        )
+
+    def _arrange_images(
+        self,
+        slide: Slide,
+        images: List[ImageSource],
+        layout_manager: Optional[ImageLayoutManager] = None,
+    ) -> None:
         if not images:
             return
 
-        layout_manager = ImageLayoutManager(self.slide_size, self.settings)
-
-        match len(images):
-            case 1:
-                layout_manager.add_single_image(slide, images[0])
-            case 2:
-                layout_manager.add_two_images(slide, images)
-            case 3:
-                layout_manager.add_three_images(slide, images)
-            case 4:
-                layout_manager.add_four_images(slide, images)
-            case _:
-                raise ValueError("Only up to 4 images can be added to a slide")
+        layout_manager = layout_manager or self._layout_manager()
+        layout_manager.add_images(slide, images)
 
 
 if __name__ == "__main__":
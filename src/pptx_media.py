@@ -0,0 +1,349 @@
+import hashlib
+import os
+import zipfile
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from PIL import Image as PIL_Image
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.opc.spec import image_content_types
+from pptx.parts.image import Image, ImagePart
+from pptx.shapes.picture import Picture
+from pptx.slide import Slide
+from pptx.util import Length
+
+from pptx_settings import ImageSource, Pathlike
+
+MEDIA_PARTNAME_PREFIX = "/ppt/media/image"
+PIL_FORMAT_EXTS = {
+    "BMP": "bmp",
+    "GIF": "gif",
+    "JPEG": "jpg",
+    "PNG": "png",
+    "TIFF": "tiff",
+    "WMF": "wmf",
+}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha1(path: Pathlike) -> str:
+    """SHA-1 of a file's contents, read in chunks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileHashes:
+    """SHA-1s of files, reused while a file's size and mtime are unchanged.
+
+    entries maps a path to [size, mtime_ns, sha1] and is plain JSON data, so
+    callers can persist it between runs.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, List]] = None):
+        self.entries: Dict[str, List] = dict(entries or {})
+        self.hashed = 0
+
+    def sha1(self, path: Pathlike) -> str:
+        stat = os.stat(path)
+        identity = [stat.st_size, stat.st_mtime_ns]
+        entry = self.entries.get(str(path))
+        if entry is None or entry[:2] != identity:
+            entry = self.entries[str(path)] = identity + [file_sha1(path)]
+            self.hashed += 1
+        return entry[2]
+
+
+class FileImage:
+    """An image whose bytes stay on disk until the presentation is saved.
+
+    Offers the parts of the python-pptx Image interface MediaIndex relies on,
+    hashing and probing the file without holding it in memory.
+    """
+
+    def __init__(
+        self,
+        path: Pathlike,
+        filename: Optional[str] = None,
+        sha1: Optional[str] = None,
+        ext: Optional[str] = None,
+        size: Optional[Tuple[int, int]] = None,
+    ):
+        self.path = Path(path)
+        self.filename = filename or self.path.name
+        self._sha1 = sha1
+        self._ext = ext
+        self._size = size
+
+    @property
+    def blob(self) -> bytes:
+        return self.path.read_bytes()
+
+    @property
+    def sha1(self) -> str:
+        if self._sha1 is None:
+            self._sha1 = file_sha1(self.path)
+        return self._sha1
+
+    @property
+    def ext(self) -> str:
+        if self._ext is None:
+            self._probe()
+        return self._ext
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        if self._size is None:
+            self._probe()
+        return self._size
+
+    @property
+    def content_type(self) -> str:
+        return image_content_types[self.ext]
+
+    def _probe(self) -> None:
+        with PIL_Image.open(self.path) as image:
+            if image.format not in PIL_FORMAT_EXTS:
+                raise ValueError(
+                    f"unsupported image format, expected one of: "
+                    f"{list(PIL_FORMAT_EXTS)}, got '{image.format}'"
+                )
+            self._ext = PIL_FORMAT_EXTS[image.format]
+            self._size = image.size
+
+
+class FileImagePart(ImagePart):
+    """Image part that reads its blob from disk each time it is serialized."""
+
+    def __init__(self, partname: PackURI, package, image: FileImage):
+        super().__init__(partname, image.content_type, package, b"", image.filename)
+        self.path = image.path
+
+    @property
+    def blob(self) -> bytes:
+        return self.path.read_bytes()
+
+    @property
+    def image(self) -> Image:
+        return Image(self.blob, self.desc)
+
+
+def prepared_image(
+    blob: bytes,
+    filename: Optional[str],
+    sha1: Optional[str] = None,
+    ext: Optional[str] = None,
+    size: Optional[Tuple[int, int]] = None,
+) -> Image:
+    """Build an Image, seeding the values python-pptx would otherwise probe the blob for."""
+    image = Image.from_blob(blob, filename)
+    for name, value in (("sha1", sha1), ("ext", ext), ("size", size)):
+        if value is not None:
+            image.__dict__[name] = value
+    return image
+
+
+def load_image(image_source: ImageSource) -> Union[Image, FileImage]:
+    """Return image_source as an Image, reading it from disk if it is a path."""
+    if isinstance(image_source, (Image, FileImage)):
+        return image_source
+    if hasattr(image_source, "read"):
+        return Image.from_file(image_source)
+    return Image.from_file(os.fspath(image_source))
+
+
+class DeckImagePart(ImagePart):
+    """An image part already stored in the deck being appended to.
+
+    Slides relate to it like any other image part, but it is never written:
+    AppendablePackage points their relationships at the existing member.
+    """
+
+    def __init__(self, partname: PackURI, package, filename: Optional[str] = None):
+        super().__init__(
+            partname, image_content_types[partname.ext.lower()], package, b"", filename
+        )
+
+    @property
+    def blob(self) -> bytes:
+        raise ValueError(f"{self.partname} is only stored in the deck")
+
+
+class PackageMedia:
+    """The image members of a saved .pptx, found by content without loading them.
+
+    Only the ZIP directory is read up front, grouping members by their
+    uncompressed size. The members of a size are hashed, streamed from the
+    package and never decoded, the first time an image of that size is
+    looked up, so images with no same-sized member cost nothing.
+    """
+
+    def __init__(self, path: Pathlike):
+        self.path = Path(path)
+        self._unhashed: Dict[int, List[str]] = {}
+        self._partnames: Dict[str, str] = {}
+        self.sizes: Set[int] = set()
+        self.hashed = 0
+        with zipfile.ZipFile(self.path) as package:
+            for info in package.infolist():
+                partname = f"/{info.filename}"
+                ext = partname.rpartition(".")[2].lower()
+                if (
+                    partname.startswith(MEDIA_PARTNAME_PREFIX)
+                    and ext in image_content_types
+                ):
+                    self._unhashed.setdefault(info.file_size, []).append(partname)
+                    self.sizes.add(info.file_size)
+
+    def find(
+        self, nbytes: int, sha1: str, package: Optional[zipfile.ZipFile] = None
+    ) -> Optional[str]:
+        """Partname of a member holding nbytes bytes with this SHA-1, if any.
+
+        package is the deck opened already, e.g. while appending to it.
+        """
+        members = self._unhashed.pop(nbytes, None)
+        if members:
+            with ExitStack() as stack:
+                if package is None:
+                    package = stack.enter_context(zipfile.ZipFile(self.path))
+                for partname in members:
+                    digest = hashlib.sha1()
+                    with package.open(partname.lstrip("/")) as f:
+                        while chunk := f.read(HASH_CHUNK_SIZE):
+                            digest.update(chunk)
+                    self._partnames.setdefault(digest.hexdigest(), partname)
+                    self.hashed += 1
+        return self._partnames.get(sha1)
+
+    def add(self, partname: str, nbytes: int, sha1: str) -> None:
+        """Record a member written to the package since it was indexed."""
+        self._partnames.setdefault(sha1, partname)
+        self.sizes.add(nbytes)
+
+
+class MediaIndex:
+    """SHA1 lookup of the image parts in a presentation.
+
+    python-pptx walks every relationship in the package to find a duplicate image
+    and to pick the next media partname, so each picture added costs time linear in
+    the size of the deck. The index is built once and updated as parts are added.
+
+    With package_media, images already stored in the deck the presentation
+    will be appended to are found too, and reused as DeckImageParts.
+    """
+
+    def __init__(self, presentation, package_media: Optional[PackageMedia] = None):
+        self._package = presentation.part.package
+        self._package_media = package_media
+        self._parts: Dict[str, ImagePart] = {}
+        self._sizes: Set[int] = set()
+        self._next_idx = 1
+        for part in self._package.iter_parts():
+            if not part.partname.startswith(MEDIA_PARTNAME_PREFIX):
+                continue
+            if part.partname.idx is not None:
+                self._next_idx = max(self._next_idx, part.partname.idx + 1)
+            if isinstance(part, ImagePart):
+                self._parts.setdefault(part.sha1, part)
+                if isinstance(part, FileImagePart):
+                    self._sizes.add(part.path.stat().st_size)
+                else:
+                    self._sizes.add(len(part.blob))
+        self._existing = set(self._parts.values())
+        if package_media is not None:
+            self._sizes |= package_media.sizes
+
+    def __contains__(self, sha1: str) -> bool:
+        return sha1 in self._parts
+
+    def __len__(self) -> int:
+        return len(self._parts)
+
+    def is_existing(self, image_part: ImagePart) -> bool:
+        """Whether image_part was in the presentation or deck before any were added."""
+        return image_part in self._existing
+
+    def find(
+        self, nbytes: int, sha1: Callable[[], str], filename: Optional[str] = None
+    ) -> Optional[ImagePart]:
+        """The part already holding the contents of an image of nbytes bytes.
+
+        sha1 is only called when some part has the same size, so images that
+        cannot be duplicates are never read. A matching image stored in the
+        deck becomes a DeckImagePart described as filename.
+        """
+        if nbytes not in self._sizes:
+            return None
+        digest = sha1()
+        if digest in self._parts or self._package_media is None:
+            return self._parts.get(digest)
+        partname = self._package_media.find(nbytes, digest)
+        if partname is None:
+            return None
+        image_part = DeckImagePart(PackURI(partname), self._package, filename)
+        image_part.__dict__["sha1"] = digest
+        self._parts[digest] = image_part
+        self._existing.add(image_part)
+        return image_part
+
+    def get_or_add_image_part(self, image: Union[Image, FileImage]) -> ImagePart:
+        image_part = self._parts.get(image.sha1)
+        if image_part is None:
+            if isinstance(image, FileImage):
+                nbytes = image.path.stat().st_size
+            else:
+                nbytes = len(image.blob)
+            image_part = self.find(nbytes, lambda: image.sha1, image.filename)
+        if image_part is None:
+            partname = PackURI(f"{MEDIA_PARTNAME_PREFIX}{self._next_idx}.{image.ext}")
+            self._next_idx += 1
+            if isinstance(image, FileImage):
+                image_part = FileImagePart(partname, self._package, image)
+            else:
+                image_part = ImagePart(
+                    partname,
+                    image.content_type,
+                    self._package,
+                    image.blob,
+                    image.filename,
+                )
+            image_part.__dict__["sha1"] = image.sha1
+            self._parts[image.sha1] = image_part
+            self._sizes.add(nbytes)
+        return image_part
+
+
+def add_picture(
+    slide: Slide,
+    image_part: ImagePart,
+    left: Length,
+    top: Length,
+    width: Length,
+    height: Length,
+) -> Picture:
+    """Add a picture of an existing image part without re-reading the image."""
+    rId = slide.part.relate_to(image_part, RT.IMAGE)
+    shapes = slide.shapes
+    shape_id = shapes._next_shape_id
+    pic = shapes._spTree.add_pic(
+        shape_id,
+        f"Picture {shape_id - 1}",
+        image_part.desc,
+        rId,
+        left,
+        top,
+        width,
+        height,
+    )
+    return shapes._shape_factory(pic)
+
+
+def image_filename(image_path, ext: Optional[str] = None) -> str:
+    """Name recorded as a picture's description, with ext swapped in if given."""
+    path = Path(image_path)
+    return f"{path.stem}.{ext}" if ext else path.name
@@ -1,105 +1,193 @@
+import sys
 from pathlib import Path
-from typing import Union, Tuple
-from pptx.util import Inches, Pt
-from PIL import ImageColor
+from typing import IO, TYPE_CHECKING, Any, Dict, Union, Tuple
+
+# python-pptx and Pillow take most of the startup time of a headless run, so
+# settings are kept as plain EMU integers and only wrapped in pptx lengths on
+# access; the colour parser imports Pillow when a colour name is first set.
+if TYPE_CHECKING:
+    from pptx.parts.image import Image
+    from pptx.util import Inches, Length, Pt
 
 Pathlike = Union[str, Path]
+ImageSource = Union[Pathlike, IO[bytes], "Image"]
 BLANK_SLIDE_LAYOUT: int = 6
 RGBTriplet = Tuple[int, int, int]
 HexColorOrName = str
+EMU_PER_INCH = 914400
+EMU_PER_PT = 12700
+# Settings that change the slides a deck holds, for output_key(); how it is
+# built, stored or appended to, or which images reach it, does not count.
+OUTPUT_SETTINGS = (
+    "top_margin",
+    "left_margin",
+    "right_margin",
+    "bottom_margin",
+    "h_center_margin",
+    "v_center_margin",
+    "line_width",
+    "color",
+    "rounded",
+    "images_per_slide",
+    "keep_originals",
+    "target_dpi",
+    "jpeg_quality",
+    "packing",
+    "packing_window",
+)
+# Output settings that only apply when images are downsampled.
+PROCESSING_SETTINGS = ("target_dpi", "jpeg_quality")
+
+
+def _length(emu: int) -> "Length":
+    from pptx.util import Emu
+
+    return Emu(emu)
+
+
+def _is_length(value: Any) -> bool:
+    """Whether value is a pptx length; one can only exist once pptx.util is loaded."""
+    util = sys.modules.get("pptx.util")
+    return util is not None and isinstance(value, util.Length)
+
+
+def _canonical(value: Any) -> Any:
+    """value in one form per setting, e.g. a list colour as a tuple."""
+    if _is_length(value):
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(map(_canonical, value))
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
 
 
 class PPTXSettings:
     def __init__(self):
-        self._top_margin = Inches(1.35)
-        self._left_margin = Inches(0.53)
-        self._right_margin = Inches(0.53)
-        self._bottom_margin = Inches(0.66)
-        self._h_center_margin = Inches(0.5)
-        self._v_center_margin = Inches(0.5)
-        self._line_width = Pt(2.25)
+        self._top_margin = self._to_inches(1.35)
+        self._left_margin = self._to_inches(0.53)
+        self._right_margin = self._to_inches(0.53)
+        self._bottom_margin = self._to_inches(0.66)
+        self._h_center_margin = self._to_inches(0.5)
+        self._v_center_margin = self._to_inches(0.5)
+        self._line_width = self._to_pt(2.25)
         self._color = (0, 102, 204)
         self.rounded = False
+        self._images_per_slide = 4
+        self.keep_originals = True
+        self.target_dpi = 150
+        self.jpeg_quality = 85
+        self.preprocess_workers = None
+        self.low_memory = False
+        self.packing = "grid"
+        self.packing_window = 1
+        self.append_in_place = True
+        self.shape_backend = "pptx"
+        self.store_media = False
+        self.compress_level = None
+        self.shard_slides = None
+        self.max_deck_bytes = None
+        self.bad_images = "fail"
+        self.checkpoint_slides = None
+        self.skip_existing_images = False
+        self.max_memory = None
 
     @staticmethod
-    def _inches_to_float(value: Inches) -> float:
+    def _inches_to_float(value: "Length") -> float:
         """Convert Inches to float value in inches."""
         return float(value.inches)
 
     @staticmethod
-    def _pt_to_float(value: Pt) -> float:
+    def _pt_to_float(value: "Length") -> float:
         """Convert Pt to float value in points."""
         return float(value.pt)
 
     @staticmethod
-    def _to_inches(value: Union[float, Inches]) -> Inches:
-        """Convert a float to Inches if it's not already an Inches object."""
-        return Inches(value) if isinstance(value, (int, float)) else value
+    def _to_inches(value: Union[float, "Inches"]) -> int:
+        """Convert a float in inches, or a pptx length, to EMU."""
+        # Lengths are ints in EMU, so they must not be scaled again.
+        if _is_length(value):
+            return int(value)
+        return int(value * EMU_PER_INCH) if isinstance(value, (int, float)) else value
 
     @staticmethod
-    def _to_pt(value: Union[float, Pt]) -> Pt:
-        """Convert a float to Pt if it's not already a Pt object."""
-        return Pt(value) if isinstance(value, (int, float)) else value
+    def _to_pt(value: Union[float, "Pt"]) -> int:
+        """Convert a float in points, or a pptx length, to EMU."""
+        if _is_length(value):
+            return int(value)
+        return int(value * EMU_PER_PT) if isinstance(value, (int, float)) else value
 
     @property
-    def top_margin(self) -> Inches:
-        return self._top_margin
+    def top_margin(self) -> "Length":
+        return _length(self._top_margin)
 
     @top_margin.setter
-    def top_margin(self, value: Union[float, Inches]) -> None:
+    def top_margin(self, value: Union[float, "Inches"]) -> None:
         self._top_margin = self._to_inches(value)
 
     @property
-    def left_margin(self) -> Inches:
-        return self._left_margin
+    def left_margin(self) -> "Length":
+        return _length(self._left_margin)
 
     @left_margin.setter
-    def left_margin(self, value: Union[float, Inches]) -> None:
+    def left_margin(self, value: Union[float, "Inches"]) -> None:
         self._left_margin = self._to_inches(value)
 
     @property
-    def right_margin(self) -> Inches:
-        return self._right_margin
+    def right_margin(self) -> "Length":
+        return _length(self._right_margin)
 
     @right_margin.setter
-    def right_margin(self, value: Union[float, Inches]) -> None:
+    def right_margin(self, value: Union[float, "Inches"]) -> None:
         self._right_margin = self._to_inches(value)
 
     @property
-    def bottom_margin(self) -> Inches:
-        return self._bottom_margin
+    def bottom_margin(self) -> "Length":
+        return _length(self._bottom_margin)
 
     @bottom_margin.setter
-    def bottom_margin(self, value: Union[float, Inches]) -> None:
+    def bottom_margin(self, value: Union[float, "Inches"]) -> None:
         self._bottom_margin = self._to_inches(value)
 
     @property
-    def h_center_margin(self) -> Inches:
-        return self._h_center_margin
+    def h_center_margin(self) -> "Length":
+        return _length(self._h_center_margin)
 
     @h_center_margin.setter
-    def h_center_margin(self, value: Union[float, Inches]) -> None:
+    def h_center_margin(self, value: Union[float, "Inches"]) -> None:
         self._h_center_margin = self._to_inches(value)
 
     @property
-    def v_center_margin(self) -> Inches:
-        return self._v_center_margin
+    def v_center_margin(self) -> "Length":
+        return _length(self._v_center_margin)
 
     @v_center_margin.setter
-    def v_center_margin(self, value: Union[float, Inches]) -> None:
+    def v_center_margin(self, value: Union[float, "Inches"]) -> None:
         self._v_center_margin = self._to_inches(value)
 
     @property
-    def line_width(self) -> Pt:
-        return self._line_width
+    def line_width(self) -> "Length":
+        return _length(self._line_width)
 
     @line_width.setter
-    def line_width(self, value: Union[float, Pt]) -> None:
+    def line_width(self, value: Union[float, "Pt"]) -> None:
         self._line_width = self._to_pt(value)
 
+    @property
+    def images_per_slide(self) -> int:
+        return self._images_per_slide
+
+    @images_per_slide.setter
+    def images_per_slide(self, value: int) -> None:
+        if not isinstance(value, int) or value < 1:
+            raise ValueError(f"images_per_slide must be at least 1, got {value!r}")
+        self._images_per_slide = value
+
     @staticmethod
     def color_to_rgb(color_value: HexColorOrName) -> RGBTriplet:
         """Convert a hex color string or a named color to an RGB triplet, ensuring no alpha channel."""
+        from PIL import ImageColor
+
         rgb = ImageColor.getrgb(color_value)
         return rgb[:3]
 
@@ -125,6 +213,35 @@ class PPTXSettings:
         self.validate_rgb(value)
         self._color = value
 
+    def layout_key(self) -> Tuple[int, ...]:
+        """The margins that determine image placement, as a hashable key."""
+        return (
+            int(self._top_margin),
+            int(self._left_margin),
+            int(self._right_margin),
+            int(self._bottom_margin),
+            int(self._h_center_margin),
+            int(self._v_center_margin),
+        )
+
+    def output_key(self) -> str:
+        """The settings that shape the written slides, as a stable string."""
+        return repr(
+            [
+                (name, _canonical(getattr(self, name)))
+                for name in OUTPUT_SETTINGS
+                if not (self.keep_originals and name in PROCESSING_SETTINGS)
+            ]
+        )
+
+    def update(self, values: Dict[str, Any]) -> None:
+        """Set settings from a mapping of attribute names, e.g. a parsed manifest."""
+        for name, value in values.items():
+            is_property = isinstance(getattr(type(self), name, None), property)
+            if name.startswith("_") or not (is_property or name in vars(self)):
+                raise ValueError(f"Unknown setting: {name}")
+            setattr(self, name, value)
+
     def __repr__(self) -> str:
         return (
             f"PPTXSettings("
@@ -136,5 +253,19 @@ class PPTXSettings:
             f"v_center_margin={self._inches_to_float(self.v_center_margin):.2f} in, "
             f"line_width={self._pt_to_float(self.line_width):.2f} pt, "
             f"color={self.color}, "
-            f"rounded={self.rounded})"
+            f"rounded={self.rounded}, "
+            f"images_per_slide={self.images_per_slide}, "
+            f"keep_originals={self.keep_originals}, "
+            f"target_dpi={self.target_dpi}, "
+            f"packing={self.packing}, "
+            f"append_in_place={self.append_in_place}, "
+            f"shape_backend={self.shape_backend}, "
+            f"store_media={self.store_media}, "
+            f"compress_level={self.compress_level}, "
+            f"shard_slides={self.shard_slides}, "
+            f"max_deck_bytes={self.max_deck_bytes}, "
+            f"bad_images={self.bad_images}, "
+            f"checkpoint_slides={self.checkpoint_slides}, "
+            f"skip_existing_images={self.skip_existing_images}, "
+            f"max_memory={self.max_memory})"
         )
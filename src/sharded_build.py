@@ -0,0 +1,317 @@
+import copy
+import os
+import tempfile
+import threading
+import zipfile
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from generation_stats import GenerationObserver, stage
+from image_cache import ImageCache
+from image_layout_manager import SlideSize
+from image_packer import PackedSlide
+from memory_budget import parse_bytes
+from package_writer import CompressionPolicy
+from pptx_append import AppendablePackage
+from pptx_generator import GenerationCancelled, PPTXGenerator
+from pptx_settings import PPTXSettings, Pathlike
+
+DEFAULT_SHARD_SLIDES = 250
+# Size estimates for max_deck_bytes: ZIP local and central headers per member
+# besides the name, and an upper bound on the index parts' growth per slide.
+ZIP_HEADER_BYTES = 100
+INDEX_BYTES_PER_SLIDE = 300
+SLIDE_PREFIX = "ppt/slides/slide"
+APPENDED_PREFIXES = ("ppt/slides/", "ppt/media/")
+INDEX_MEMBERS = (
+    "[Content_Types].xml",
+    "ppt/presentation.xml",
+    "ppt/_rels/presentation.xml.rels",
+)
+
+
+def _member_bytes(info: zipfile.ZipInfo) -> int:
+    return info.compress_size + 2 * len(info.filename) + ZIP_HEADER_BYTES
+
+
+def _slide_bytes(images: Iterable[str]) -> int:
+    """Estimated bytes a slide adds to a deck that stores images' files as is."""
+    return INDEX_BYTES_PER_SLIDE + sum(
+        os.path.getsize(image) + ZIP_HEADER_BYTES for image in images
+    )
+
+
+def build_shard(
+    settings: PPTXSettings,
+    slides: List[PackedSlide],
+    path: Pathlike,
+    slide_size: SlideSize,
+    cache_dir: Optional[Pathlike] = None,
+) -> int:
+    """Build planned slides into a new deck at path; returns the slide count."""
+    image_cache = ImageCache(cache_dir) if cache_dir else None
+    try:
+        generator = PPTXGenerator(settings, image_cache)
+        generator.create_presentation(path, override=True)
+        presentation = generator.presentation
+        presentation.slide_width, presentation.slide_height = slide_size
+        generator.slide_size = slide_size
+        generator.add_slides(slides)
+        generator.save_presentation(path)
+    finally:
+        if image_cache is not None:
+            image_cache.close()
+    return len(slides)
+
+
+def merge_decks(
+    shards: List[Pathlike], output_path: Pathlike, policy: CompressionPolicy
+) -> None:
+    """Move the first shard to output_path and append the others' slides to it."""
+    os.replace(shards[0], output_path)
+    if len(shards) > 1:
+        AppendablePackage(output_path).append_packages(shards[1:], policy=policy)
+
+
+class ShardedGenerator:
+    """Builds one large deck on several processes.
+
+    Slides are planned in this process exactly as PPTXGenerator.add_images
+    would plan them, then split into shards of settings.shard_slides
+    consecutive slides. Each shard is built as its own deck by a worker
+    process (settings.preprocess_workers of them) and the shards are merged
+    at the ZIP level, so slide order matches a serial build.
+
+    Without override an existing deck is kept and the shards are appended
+    to it. With settings.max_deck_bytes, consecutive shards are instead
+    merged into new numbered decks of at most that size: shards are cut
+    where their image files would fill the cap, a shard that still comes
+    out larger is rebuilt as two halves, and only a slide larger than the
+    cap on its own gets a deck over it.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[PPTXSettings] = None,
+        cache_dir: Optional[Pathlike] = None,
+        observer: Optional[GenerationObserver] = None,
+    ):
+        self.settings = settings or PPTXSettings()
+        self.cache_dir = cache_dir
+        self.observer = observer
+        self.slide_count = 0
+        self.skipped_images = []
+        self._cancel_event = threading.Event()
+
+    def cancel(self) -> None:
+        """Stop starting new shards; build raises GenerationCancelled."""
+        self._cancel_event.set()
+
+    def reset_cancel(self) -> None:
+        """Forget an earlier cancel(); call it before starting a new build."""
+        self._cancel_event.clear()
+
+    def build(
+        self,
+        images: Iterable[Pathlike],
+        output_path: Pathlike,
+        override: bool = True,
+    ) -> List[Path]:
+        """Build a deck of images at output_path; returns the files written.
+
+        That is [output_path], or with settings.max_deck_bytes the numbered
+        decks <stem>-1<suffix>, <stem>-2<suffix>, ...
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        split = bool(self.settings.max_deck_bytes)
+        append = not (override or split) and output_path.exists()
+        planner = PPTXGenerator(self.settings, observer=self.observer)
+        planner.create_presentation(output_path, override=not append)
+        shard_slides = self.settings.shard_slides or DEFAULT_SHARD_SLIDES
+
+        with tempfile.TemporaryDirectory(
+            prefix=".shards-", dir=output_path.parent
+        ) as shard_dir:
+            planned = planner.plan_slides(images)
+            if split:
+                shards = self._sized_shards(planned, shard_slides)
+            else:
+                shards = []
+                while batch := list(islice(planned, shard_slides)):
+                    shards.append(batch)
+            self.slide_count = sum(len(shard) for shard in shards)
+            self.skipped_images = planner.skipped_images
+            if not shards:
+                planner.save_presentation(output_path)
+                return [output_path]
+            paths = [
+                Path(shard_dir) / f"shard-{i:05d}.pptx" for i in range(len(shards))
+            ]
+            with stage(self.observer, "shards"):
+                self._build_shards(shards, paths, planner.slide_size)
+                if split:
+                    self._split_oversized(shards, paths, planner.slide_size)
+
+            policy = CompressionPolicy.from_settings(self.settings)
+            with stage(self.observer, "merge"):
+                if append:
+                    package = AppendablePackage(output_path)
+                    package.append_packages(paths, policy=policy)
+                    return [output_path]
+                if not split:
+                    merge_decks(paths, output_path, policy)
+                    return [output_path]
+
+                outputs = []
+                for i, group in enumerate(self._size_groups(paths), 1):
+                    outputs.append(
+                        output_path.with_name(
+                            f"{output_path.stem}-{i}{output_path.suffix}"
+                        )
+                    )
+                    merge_decks(group, outputs[-1], policy)
+                return outputs
+
+    def _build_shards(
+        self,
+        shards: List[List[PackedSlide]],
+        paths: List[Path],
+        slide_size: SlideSize,
+        report: bool = True,
+    ) -> None:
+        workers = self.settings.preprocess_workers or os.cpu_count() or 1
+        slides_done = 0
+        if workers == 1 or len(shards) == 1:
+            for slides, path in zip(shards, paths):
+                if self._cancel_event.is_set():
+                    raise GenerationCancelled()
+                count = build_shard(
+                    self.settings, slides, path, slide_size, self.cache_dir
+                )
+                if report:
+                    slides_done = self._report_slides(slides_done, count)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        # Shards already run in parallel, so each preprocesses in-process,
+        # and shares the memory budget with the others.
+        processes = min(workers, len(shards))
+        settings = copy.copy(self.settings)
+        settings.preprocess_workers = 1
+        if settings.max_memory:
+            settings.max_memory = parse_bytes(settings.max_memory) // processes
+        with ProcessPoolExecutor(processes) as executor:
+            futures = [
+                executor.submit(
+                    build_shard, settings, slides, path, slide_size, self.cache_dir
+                )
+                for slides, path in zip(shards, paths)
+            ]
+            for future in as_completed(futures):
+                if self._cancel_event.is_set():
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise GenerationCancelled()
+                count = future.result()
+                if report:
+                    slides_done = self._report_slides(slides_done, count)
+
+    def _sized_shards(
+        self, slides: Iterable[PackedSlide], shard_slides: int
+    ) -> List[List[PackedSlide]]:
+        """Split slides into shards whose image files fit in max_deck_bytes.
+
+        Each shard holds at most shard_slides slides and counts an image
+        used on several of its slides once. Images are usually stored
+        smaller than their files, so shards mostly fit; _split_oversized
+        handles those that do not.
+        """
+        max_bytes = parse_bytes(self.settings.max_deck_bytes)
+        shards, images, total = [], set(), 0
+        for slide in slides:
+            slide_images = set(map(str, slide.images))
+            if shards and len(shards[-1]) < shard_slides:
+                added = _slide_bytes(slide_images - images)
+                if total + added <= max_bytes:
+                    shards[-1].append(slide)
+                    images |= slide_images
+                    total += added
+                    continue
+            shards.append([slide])
+            images = slide_images
+            total = _slide_bytes(images)
+        return shards
+
+    def _split_oversized(
+        self,
+        shards: List[List[PackedSlide]],
+        paths: List[Path],
+        slide_size: SlideSize,
+    ) -> None:
+        """Rebuild each shard larger than max_deck_bytes as two halves, in place.
+
+        Halves are split again until they fit or hold a single slide.
+        """
+        max_bytes = parse_bytes(self.settings.max_deck_bytes)
+        while True:
+            oversized = [
+                i
+                for i, (slides, path) in enumerate(zip(shards, paths))
+                if len(slides) > 1 and path.stat().st_size > max_bytes
+            ]
+            if not oversized:
+                return
+            halves, half_paths = [], []
+            for i in reversed(oversized):
+                slides, path = shards[i], paths[i]
+                middle = len(slides) // 2
+                shards[i : i + 1] = [slides[:middle], slides[middle:]]
+                paths[i : i + 1] = [
+                    path.with_name(f"{path.stem}-{half}{path.suffix}")
+                    for half in (0, 1)
+                ]
+                path.unlink()
+                halves += shards[i : i + 2]
+                half_paths += paths[i : i + 2]
+            # Their slides were reported when the whole shards were built.
+            self._build_shards(halves, half_paths, slide_size, report=False)
+
+    def _report_slides(self, slides_done: int, count: int) -> int:
+        if self.observer is not None:
+            for done in range(slides_done + 1, slides_done + count + 1):
+                self.observer.slide_added(done)
+        return slides_done + count
+
+    def _size_groups(self, paths: List[Path]) -> List[List[Path]]:
+        """Split shards into runs whose merged decks fit in max_deck_bytes.
+
+        A merged deck holds its first shard's file, the superseded copies of
+        its index parts, and the slide and media members of the shards
+        appended to it, plus a bounded amount of index growth per slide.
+        """
+        max_bytes = parse_bytes(self.settings.max_deck_bytes)
+        groups, total = [], 0
+        for path in paths:
+            with zipfile.ZipFile(path) as package:
+                infos = package.infolist()
+            added = sum(
+                _member_bytes(info)
+                for info in infos
+                if info.filename.startswith(APPENDED_PREFIXES)
+            )
+            added += INDEX_BYTES_PER_SLIDE * sum(
+                info.filename.startswith(SLIDE_PREFIX)
+                and info.filename.endswith(".xml")
+                for info in infos
+            )
+            if groups and total + added <= max_bytes:
+                groups[-1].append(path)
+                total += added
+                continue
+            groups.append([path])
+            total = path.stat().st_size + sum(
+                _member_bytes(info) for info in infos if info.filename in INDEX_MEMBERS
+            )
+        return groups
@@ -0,0 +1,209 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+from image_layout_manager import SlideSize, fit_box, grid_layout
+from image_packer import ImagePacker, PackedSlide, image_aspect
+from pptx_generator import PACK_CHUNK_SLIDES
+from pptx_settings import PPTXSettings
+from thumbnail_cache import ThumbnailCache
+
+# python-pptx's default template, 10 x 7.5 inches.
+DEFAULT_SLIDE_SIZE = (9144000, 6858000)
+PREVIEW_WIDTH = 400
+# Default adjustment of a rounded rectangle: corner radius / shorter side.
+ROUNDED_CORNER_RATIO = 0.16667
+BACKGROUND_COLOR = (255, 255, 255)
+MARGIN_GUIDE_COLOR = (215, 215, 215)
+# Drawn in place of pictures whose thumbnails are still being decoded.
+PLACEHOLDER_COLOR = (235, 235, 235)
+
+
+class SlidePreview:
+    """Draws slides as they will be generated, with Pillow and thumbnails.
+
+    Slides are planned with the generator's geometry: grid_layout boxes, or
+    ImagePacker rows for aspect packing. Pictures are drawn from cached
+    thumbnails, stretched to their box, and outlined and rounded like the
+    generated pictures. Plans and probed aspect ratios are cached, so
+    re-rendering after a settings change only redraws one slide. Callers
+    that probed the images already pass their aspect ratios, so aspect
+    packing reads no headers.
+
+    render(wait=False) does not decode thumbnails: pictures not yet in the
+    thumbnail cache are drawn as placeholders and listed in missing, to be
+    decoded elsewhere before rendering again.
+    """
+
+    def __init__(
+        self,
+        thumbnails: ThumbnailCache,
+        slide_size: SlideSize = DEFAULT_SLIDE_SIZE,
+    ):
+        self.thumbnails = thumbnails
+        self.slide_size = slide_size
+        self._aspects: Dict[Path, float] = {}
+        self._plan_key = None
+        self._plan: List[PackedSlide] = []
+        self.missing: List[Path] = []
+
+    def plan(
+        self,
+        images: Sequence[Path],
+        settings: PPTXSettings,
+        aspects: Optional[Sequence[float]] = None,
+    ) -> List[PackedSlide]:
+        """The slides PPTXGenerator.add_images would build from images.
+
+        aspects holds each image's width / height; without it aspect packing
+        reads them from the images' headers.
+        """
+        per_slide = settings.images_per_slide
+        if aspects is not None:
+            self._aspects.update(zip(images, aspects))
+        key = (
+            tuple(images),
+            None if aspects is None else tuple(aspects),
+            self.slide_size,
+            per_slide,
+            settings.layout_key(),
+            settings.packing,
+            settings.packing_window,
+        )
+        if key == self._plan_key:
+            return self._plan
+
+        if settings.packing == "aspect":
+            aspects = [self._aspect(image) for image in images]
+            packer = ImagePacker(self.slide_size, settings)
+            chunk = PACK_CHUNK_SLIDES * per_slide
+            plan = []
+            for start in range(0, len(images), chunk):
+                plan.extend(
+                    packer.pack(
+                        images[start : start + chunk], aspects[start : start + chunk]
+                    )
+                )
+        else:
+            plan = [
+                PackedSlide(
+                    list(images[start : start + per_slide]),
+                    grid_layout(
+                        self.slide_size,
+                        len(images[start : start + per_slide]),
+                        settings.layout_key(),
+                    ),
+                )
+                for start in range(0, len(images), per_slide)
+            ]
+        self._plan_key, self._plan = key, plan
+        return plan
+
+    def slide_of(
+        self,
+        images: Sequence[Path],
+        settings: PPTXSettings,
+        index: int,
+        aspects: Optional[Sequence[float]] = None,
+    ) -> int:
+        """Index of the slide that shows images[index]."""
+        shown = 0
+        for slide_index, slide in enumerate(self.plan(images, settings, aspects)):
+            shown += len(slide.images)
+            if index < shown:
+                return slide_index
+        return 0
+
+    def render(
+        self,
+        images: Sequence[Path],
+        settings: PPTXSettings,
+        slide_index: int = 0,
+        width: int = PREVIEW_WIDTH,
+        wait: bool = True,
+        aspects: Optional[Sequence[float]] = None,
+    ) -> Optional[Image.Image]:
+        """Draw slide slide_index, width pixels wide; None if there is no such slide."""
+        plan = self.plan(images, settings, aspects)
+        self.missing = []
+        if not 0 <= slide_index < len(plan):
+            return None
+        scale = width / self.slide_size[0]
+        canvas = Image.new(
+            "RGB", (width, round(self.slide_size[1] * scale)), BACKGROUND_COLOR
+        )
+        draw = ImageDraw.Draw(canvas)
+
+        top, left, right, bottom = settings.layout_key()[:4]
+        draw.rectangle(
+            (
+                left * scale,
+                top * scale,
+                (self.slide_size[0] - right) * scale,
+                (self.slide_size[1] - bottom) * scale,
+            ),
+            outline=MARGIN_GUIDE_COLOR,
+        )
+
+        line_width = int(settings.line_width) * scale
+        for image_path, box in zip(*plan[slide_index]):
+            if wait:
+                thumbnail = self.thumbnails.get(image_path)
+            else:
+                thumbnail = self.thumbnails.cached(image_path)
+            if thumbnail is None:
+                self.missing.append(image_path)
+            if settings.packing == "aspect":
+                if thumbnail is None:
+                    box = fit_box(box, (self._aspect(image_path), 1))
+                else:
+                    box = fit_box(box, thumbnail.size)
+            self._draw_picture(
+                canvas, draw, thumbnail, box, scale, line_width, settings
+            )
+        return canvas
+
+    @staticmethod
+    def _draw_picture(
+        canvas: Image.Image,
+        draw: ImageDraw.ImageDraw,
+        thumbnail: Optional[Image.Image],
+        box: Tuple[int, int, int, int],
+        scale: float,
+        line_width: float,
+        settings: PPTXSettings,
+    ) -> None:
+        x, y = round(box[0] * scale), round(box[1] * scale)
+        w, h = max(1, round(box[2] * scale)), max(1, round(box[3] * scale))
+        if thumbnail is None:
+            picture = Image.new("RGB", (w, h), PLACEHOLDER_COLOR)
+        else:
+            picture = thumbnail.convert("RGB").resize((w, h), Image.Resampling.BILINEAR)
+        radius = ROUNDED_CORNER_RATIO * min(w, h) if settings.rounded else 0
+
+        if radius:
+            mask = Image.new("L", (w, h), 0)
+            ImageDraw.Draw(mask).rounded_rectangle(
+                (0, 0, w - 1, h - 1), radius, fill=255
+            )
+            canvas.paste(picture, (x, y), mask)
+        else:
+            canvas.paste(picture, (x, y))
+
+        if line_width > 0:
+            # Outlines are centred on the shape's edge, as PowerPoint draws them.
+            stroke = max(1, round(line_width))
+            half = stroke / 2
+            outline = (x - half, y - half, x + w - 1 + half, y + h - 1 + half)
+            if radius:
+                draw.rounded_rectangle(
+                    outline, radius + half, outline=settings.color, width=stroke
+                )
+            else:
+                draw.rectangle(outline, outline=settings.color, width=stroke)
+
+    def _aspect(self, image: Path) -> float:
+        if image not in self._aspects:
+            self._aspects[image] = image_aspect(image)
+        return self._aspects[image]
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from pptx_settings import Pathlike
+
+DEFAULT_THUMBNAIL_SIZE = (200, 200)
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 128 * 1024**2
+# Pruning frees down to this share of max_disk_bytes, so it does not run on
+# every new thumbnail once the store is full.
+DISK_PRUNE_TARGET = 0.8
+
+ThumbnailKey = Tuple[str, int, int]
+
+
+class ThumbnailCache:
+    """Bounded LRU cache of preview thumbnails.
+
+    JPEGs are decoded at reduced scale with Pillow's draft mode. Entries are
+    keyed by path, size and mtime, so a file that changes on disk is decoded
+    again. With disk_dir set, thumbnails are also stored there as PNGs and
+    survive restarts; once they take more than max_disk_bytes, the least
+    recently used PNGs are deleted. prefetch() decodes paths on a background
+    thread.
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = DEFAULT_THUMBNAIL_SIZE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        disk_dir: Optional[Pathlike] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ):
+        self.size = size
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, Tuple[ThumbnailKey, Image.Image]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # Bytes of PNGs in disk_dir, counted on the first write.
+        self._disk_bytes = None
+        self._prefetch_queue = queue.Queue()
+        self._prefetch_thread = None
+
+    def get(self, image_path: Pathlike) -> Image.Image:
+        """Return the thumbnail for image_path, decoding it if needed."""
+        key = self._key(image_path)
+        thumbnail = self._cached(key)
+        if thumbnail is not None:
+            return thumbnail
+
+        thumbnail = self._load_from_disk(key) or self._decode(image_path, key)
+        with self._lock:
+            self._entries[key[0]] = (key, thumbnail)
+            self._entries.move_to_end(key[0])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return thumbnail
+
+    def cached(self, image_path: Pathlike) -> Optional[Image.Image]:
+        """Return the thumbnail for image_path if it is in memory, else None."""
+        return self._cached(self._key(image_path))
+
+    def prefetch(self, image_paths: Iterable[Pathlike]) -> None:
+        """Decode image_paths in the background, replacing older requests."""
+        while True:
+            try:
+                self._prefetch_queue.get_nowait()
+            except queue.Empty:
+                break
+        for image_path in image_paths:
+            self._prefetch_queue.put(image_path)
+
+        if self._prefetch_thread is None:
+            self._prefetch_thread = threading.Thread(
+                target=self._prefetch_worker, daemon=True
+            )
+            self._prefetch_thread.start()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _prefetch_worker(self) -> None:
+        while True:
+            image_path = self._prefetch_queue.get()
+            try:
+                self.get(image_path)
+            except Exception:
+                # Unreadable files surface when they are actually previewed.
+                pass
+
+    def _cached(self, key: ThumbnailKey) -> Optional[Image.Image]:
+        with self._lock:
+            entry = self._entries.get(key[0])
+            if entry is None or entry[0] != key:
+                return None
+            self._entries.move_to_end(key[0])
+            return entry[1]
+
+    def _key(self, image_path: Pathlike) -> ThumbnailKey:
+        path = Path(image_path).resolve()
+        stat = path.stat()
+        return str(path), stat.st_size, stat.st_mtime_ns
+
+    def _decode(self, image_path: Pathlike, key: ThumbnailKey) -> Image.Image:
+        with Image.open(image_path) as image:
+            if image.format == "JPEG":
+                image.draft("RGB", self.size)
+            thumbnail = image.copy()
+        thumbnail.thumbnail(self.size)
+
+        if self.disk_dir is not None:
+            disk_path = self._disk_path(key)
+            temp_path = disk_path.with_suffix(f".{threading.get_ident()}.tmp")
+            thumbnail.save(temp_path, "PNG")
+            temp_path.replace(disk_path)
+            self._stored_on_disk(disk_path.stat().st_size)
+        return thumbnail
+
+    def _stored_on_disk(self, nbytes: int) -> None:
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += nbytes
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete the least recently used PNGs, oldest first."""
+        files = sorted(self._disk_files())
+        self._disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self._disk_bytes <= self.max_disk_bytes * DISK_PRUNE_TARGET:
+                break
+            path.unlink(missing_ok=True)
+            self._disk_bytes -= size
+
+    def _disk_files(self) -> List[Tuple[int, int, Path]]:
+        """(mtime, size, path) of each PNG in disk_dir."""
+        files = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".png"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, Path(entry.path)))
+        return files
+
+    def _load_from_disk(self, key: ThumbnailKey) -> Optional[Image.Image]:
+        if self.disk_dir is None:
+            return None
+        disk_path = self._disk_path(key)
+        try:
+            # The modification time records use, for pruning.
+            os.utime(disk_path)
+            with Image.open(disk_path) as image:
+                image.load()
+                return image
+        except FileNotFoundError:
+            return None
+
+    def _disk_path(self, key: ThumbnailKey) -> Path:
+        name = hashlib.sha1(repr((key, self.size)).encode()).hexdigest()
+        return self.disk_dir / f"{name}.png"
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from bench_generation import synthetic_image  # noqa: E402
+
+
+@pytest.fixture
+def make_images(tmp_path):
+    """Write count small synthetic images and return their paths."""
+
+    def make(count, size=(64, 48), image_format="JPEG"):
+        ext = "jpg" if image_format == "JPEG" else image_format.lower()
+        image_dir = tmp_path / "images"
+        image_dir.mkdir(exist_ok=True)
+        start = len(list(image_dir.iterdir()))
+        images = []
+        for i in range(start, start + count):
+            path = image_dir / f"{i:05d}.{ext}"
+            synthetic_image(size, i).save(path, image_format)
+            images.append(path)
+        return images
+
+    return make
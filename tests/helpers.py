@@ -0,0 +1,23 @@
+import zipfile
+
+from pptx_generator import PPTXGenerator
+
+
+def deck_parts(path):
+    """The slide and media members of the deck at path, by name."""
+    with zipfile.ZipFile(path) as package:
+        return {
+            name: package.read(name)
+            for name in package.namelist()
+            if name.startswith(("ppt/slides/", "ppt/media/"))
+        }
+
+
+def serial_build(images, path, options=None):
+    """Build images into a new deck at path with a plain PPTXGenerator."""
+    generator = PPTXGenerator()
+    generator.settings.update(options or {})
+    generator.create_presentation(path, override=True)
+    generator.add_images(images)
+    generator.save_presentation(path)
+    return generator
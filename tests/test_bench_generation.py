@@ -0,0 +1,14 @@
+import pytest
+
+from bench_generation import run_isolated
+
+
+def test_run_isolated_returns_the_child_result(tmp_path, make_images):
+    result = run_isolated("add_images", make_images(2), tmp_path / "deck.pptx", {})
+    assert result["wall_seconds"] > 0
+    assert (tmp_path / "deck.pptx").exists()
+
+
+def test_run_isolated_fails_when_the_child_does(tmp_path, make_images):
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        run_isolated("missing", make_images(2), tmp_path / "deck.pptx", {})
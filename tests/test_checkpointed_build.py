@@ -0,0 +1,108 @@
+import zipfile
+
+import pytest
+
+from checkpointed_build import BuildJournal, CheckpointedGenerator
+from generation_stats import GenerationObserver
+from pptx_settings import PPTXSettings
+
+from helpers import deck_parts, serial_build
+
+CHECKPOINT_SLIDES = 2
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashAfter(GenerationObserver):
+    """Raises once slides slides have been added, as a killed run would stop."""
+
+    def __init__(self, slides: int):
+        self.slides = slides
+        self.added = 0
+
+    def slide_added(self, slides_done: int) -> None:
+        self.added += 1
+        if self.added > self.slides:
+            raise Crash()
+
+
+def checkpointed(options=None, observer=None):
+    settings = PPTXSettings()
+    settings.update({"checkpoint_slides": CHECKPOINT_SLIDES, **(options or {})})
+    return CheckpointedGenerator(settings, observer=observer)
+
+
+def crash_after_checkpoints(images, deck, checkpoints, options=None):
+    observer = CrashAfter(checkpoints * CHECKPOINT_SLIDES)
+    with pytest.raises(Crash):
+        checkpointed(options, observer).build(images, deck)
+    journal = BuildJournal.load(deck.with_name(deck.name + ".journal"))
+    assert journal.slides_done == checkpoints * CHECKPOINT_SLIDES
+    return journal
+
+
+def test_resume_matches_a_serial_build(tmp_path, make_images):
+    images = make_images(30)
+    deck = tmp_path / "deck.pptx"
+    crash_after_checkpoints(images, deck, 3)
+
+    generator = checkpointed()
+    assert generator.build(images, deck) == 8
+    assert generator.resumed_slides == 6
+    assert not deck.with_name("deck.pptx.journal").exists()
+
+    serial_build(images, tmp_path / "serial.pptx")
+    assert deck_parts(deck) == deck_parts(tmp_path / "serial.pptx")
+    with zipfile.ZipFile(deck) as package:
+        assert package.testzip() is None
+
+
+def test_restore_cuts_off_a_partial_append(tmp_path, make_images):
+    images = make_images(30)
+    deck = tmp_path / "deck.pptx"
+    journal = crash_after_checkpoints(images, deck, 2)
+    checkpoint = deck.read_bytes()
+
+    with zipfile.ZipFile(deck) as package:
+        start_dir = package.start_dir
+    with open(deck, "r+b") as f:
+        f.seek(start_dir)
+        f.write(b"\0" * 100_000)
+
+    assert journal.restore(deck)
+    assert deck.read_bytes() == checkpoint
+
+
+def test_mismatched_fingerprint_without_override_raises(tmp_path, make_images):
+    images = make_images(30)
+    deck = tmp_path / "deck.pptx"
+    crash_after_checkpoints(images, deck, 2)
+
+    with pytest.raises(ValueError, match="Cannot resume"):
+        checkpointed().build(images[:-1], deck, override=False)
+    with pytest.raises(ValueError, match="Cannot resume"):
+        checkpointed({"rounded": True}).build(images, deck, override=False)
+
+
+def test_skipped_images_survive_a_resume(tmp_path, make_images):
+    images = make_images(30)
+    for broken in (images[2], images[27]):
+        broken.write_bytes(b"not an image")
+    options = {"bad_images": "skip"}
+    deck = tmp_path / "deck.pptx"
+    journal = crash_after_checkpoints(images, deck, 2, options)
+    assert [path for path, _ in journal.skipped] == [str(images[2])]
+
+    generator = checkpointed(options)
+    generator.build(images, deck)
+
+    uninterrupted = checkpointed(options)
+    uninterrupted.build(images, tmp_path / "uninterrupted.pptx")
+    assert generator.skipped_images == uninterrupted.skipped_images
+    assert [path for path, _ in generator.skipped_images] == [
+        str(images[2]),
+        str(images[27]),
+    ]
+    assert deck_parts(deck) == deck_parts(tmp_path / "uninterrupted.pptx")
@@ -0,0 +1,105 @@
+import sqlite3
+
+from image_cache import ImageCache
+
+
+def put(cache, key, nbytes):
+    return cache.put(key, "jpg", (1, 1), key, b"x" * nbytes)
+
+
+def last_used(cache, key):
+    with sqlite3.connect(cache.directory / ImageCache.INDEX_NAME) as db:
+        return db.execute(
+            "SELECT last_used FROM entries WHERE key = ?", (key,)
+        ).fetchone()[0]
+
+
+def test_use_times_are_written_on_commit(tmp_path):
+    cache = ImageCache(tmp_path)
+    put(cache, "a", 10)
+    cache.commit()
+    stored = last_used(cache, "a")
+
+    assert cache.get("a").nbytes == 10
+    assert last_used(cache, "a") == stored
+    cache.commit()
+    assert last_used(cache, "a") > stored
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ImageCache(tmp_path, max_bytes=30)
+    for key in "abc":
+        put(cache, key, 10)
+    cache.get("a")
+    put(cache, "d", 10)
+    cache.commit()
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.info()["total_bytes"] == 30
+    cache.close()
+
+
+def test_replacing_an_entry_counts_its_size_once(tmp_path):
+    cache = ImageCache(tmp_path, max_bytes=25)
+    put(cache, "a", 10)
+    put(cache, "a", 20)
+    put(cache, "a", 10)
+    put(cache, "b", 10)
+    cache.commit()
+    assert cache.get("a") is not None and cache.get("b") is not None
+    cache.close()
+
+
+def test_counts_entries_of_other_processes(tmp_path):
+    first = ImageCache(tmp_path, max_bytes=30)
+    second = ImageCache(tmp_path, max_bytes=30)
+    put(first, "a", 10)
+    first.commit()
+    put(second, "b", 10)
+    put(second, "c", 10)
+    second.commit()
+    put(first, "d", 10)
+    first.commit()
+
+    assert first.info()["total_bytes"] == 30
+    first.close()
+    second.close()
+
+
+def index_is_writable(cache):
+    """Whether another connection can write the index without waiting."""
+    with sqlite3.connect(cache.directory / ImageCache.INDEX_NAME, timeout=0) as db:
+        try:
+            db.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return False
+        db.rollback()
+        return True
+
+
+def test_batches_do_not_hold_the_index(tmp_path):
+    cache = ImageCache(tmp_path)
+    entries = cache.put_many(
+        [("a", "jpg", (1, 1), "a", b"x" * 10), ("b", "jpg", (1, 1), "b", None)]
+    )
+    assert [entry.has_data for entry in entries] == [True, False]
+    assert index_is_writable(cache)
+
+    assert cache.get("a") is not None
+    assert index_is_writable(cache)
+    cache.close()
+
+
+def test_stale_entries_are_deleted_at_once(tmp_path):
+    cache = ImageCache(tmp_path)
+    entry = put(cache, "a", 10)
+    cache.data_path(entry).unlink()
+
+    assert cache.get("a") is None
+    assert index_is_writable(cache)
+    other = ImageCache(tmp_path)
+    assert other.info()["entries"] == 0
+    other.close()
+    cache.close()
@@ -0,0 +1,84 @@
+import os
+
+import image_index
+from image_index import ImageIndex, probe_image
+
+from bench_generation import synthetic_image
+
+
+def test_rescan_only_probes_new_and_changed_files(tmp_path, make_images):
+    images = make_images(5)
+    index = ImageIndex(tmp_path / "index.sqlite3")
+
+    first = index.scan([images[0].parent], workers=2)
+    assert (first.files, first.probed, first.removed) == (5, 5, 0)
+    assert index.scan([images[0].parent], workers=2).probed == 0
+
+    synthetic_image((80, 60), 99).save(images[2], "JPEG")
+    os.utime(images[2], ns=(0, 10**18))
+    result = index.scan([images[0].parent], workers=2)
+    assert (result.probed, result.removed) == (1, 0)
+    assert index.get(images[2]).width == 80
+    index.close()
+
+
+def test_deleted_files_are_removed(tmp_path, make_images):
+    images = make_images(3)
+    index = ImageIndex(tmp_path / "index.sqlite3")
+    index.scan([images[0].parent])
+
+    images[1].unlink()
+    result = index.scan([images[0].parent])
+
+    assert (result.files, result.probed, result.removed) == (2, 0, 1)
+    assert index.get(images[1]) is None
+    assert [info.path for info in index.query(images[0].parent)] == [
+        str(images[0].resolve()),
+        str(images[2].resolve()),
+    ]
+    index.close()
+
+
+def test_file_vanishing_mid_scan_is_dropped(tmp_path, make_images, monkeypatch):
+    images = make_images(4)
+    index = ImageIndex(tmp_path / "index.sqlite3")
+    index.scan([images[0].parent])
+    os.utime(images[3], ns=(0, 10**18))
+    probe = image_index.probe_image
+
+    def probe_after_delete(path):
+        if path.endswith(images[3].name):
+            os.unlink(path)
+        return probe(path)
+
+    monkeypatch.setattr(image_index, "probe_image", probe_after_delete)
+    result = index.scan([images[0].parent])
+
+    assert (result.files, result.probed, result.removed) == (3, 0, 1)
+    assert index.get(images[3]) is None
+    assert len(index.query(images[0].parent)) == 3
+    index.close()
+
+
+def test_folder_vanishing_mid_walk_is_skipped(tmp_path, make_images, monkeypatch):
+    images = make_images(2)
+    gone = images[0].parent / "gone"
+    gone.mkdir()
+    synthetic_image((64, 48), 7).save(gone / "lost.jpg", "JPEG")
+    scandir = os.scandir
+
+    def scandir_after_delete(path):
+        if path == str(gone.resolve()):
+            raise FileNotFoundError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir_after_delete)
+    index = ImageIndex(tmp_path / "index.sqlite3")
+    assert index.scan([images[0].parent]).files == 2
+    index.close()
+
+
+def test_probe_of_missing_file_reports_an_error(tmp_path):
+    info = probe_image(tmp_path / "missing.jpg")
+    assert not info.ok
+    assert info.error.startswith("FileNotFoundError")
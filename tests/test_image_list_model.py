@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+
+from image_index import ImageInfo
+from image_list_model import ImageListModel
+
+
+def model(count):
+    images = ImageListModel()
+    assert images.extend(Path(f"{i}.jpg") for i in range(count)) == (0, count - 1)
+    return images
+
+
+def names(images):
+    return [int(path.stem) for path in images.paths]
+
+
+def check_positions(images):
+    assert [images.index(row_id) for row_id in images.ids] == list(range(len(images)))
+
+
+@pytest.mark.parametrize(
+    "indices, delta, order, changed",
+    [
+        ([2], -1, [0, 2, 1, 3, 4], (1, 2)),
+        ([2], 1, [0, 1, 3, 2, 4], (2, 3)),
+        ([1, 3], -1, [1, 0, 3, 2, 4], (0, 3)),
+        ([0, 1, 3], -1, [0, 1, 3, 2, 4], (2, 3)),
+        ([3, 4], 1, [0, 1, 2, 3, 4], (0, -1)),
+        ([], 1, [0, 1, 2, 3, 4], (0, -1)),
+    ],
+)
+def test_move_block(indices, delta, order, changed):
+    images = model(5)
+    assert images.move_block(indices, delta) == changed
+    assert names(images) == order
+    check_positions(images)
+
+
+@pytest.mark.parametrize(
+    "indices, target, order, changed",
+    [
+        ([3], 0, [3, 0, 1, 2, 4], (0, 3)),
+        ([0], 5, [1, 2, 3, 4, 0], (0, 4)),
+        ([1, 3], 5, [0, 2, 4, 1, 3], (1, 4)),
+        ([3, 1], 0, [1, 3, 0, 2, 4], (0, 3)),
+        ([0, 4], 2, [1, 0, 4, 2, 3], (0, 4)),
+        ([2], 9, [0, 1, 3, 4, 2], (2, 4)),
+        ([], 0, [0, 1, 2, 3, 4], (0, -1)),
+    ],
+)
+def test_move_to(indices, target, order, changed):
+    images = model(5)
+    assert images.move_to(indices, target) == changed
+    assert names(images) == order
+    check_positions(images)
+
+
+def test_delete_drops_rows_and_their_infos():
+    images = model(5)
+    removed = [images.ids[1], images.ids[3]]
+    for row_id in images.ids:
+        images.infos[row_id] = ImageInfo(row_id, 1, 1)
+
+    assert images.delete([3, 1]) == (1, 2)
+    assert names(images) == [0, 2, 4]
+    assert not any(row_id in images or row_id in images.infos for row_id in removed)
+    assert images.pending() == 0
+    check_positions(images)
+    assert images.delete([]) == (0, -1)
+
+
+def test_reorder_keeps_row_ids_with_their_paths():
+    images = model(4)
+    rows = dict(zip(images.ids, images.paths))
+    assert images.reorder([2, 0, 3, 1]) == (0, 3)
+    assert names(images) == [2, 0, 3, 1]
+    assert dict(zip(images.ids, images.paths)) == rows
+    check_positions(images)
+
+
+def test_new_rows_get_new_ids():
+    images = model(3)
+    old_ids = list(images.ids)
+    images.clear()
+    assert len(images) == 0
+    assert images.extend([Path("a.jpg")]) == (0, 0)
+    assert images.ids[0] not in old_ids
+
+
+def test_aspect_comes_from_the_probe():
+    images = model(3)
+    images.infos[images.ids[0]] = ImageInfo("0.jpg", 1, 1, 300, 200)
+    images.infos[images.ids[1]] = ImageInfo("1.jpg", 1, 1, error="OSError")
+    assert images.aspect(0) == 1.5
+    assert images.aspect(1) is None
+    assert images.aspect(2) is None
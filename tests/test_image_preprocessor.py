@@ -0,0 +1,30 @@
+import io
+
+import pytest
+from PIL import Image
+
+from bench_generation import synthetic_image
+from image_index import EXIF_ORIENTATION
+from image_preprocessor import process_image
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG"])
+def test_output_is_the_same_across_runs(make_images, image_format):
+    (image,) = make_images(1, size=(400, 300), image_format=image_format)
+    first = process_image(image, (100, 75), 150, 85)
+    assert first is not None
+    assert process_image(image, (100, 75), 150, 85) == first
+
+
+@pytest.mark.parametrize("orientation", [1, 3, 6, 8])
+def test_rotated_images_are_scaled_as_shown(tmp_path, orientation):
+    path = tmp_path / "rotated.jpg"
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    synthetic_image((400, 200), 0).save(path, "JPEG", exif=exif)
+    shown = (200, 400) if orientation in (6, 8) else (400, 200)
+
+    data, ext = process_image(path, (shown[0] // 4, shown[1] // 4), 150, 85)
+    assert ext == "jpg"
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (shown[0] // 4, shown[1] // 4)
@@ -0,0 +1,97 @@
+import os
+import zipfile
+
+from bench_generation import synthetic_image
+from incremental_build import IncrementalGenerator
+from pptx_settings import PPTXSettings
+
+from helpers import deck_parts, serial_build
+
+
+def rebuild(images, deck, options=None):
+    """Incrementally build images into deck, checking it against a full build."""
+    settings = PPTXSettings()
+    settings.update(options or {})
+    generator = IncrementalGenerator(settings)
+    slides = generator.build(images, deck)
+
+    serial = deck.with_name("serial.pptx")
+    serial_build(images, serial, options)
+    assert deck_parts(deck) == deck_parts(serial)
+    with zipfile.ZipFile(deck) as package:
+        assert package.testzip() is None
+    assert slides == generator.slide_count
+    return generator
+
+
+def test_first_build_builds_every_slide(tmp_path, make_images):
+    generator = rebuild(make_images(12), tmp_path / "deck.pptx")
+    assert generator.slide_count == 3
+    assert generator.rebuilt_slides == 3
+    assert not generator.up_to_date
+
+
+def test_unchanged_rebuild_writes_nothing(tmp_path, make_images):
+    images = make_images(12)
+    deck = tmp_path / "deck.pptx"
+    rebuild(images, deck)
+    before = deck.stat().st_mtime_ns
+
+    generator = rebuild(images, deck)
+    assert generator.up_to_date
+    assert generator.rebuilt_slides == 0
+    assert deck.stat().st_mtime_ns == before
+
+
+def test_swapping_two_images_rebuilds_their_slide(tmp_path, make_images):
+    images = make_images(12)
+    deck = tmp_path / "deck.pptx"
+    rebuild(images, deck)
+
+    images[0], images[1] = images[1], images[0]
+    generator = rebuild(images, deck)
+    assert not generator.up_to_date
+    assert generator.rebuilt_slides == 1
+
+
+def test_image_modified_in_place_rebuilds_its_slide(tmp_path, make_images):
+    images = make_images(12)
+    deck = tmp_path / "deck.pptx"
+    rebuild(images, deck)
+
+    synthetic_image((64, 48), 100).save(images[5], "JPEG")
+    stat = images[5].stat()
+    os.utime(images[5], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    generator = rebuild(images, deck)
+    assert generator.rebuilt_slides == 1
+
+
+def test_settings_change_rebuilds_every_slide(tmp_path, make_images):
+    images = make_images(12)
+    deck = tmp_path / "deck.pptx"
+    rebuild(images, deck)
+
+    generator = rebuild(images, deck, {"rounded": True})
+    assert generator.rebuilt_slides == 3
+
+
+def test_duplicate_slides_share_a_fingerprint(tmp_path, make_images):
+    images = make_images(4)
+    deck = tmp_path / "deck.pptx"
+    generator = rebuild(images * 3, deck)
+    assert generator.slide_count == 3
+    assert generator.rebuilt_slides == 1
+
+    generator = rebuild(images * 2 + list(reversed(images)), deck)
+    assert generator.rebuilt_slides == 1
+
+
+def test_externally_edited_output_is_rewritten(tmp_path, make_images):
+    images = make_images(12)
+    deck = tmp_path / "deck.pptx"
+    rebuild(images, deck)
+    serial_build(images[:4], deck)
+
+    generator = rebuild(images, deck)
+    assert not generator.up_to_date
+    assert generator.rebuilt_slides == 0
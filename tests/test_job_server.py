@@ -0,0 +1,92 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import pytest
+
+from job_server import HTTPError, JobServer
+
+
+async def exchange(server, request: bytes) -> bytes:
+    """Send request to server's handler over TCP and read the whole response."""
+    listener = await asyncio.start_server(server._handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    return response
+
+
+def status_of(response: bytes) -> int:
+    return int(response.split(b" ", 2)[1])
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"1.5", b""])
+def test_malformed_content_length_is_rejected(tmp_path, length):
+    server = JobServer(tmp_path)
+    request = b"POST /jobs HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n{}"
+    response = asyncio.run(exchange(server, request))
+    assert status_of(response) == HTTPStatus.BAD_REQUEST
+    assert b"Invalid Content-Length" in response
+
+
+def test_overlong_header_gets_a_response(tmp_path):
+    server = JobServer(tmp_path)
+    # Just over StreamReader's 64 KiB line limit, small enough to be read whole.
+    request = b"GET /jobs HTTP/1.1\r\nX-Filler: " + b"x" * 70_000 + b"\r\n\r\n"
+    response = asyncio.run(exchange(server, request))
+    assert status_of(response) == HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+
+def test_valid_request(tmp_path):
+    server = JobServer(tmp_path)
+    response = asyncio.run(exchange(server, b"GET /jobs HTTP/1.1\r\n\r\n"))
+    assert status_of(response) == HTTPStatus.OK
+    assert response.endswith(b"[]")
+
+
+def finish(job, finished):
+    job.status = "done"
+    job.finished = finished
+    job.output.write_bytes(b"deck")
+
+
+def test_cancelled_jobs_free_their_queue_slot(tmp_path):
+    server = JobServer(tmp_path, queue_size=2)
+    first = server.submit({"images": ["*.jpg"]})
+    server.submit({"images": ["*.jpg"]})
+    with pytest.raises(HTTPError) as error:
+        server.submit({"images": ["*.jpg"]})
+    assert error.value.status == HTTPStatus.SERVICE_UNAVAILABLE
+
+    server.cancel(first)
+    assert first.status == "cancelled"
+    server.submit({"images": ["*.jpg"]})
+
+
+def test_prune_keeps_the_newest_finished_jobs(tmp_path):
+    server = JobServer(tmp_path, keep_jobs=2, job_ttl=None)
+    jobs = [server.submit({"images": ["*.jpg"]}) for _ in range(4)]
+    for i, job in enumerate(jobs[:3]):
+        finish(job, 1000 + i)
+
+    server.prune()
+
+    assert list(server.jobs) == [job.id for job in jobs[1:]]
+    assert not jobs[0].output.exists()
+    assert jobs[1].output.exists() and jobs[2].output.exists()
+
+
+def test_prune_forgets_expired_jobs(tmp_path):
+    server = JobServer(tmp_path, job_ttl=60)
+    old, recent, queued = [server.submit({"images": ["*.jpg"]}) for _ in range(3)]
+    finish(old, time.time() - 120)
+    finish(recent, time.time())
+
+    server.prune()
+
+    assert list(server.jobs) == [recent.id, queued.id]
+    assert not old.output.exists()
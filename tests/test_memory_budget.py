@@ -0,0 +1,57 @@
+import pytest
+
+from memory_budget import MemoryBudget, parse_bytes
+from pptx_generator import PPTXGenerator
+from pptx_media import FileImagePart
+
+from helpers import deck_parts
+
+MAX_MEMORY = "256K"
+
+
+def build(images, output, options):
+    generator = PPTXGenerator()
+    generator.settings.update(options)
+    generator.create_presentation(output, override=True)
+    generator.add_images(images)
+    return generator
+
+
+@pytest.mark.parametrize("keep_originals", [True, False], ids=["originals", "resized"])
+def test_budget_spills_and_matches_unbudgeted_build(
+    tmp_path, make_images, keep_originals
+):
+    images = make_images(300, size=(200, 150))
+    options = {"keep_originals": keep_originals, "target_dpi": 30}
+
+    reference = build(images, tmp_path / "reference.pptx", options)
+    reference.save_presentation(tmp_path / "reference.pptx")
+
+    generator = build(
+        images, tmp_path / "budgeted.pptx", {**options, "max_memory": MAX_MEMORY}
+    )
+    budget = generator.memory_budget
+    assert budget.max_bytes == parse_bytes(MAX_MEMORY)
+    assert 0 < budget.peak <= budget.max_bytes
+    assert generator._spilling
+    parts = generator.presentation.part.package.iter_parts()
+    assert any(isinstance(part, FileImagePart) for part in parts)
+    generator.save_presentation(tmp_path / "budgeted.pptx")
+
+    assert deck_parts(tmp_path / "budgeted.pptx") == deck_parts(
+        tmp_path / "reference.pptx"
+    )
+
+
+def test_parse_bytes():
+    assert parse_bytes(1000) == 1000
+    assert parse_bytes("512") == 512
+    assert parse_bytes("20M") == 20 * 1024**2
+    assert parse_bytes("1.5 GiB") == int(1.5 * 1024**3)
+    with pytest.raises(ValueError):
+        parse_bytes("lots")
+
+
+def test_budget_rejects_non_positive_limit():
+    with pytest.raises(ValueError):
+        MemoryBudget(0)
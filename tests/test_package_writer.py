@@ -0,0 +1,43 @@
+import itertools
+import zipfile
+
+import pytest
+from pptx import Presentation
+
+from package_writer import COMPRESSED_EXTENSIONS
+from pptx_generator import PPTXGenerator
+
+STORE_MEDIA = (False, True)
+COMPRESS_LEVELS = (None, 0, 1, 6, 9)
+
+
+@pytest.mark.parametrize(
+    "store_media, compress_level",
+    list(itertools.product(STORE_MEDIA, COMPRESS_LEVELS)),
+)
+def test_policy_round_trip(tmp_path, make_images, store_media, compress_level):
+    images = make_images(5) + make_images(2, image_format="PNG")
+    output = tmp_path / "deck.pptx"
+
+    generator = PPTXGenerator()
+    generator.settings.update(
+        {"store_media": store_media, "compress_level": compress_level}
+    )
+    generator.create_presentation(output, override=True)
+    generator.add_images(images)
+    generator.save_presentation(output)
+
+    with zipfile.ZipFile(output) as package:
+        assert package.testzip() is None
+        for info in package.infolist():
+            ext = info.filename.rpartition(".")[2].lower()
+            if info.filename.endswith((".xml", ".rels")):
+                assert info.compress_type == zipfile.ZIP_DEFLATED, info.filename
+            elif store_media and ext in COMPRESSED_EXTENSIONS:
+                assert info.compress_type == zipfile.ZIP_STORED, info.filename
+            else:
+                assert info.compress_type == zipfile.ZIP_DEFLATED, info.filename
+        media = [name for name in package.namelist() if name.startswith("ppt/media/")]
+        assert len(media) == len(images)
+
+    assert len(Presentation(output).slides) == 2
@@ -0,0 +1,65 @@
+import zipfile
+
+from pptx import Presentation
+
+import pptx_append
+from pptx_append import AppendablePackage
+from pptx_generator import PPTXGenerator
+
+
+def append_images(deck, images):
+    generator = PPTXGenerator()
+    generator.create_presentation(deck)
+    generator.add_images(images)
+    generator.save_presentation(deck)
+    return generator._appendable
+
+
+def test_orphan_bytes_match_a_reopened_package(tmp_path, make_images):
+    deck = tmp_path / "deck.pptx"
+    images = make_images(12)
+    append_images(deck, images[:4])
+    package = append_images(deck, images[4:8])
+    package.append(Presentation())
+    assert package.orphan_bytes > 0
+    assert AppendablePackage(deck).orphan_bytes == package.orphan_bytes
+
+
+def test_repeated_appends_are_compacted(tmp_path, make_images, monkeypatch):
+    monkeypatch.setattr(pptx_append, "COMPACT_MIN_BYTES", 0)
+    deck = tmp_path / "deck.pptx"
+    images = make_images(40)
+    append_images(deck, images[:4])
+
+    package = None
+    for start in range(4, len(images), 4):
+        package = append_images(deck, images[start : start + 4])
+        size = deck.stat().st_size
+        assert package.orphan_bytes <= pptx_append.COMPACT_SHARE * size
+
+    with zipfile.ZipFile(deck) as archive:
+        assert archive.testzip() is None
+        assert (
+            archive.start_dir - sum(map(pptx_append.member_bytes, archive.infolist()))
+            == package.orphan_bytes
+        )
+    assert len(Presentation(deck).slides) == 10
+
+
+def test_compact_keeps_the_deck(tmp_path, make_images):
+    deck = tmp_path / "deck.pptx"
+    images = make_images(8)
+    append_images(deck, images[:4])
+    package = append_images(deck, images[4:])
+    before = deck.stat().st_size
+    with zipfile.ZipFile(deck) as archive:
+        members = {name: archive.read(name) for name in archive.namelist()}
+
+    package.compact()
+
+    assert package.orphan_bytes == 0
+    assert deck.stat().st_size < before
+    with zipfile.ZipFile(deck) as archive:
+        assert {name: archive.read(name) for name in archive.namelist()} == members
+    package.append(Presentation())
+    assert len(Presentation(deck).slides) == 2
@@ -0,0 +1,33 @@
+import threading
+
+import pytest
+
+from image_preprocessor import ImagePreprocessor
+from pptx_generator import GenerationCancelled, PPTXGenerator
+
+
+def test_cancel_before_the_build_starts_holds(tmp_path, make_images):
+    images = make_images(8)
+    generator = PPTXGenerator()
+    generator.cancel()
+    generator.create_presentation(tmp_path / "deck.pptx", override=True)
+    with pytest.raises(GenerationCancelled):
+        generator.add_images(images)
+    assert len(generator.presentation.slides) == 0
+
+    generator.reset_cancel()
+    generator.create_presentation(tmp_path / "deck.pptx", override=True)
+    generator.add_images(images)
+    assert len(generator.presentation.slides) == 2
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cancelled_preprocessing_stops(make_images, workers):
+    images = make_images(4, size=(400, 300))
+    preprocessor = ImagePreprocessor()
+    sizes = [(40, 30)] * len(images)
+    cancel_event = threading.Event()
+    assert len(preprocessor.process(images, sizes, workers, cancel_event)) == 4
+
+    cancel_event.set()
+    assert preprocessor.process(images, sizes, workers, cancel_event) == []
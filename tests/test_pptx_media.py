@@ -0,0 +1,85 @@
+import zipfile
+
+import pytest
+from pptx import Presentation
+
+from bench_generation import synthetic_image
+from generation_stats import GenerationStats
+from pptx_generator import PPTXGenerator
+
+from helpers import serial_build
+
+
+def media_members(deck):
+    with zipfile.ZipFile(deck) as package:
+        assert package.testzip() is None
+        return [name for name in package.namelist() if name.startswith("ppt/media/")]
+
+
+def append(deck, images, options):
+    stats = GenerationStats()
+    generator = PPTXGenerator(observer=stats)
+    generator.settings.update(options)
+    generator.create_presentation(deck, override=False)
+    generator.add_images(images)
+    generator.save_presentation(deck)
+    return generator, stats
+
+
+@pytest.mark.parametrize("append_in_place", [True, False])
+def test_images_in_the_deck_are_reused(tmp_path, make_images, append_in_place):
+    deck = tmp_path / "deck.pptx"
+    images = make_images(4)
+    serial_build(images, deck)
+    members = media_members(deck)
+
+    generator, stats = append(deck, images, {"append_in_place": append_in_place})
+    assert media_members(deck) == members
+    assert stats.reused_images == 4
+    assert stats.existing_skipped == 0
+    assert generator.existing_images == []
+    assert len(Presentation(deck).slides) == 2
+
+
+@pytest.mark.parametrize("append_in_place", [True, False])
+def test_images_in_the_deck_are_skipped(tmp_path, make_images, append_in_place):
+    deck = tmp_path / "deck.pptx"
+    images = make_images(4)
+    serial_build(images, deck)
+    members = media_members(deck)
+    new_images = make_images(2)
+
+    generator, stats = append(
+        deck,
+        images + new_images,
+        {"append_in_place": append_in_place, "skip_existing_images": True},
+    )
+    assert len(media_members(deck)) == len(members) + 2
+    assert stats.reused_images == 0
+    assert stats.existing_skipped == 4
+    assert generator.existing_images == list(map(str, images))
+    assert len(Presentation(deck).slides) == 2
+
+
+def test_only_media_of_a_looked_up_size_is_hashed(tmp_path, make_images):
+    deck = tmp_path / "deck.pptx"
+    images = make_images(4)
+    serial_build(images, deck)
+    large = tmp_path / "large.jpg"
+    synthetic_image((300, 200), 99).save(large)
+
+    generator, stats = append(deck, [large], {"append_in_place": True})
+    assert generator._appendable.media.hashed == 0
+    assert stats.reused_images == 0
+
+    generator, stats = append(deck, images[:1], {"append_in_place": True})
+    with zipfile.ZipFile(deck) as package:
+        # The first image added to the deck is stored first.
+        nbytes = package.getinfo("ppt/media/image1.jpg").file_size
+        same_size = [
+            info
+            for info in package.infolist()
+            if info.filename.startswith("ppt/media/") and info.file_size == nbytes
+        ]
+    assert generator._appendable.media.hashed == len(same_size)
+    assert stats.reused_images == 1
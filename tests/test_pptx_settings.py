@@ -0,0 +1,81 @@
+import pytest
+
+from pptx_generator import PPTXGenerator
+from pptx_settings import PPTXSettings
+
+
+@pytest.mark.parametrize("value", [0, -1, 2.5, "4"])
+def test_images_per_slide_must_be_positive(value):
+    settings = PPTXSettings()
+    with pytest.raises(ValueError, match="images_per_slide"):
+        settings.images_per_slide = value
+    with pytest.raises(ValueError, match="images_per_slide"):
+        settings.update({"images_per_slide": value})
+    assert settings.images_per_slide == 4
+
+
+def test_images_per_slide_sets_slide_count(tmp_path, make_images):
+    generator = PPTXGenerator()
+    generator.settings.update({"images_per_slide": 1})
+    generator.create_presentation(tmp_path / "deck.pptx")
+    generator.add_images(make_images(3))
+    assert len(generator.presentation.slides) == 3
+
+
+def test_lengths_are_not_scaled_again():
+    from pptx.util import Emu, Inches, Pt
+
+    settings = PPTXSettings()
+    settings.top_margin = Inches(1)
+    settings.left_margin = 0.5
+    settings.h_center_margin = Emu(914400)
+    settings.line_width = Pt(3)
+
+    assert settings.top_margin == Inches(1)
+    assert settings.left_margin == Inches(0.5)
+    assert settings.h_center_margin.inches == 1.0
+    assert settings.line_width == Pt(3)
+    settings.line_width = 1.5
+    assert settings.line_width.pt == 1.5
+
+
+def test_output_key_ignores_settings_that_keep_the_slides():
+    settings = PPTXSettings()
+    key = settings.output_key()
+    settings.update(
+        {
+            "store_media": True,
+            "compress_level": 9,
+            "append_in_place": False,
+            "bad_images": "skip",
+            "skip_existing_images": True,
+            "max_deck_bytes": "20M",
+            "preprocess_workers": 3,
+            "low_memory": True,
+            "shard_slides": 10,
+            "checkpoint_slides": 10,
+            "max_memory": "64M",
+            "target_dpi": 96,
+        }
+    )
+    assert settings.output_key() == key
+
+    settings.keep_originals = False
+    assert settings.output_key() != key
+
+
+@pytest.mark.parametrize(
+    "name, value", [("top_margin", 2.0), ("rounded", True), ("images_per_slide", 6)]
+)
+def test_output_key_follows_slide_settings(name, value):
+    settings = PPTXSettings()
+    key = settings.output_key()
+    settings.update({name: value})
+    assert settings.output_key() != key
+
+
+def test_output_key_is_canonical():
+    listed, paired = PPTXSettings(), PPTXSettings()
+    listed.update({"color": [10, 20, 30], "top_margin": 1, "line_width": 2})
+    paired.update({"color": (10, 20, 30), "top_margin": 1.0, "line_width": 2.0})
+    assert listed.output_key() == paired.output_key()
@@ -0,0 +1,18 @@
+import pytest
+
+from bench_generation import check_backends
+
+SETTINGS = {
+    "default": {},
+    "rounded": {"rounded": True},
+    "borderless": {"line_width": 0},
+    "aspect-packed": {"packing": "aspect", "packing_window": 4},
+    "nine-per-slide": {"images_per_slide": 9},
+    "downsampled": {"keep_originals": False, "target_dpi": 20},
+}
+
+
+@pytest.mark.parametrize("options", list(SETTINGS.values()), ids=list(SETTINGS))
+def test_backends_write_identical_slides(tmp_path, make_images, options):
+    images = make_images(11, size=(96, 48)) + make_images(4, size=(40, 90))
+    assert check_backends(images, tmp_path, options) == []
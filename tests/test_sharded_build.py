@@ -0,0 +1,57 @@
+import pytest
+from pptx import Presentation
+
+from memory_budget import parse_bytes
+from pptx_settings import PPTXSettings
+from sharded_build import ShardedGenerator
+
+from helpers import serial_build
+
+
+def slide_images(paths):
+    """The SHA-1s of each slide's pictures, in slide order across decks."""
+    return [
+        [shape.image.sha1 for shape in slide.shapes]
+        for path in paths
+        for slide in Presentation(path).slides
+    ]
+
+
+def build_capped(tmp_path, images, options):
+    settings = PPTXSettings()
+    settings.update({"preprocess_workers": 1, **options})
+    paths = ShardedGenerator(settings).build(images, tmp_path / "deck.pptx")
+    assert all(
+        path.stat().st_size <= parse_bytes(options["max_deck_bytes"]) for path in paths
+    )
+    return paths
+
+
+def test_max_deck_bytes_accepts_a_size_string(tmp_path, make_images):
+    paths = build_capped(
+        tmp_path, make_images(40), {"shard_slides": 2, "max_deck_bytes": "40K"}
+    )
+    assert len(paths) > 1
+    assert sum(len(Presentation(path).slides) for path in paths) == 10
+
+
+@pytest.mark.parametrize("packing", ["grid", "aspect"])
+def test_capped_decks_keep_the_serial_slide_order(tmp_path, make_images, packing):
+    images = make_images(40, size=(160, 120))
+    options = {"packing": packing}
+    paths = build_capped(tmp_path, images, {"max_deck_bytes": "60K", **options})
+    assert len(paths) > 1
+
+    serial = tmp_path / "serial.pptx"
+    serial_build(images, serial, options)
+    assert slide_images(paths) == slide_images([serial])
+
+
+def test_oversized_shards_are_split(tmp_path, make_images, monkeypatch):
+    # Estimating no bytes per image leaves the cap to the rebuilt halves.
+    monkeypatch.setattr("sharded_build._slide_bytes", lambda images: 0)
+    paths = build_capped(
+        tmp_path, make_images(40, size=(160, 120)), {"max_deck_bytes": "60K"}
+    )
+    assert len(paths) > 1
+    assert sum(len(Presentation(path).slides) for path in paths) == 10
@@ -0,0 +1,43 @@
+import pytest
+
+from pptx_settings import PPTXSettings
+from slide_preview import SlidePreview
+from thumbnail_cache import ThumbnailCache
+
+
+@pytest.mark.parametrize("packing", ["grid", "aspect"])
+def test_render_without_waiting_draws_placeholders(make_images, packing):
+    images = make_images(6, size=(320, 200))
+    settings = PPTXSettings()
+    settings.update({"packing": packing, "images_per_slide": 6})
+    thumbnails = ThumbnailCache()
+    preview = SlidePreview(thumbnails)
+
+    placeholders = preview.render(images, settings, wait=False)
+    assert preview.missing == images
+    assert all(thumbnails.cached(image) is None for image in images)
+
+    for image in preview.missing:
+        thumbnails.get(image)
+    ready = preview.render(images, settings, wait=False)
+    assert preview.missing == []
+    assert ready.tobytes() != placeholders.tobytes()
+
+    waited = SlidePreview(ThumbnailCache()).render(images, settings)
+    assert ready.tobytes() == waited.tobytes()
+
+
+def test_aspect_packing_uses_given_aspects(make_images, monkeypatch):
+    images = make_images(4, size=(320, 200)) + make_images(4, size=(200, 320))
+    settings = PPTXSettings()
+    settings.update({"packing": "aspect"})
+    planned = SlidePreview(ThumbnailCache()).plan(images, settings)
+
+    def probe(image):
+        raise AssertionError(f"{image} probed")
+
+    monkeypatch.setattr("slide_preview.image_aspect", probe)
+    preview = SlidePreview(ThumbnailCache())
+    aspects = [320 / 200] * 4 + [200 / 320] * 4
+    assert preview.plan(images, settings, aspects) == planned
+    assert preview.render(images, settings, wait=False, aspects=aspects)
@@ -0,0 +1,30 @@
+from thumbnail_cache import ThumbnailCache
+
+
+def disk_bytes(directory):
+    return sum(path.stat().st_size for path in directory.glob("*.png"))
+
+
+def test_disk_store_is_pruned_to_its_limit(tmp_path, make_images):
+    images = make_images(12, size=(300, 200))
+    disk_dir = tmp_path / "thumbnails"
+    ThumbnailCache(disk_dir=disk_dir).get(images[0])
+    limit = disk_bytes(disk_dir) * 5
+
+    cache = ThumbnailCache(max_entries=1, disk_dir=disk_dir, max_disk_bytes=limit)
+    for image in images:
+        cache.get(image)
+        assert disk_bytes(disk_dir) <= limit
+
+    kept = len(list(disk_dir.glob("*.png")))
+    assert 0 < kept < len(images)
+    assert cache._disk_path(cache._key(images[-1])).exists()
+
+
+def test_thumbnails_are_read_back_from_disk(tmp_path, make_images):
+    (image,) = make_images(1)
+    disk_dir = tmp_path / "thumbnails"
+    first = ThumbnailCache(disk_dir=disk_dir).get(image)
+    second = ThumbnailCache(disk_dir=disk_dir).get(image)
+    assert second.size == first.size
+    assert second.tobytes() == first.tobytes()